@@ -0,0 +1,146 @@
+"""
+Logging setup and access log for the backend
+
+All records go through a QueueHandler: the request path only puts the record
+on an in-memory queue, and a QueueListener thread formats and writes it to
+stdout. Message formatting is deferred to that thread as well.
+
+The access log is sampled: every request slower than SLOW_REQUEST_MS and
+every 5xx is logged, the rest with probability ACCESS_LOG_SAMPLE_RATE, so
+log volume stays roughly constant as traffic grows.
+"""
+
+import atexit
+import json
+import logging
+import os
+import queue
+import random
+import sys
+import time
+from logging.handlers import QueueHandler, QueueListener
+from typing import Optional
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_FORMAT = (
+    "%(asctime)s - %(name)s - %(levelname)s - [%(filename)s:%(lineno)d] - %(message)s"
+)
+
+# Доля обычных запросов, попадающих в access log (1.0 - все, 0 - только медленные и ошибки)
+ACCESS_LOG_SAMPLE_RATE = float(os.getenv("ACCESS_LOG_SAMPLE_RATE", "0.05"))
+# Запросы дольше этого порога логируются всегда
+SLOW_REQUEST_MS = float(os.getenv("SLOW_REQUEST_MS", "1000"))
+# json - одна JSON-строка на запрос, text - для чтения глазами
+ACCESS_LOG_FORMAT = os.getenv("ACCESS_LOG_FORMAT", "json")
+
+access_logger = logging.getLogger("access")
+
+_listener: Optional[QueueListener] = None
+
+
+class _DeferredQueueHandler(QueueHandler):
+    """QueueHandler that leaves formatting to the listener thread"""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Стандартный prepare форматирует сообщение в вызывающем потоке;
+        # аргументы записей здесь не изменяются после логирования
+        return record
+
+
+def setup_logging():
+    """Route all logging through a background queue listener writing to stdout"""
+    global _listener
+    if _listener is not None:
+        return
+
+    stream_handler = logging.StreamHandler(sys.stdout)
+    stream_handler.setFormatter(logging.Formatter(LOG_FORMAT, datefmt="%Y-%m-%d %H:%M:%S"))
+
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(_DeferredQueueHandler(log_queue))
+    root.setLevel(getattr(logging, LOG_LEVEL, logging.INFO))
+
+    _listener = QueueListener(log_queue, stream_handler, respect_handler_level=True)
+    _listener.start()
+    # Дописываем очередь при выходе процесса
+    atexit.register(_listener.stop)
+
+
+class _AccessEntry:
+    """Access log fields, serialized only when the record is formatted"""
+
+    __slots__ = ("scope", "status", "duration_ms", "reason")
+
+    def __init__(self, scope: Scope, status: int, duration_ms: float, reason: str):
+        self.scope = scope
+        self.status = status
+        self.duration_ms = duration_ms
+        self.reason = reason
+
+    def _client(self) -> str:
+        # За nginx реальный адрес клиента приходит в X-Real-IP
+        for name, value in self.scope.get("headers", ()):
+            if name == b"x-real-ip":
+                return value.decode("latin-1")
+        client = self.scope.get("client")
+        return client[0] if client else "unknown"
+
+    def __str__(self) -> str:
+        route = self.scope.get("route")
+        fields = {
+            "method": self.scope["method"],
+            "path": self.scope["path"],
+            "route": getattr(route, "path", None),
+            "status": self.status,
+            "duration_ms": round(self.duration_ms, 1),
+            "client": self._client(),
+            "reason": self.reason,
+        }
+        if ACCESS_LOG_FORMAT == "json":
+            return json.dumps(fields, ensure_ascii=False, separators=(",", ":"))
+        return " ".join(f"{key}={value}" for key, value in fields.items())
+
+
+class AccessLogMiddleware:
+    """ASGI middleware writing a sampled access log"""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+        start = time.perf_counter()
+
+        async def send_wrapper(message: Message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        except Exception:
+            duration_ms = (time.perf_counter() - start) * 1000
+            access_logger.error(
+                "%s", _AccessEntry(scope, 500, duration_ms, "exception"), exc_info=True
+            )
+            raise
+
+        duration_ms = (time.perf_counter() - start) * 1000
+        if duration_ms >= SLOW_REQUEST_MS:
+            access_logger.warning("%s", _AccessEntry(scope, status_code, duration_ms, "slow"))
+        elif status_code >= 500:
+            access_logger.error("%s", _AccessEntry(scope, status_code, duration_ms, "error"))
+        elif random.random() < ACCESS_LOG_SAMPLE_RATE and access_logger.isEnabledFor(
+            logging.INFO
+        ):
+            access_logger.info("%s", _AccessEntry(scope, status_code, duration_ms, "sampled"))
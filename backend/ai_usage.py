@@ -0,0 +1,223 @@
+"""
+OpenAI usage accounting and per-user quotas
+
+Every chat completion call (see MLServiceManager.add_call_observer) becomes a
+row in ai_usage with its feature, model, token counts and latency. Rows are
+buffered in memory and inserted in batches, so accounting adds no database
+round trip to the request. The same batch increments per-user daily counters
+in Redis, which ai_quota_guard checks with a single HMGET before a call.
+"""
+
+import asyncio
+import json
+import logging
+import os
+from contextvars import ContextVar
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from fastapi import HTTPException, status
+
+logger = logging.getLogger(__name__)
+
+AI_USAGE_FLUSH_INTERVAL = float(os.getenv("AI_USAGE_FLUSH_INTERVAL", "2.0"))
+AI_USAGE_BATCH_SIZE = int(os.getenv("AI_USAGE_BATCH_SIZE", "200"))
+# Если БД недоступна долго, старые записи отбрасываются
+AI_USAGE_MAX_BUFFER = 10000
+
+# Дневные лимиты на пользователя (0 - без лимита)
+AI_DAILY_TOKEN_QUOTA = int(os.getenv("AI_DAILY_TOKEN_QUOTA", "0"))
+AI_DAILY_REQUEST_QUOTA = int(os.getenv("AI_DAILY_REQUEST_QUOTA", "0"))
+
+# Цена в USD за 1M токенов: (prompt, completion). Reasoning-токены входят
+# в completion_tokens и оплачиваются как они. Переопределяется AI_PRICING_JSON
+DEFAULT_PRICING: Dict[str, Tuple[float, float]] = {
+    "gpt-4o": (2.50, 10.00),
+    "gpt-4o-mini": (0.15, 0.60),
+    "gpt-3.5-turbo": (0.50, 1.50),
+    "gpt-5-nano": (0.05, 0.40),
+}
+AI_PRICING: Dict[str, Tuple[float, float]] = {
+    **DEFAULT_PRICING,
+    **{
+        model: tuple(prices)
+        for model, prices in json.loads(os.getenv("AI_PRICING_JSON", "{}")).items()
+    },
+}
+
+# Пользователь, от имени которого выполняются вызовы AI в текущем запросе
+ai_user_id: ContextVar[Optional[int]] = ContextVar("ai_user_id", default=None)
+
+
+def estimate_cost(model: str, prompt_tokens: int, completion_tokens: int) -> Optional[float]:
+    """Cost in USD, or None for a model without a known price"""
+    prices = AI_PRICING.get(model)
+    if prices is None:
+        # gpt-4o-2024-08-06 -> gpt-4o
+        matches = [name for name in AI_PRICING if model.startswith(name)]
+        if not matches:
+            return None
+        prices = AI_PRICING[max(matches, key=len)]
+    prompt_price, completion_price = prices
+    return (prompt_tokens * prompt_price + completion_tokens * completion_price) / 1_000_000
+
+
+def _quota_key(user_id: int, day: datetime) -> str:
+    return f"ai:usage:{user_id}:{day.strftime('%Y%m%d')}"
+
+
+async def ai_quota_guard(user_id: Optional[int], feature: str):
+    """
+    Attribute the following AI calls to user_id and enforce daily quotas.
+
+    Raises 429 when the user has used up the daily token or request quota.
+    Counters lag by up to AI_USAGE_FLUSH_INTERVAL; if Redis is unavailable
+    the call is allowed.
+    """
+    ai_user_id.set(user_id)
+    if not user_id or not (AI_DAILY_TOKEN_QUOTA or AI_DAILY_REQUEST_QUOTA):
+        return
+
+    now = datetime.now(timezone.utc)
+    try:
+        from redis_client import get_redis
+
+        tokens, requests = await get_redis().hmget(
+            _quota_key(user_id, now), "tokens", "requests"
+        )
+    except Exception as e:
+        logger.warning(f"AI quota check skipped for user {user_id}: {e}")
+        return
+
+    over_tokens = AI_DAILY_TOKEN_QUOTA and int(tokens or 0) >= AI_DAILY_TOKEN_QUOTA
+    over_requests = AI_DAILY_REQUEST_QUOTA and int(requests or 0) >= AI_DAILY_REQUEST_QUOTA
+    if over_tokens or over_requests:
+        from metrics import AI_QUOTA_REJECTIONS
+
+        AI_QUOTA_REJECTIONS.labels(feature).inc()
+        tomorrow = (now + timedelta(days=1)).replace(hour=0, minute=0, second=0, microsecond=0)
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Daily AI usage limit reached. Try again tomorrow.",
+            headers={"Retry-After": str(int((tomorrow - now).total_seconds()))},
+        )
+
+
+class AIUsageRecorder:
+    """Buffers AI call records and writes them to ai_usage and Redis in batches"""
+
+    def __init__(self):
+        self._buffer: List[Dict[str, Any]] = []
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = False
+
+    def observe(self, record):
+        """MLServiceManager call observer"""
+        self._buffer.append(
+            {
+                "user_id": ai_user_id.get(),
+                "feature": record.feature,
+                "model": record.model,
+                "prompt_tokens": record.prompt_tokens,
+                "completion_tokens": record.completion_tokens,
+                "reasoning_tokens": record.reasoning_tokens,
+                "latency_ms": int(record.latency_seconds * 1000),
+                "success": record.success,
+                "created_at": datetime.now(timezone.utc),
+            }
+        )
+        if len(self._buffer) >= AI_USAGE_BATCH_SIZE:
+            self._wakeup.set()
+
+    async def start(self):
+        if self._task is None:
+            self._stopping = False
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Let the loop finish its current flush (no cancel), then flush the rest"""
+        if self._task is not None:
+            self._stopping = True
+            self._wakeup.set()
+            await self._task
+            self._task = None
+        await self.flush()
+
+    async def _run(self):
+        while not self._stopping:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=AI_USAGE_FLUSH_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            if self._stopping:
+                break
+            await self.flush()
+
+    async def flush(self):
+        if not self._buffer:
+            return
+        batch, self._buffer = self._buffer, []
+
+        try:
+            from database import AsyncSessionLocal
+            from models import AIUsage
+            from sqlalchemy import insert
+
+            async with AsyncSessionLocal() as session:
+                await session.execute(insert(AIUsage), batch)
+                await session.commit()
+        except Exception as e:
+            logger.error(f"Could not write {len(batch)} AI usage records: {e}")
+            # Вернем в буфер, чтобы записать со следующим пакетом
+            self._buffer = (batch + self._buffer)[-AI_USAGE_MAX_BUFFER:]
+            return
+        except BaseException:
+            # Отмена посреди записи: пакет не теряется, его запишет следующий flush
+            self._buffer = (batch + self._buffer)[-AI_USAGE_MAX_BUFFER:]
+            raise
+
+        await self._update_counters(batch)
+
+    async def _update_counters(self, batch: List[Dict[str, Any]]):
+        totals: Dict[str, List[int]] = {}
+        for row in batch:
+            if not row["user_id"]:
+                continue
+            key = _quota_key(row["user_id"], row["created_at"])
+            counters = totals.setdefault(key, [0, 0])
+            counters[0] += row["prompt_tokens"] + row["completion_tokens"]
+            counters[1] += 1
+        if not totals:
+            return
+
+        try:
+            from redis_client import get_redis
+
+            async with get_redis().pipeline(transaction=False) as pipe:
+                for key, (tokens, requests) in totals.items():
+                    pipe.hincrby(key, "tokens", tokens)
+                    pipe.hincrby(key, "requests", requests)
+                    pipe.expire(key, 2 * 24 * 3600)
+                await pipe.execute()
+        except Exception as e:
+            logger.warning(f"Could not update AI quota counters: {e}")
+
+
+async def get_daily_usage(user_id: int) -> Dict[str, Any]:
+    """Today's counters and limits for a user (from Redis)"""
+    from redis_client import get_redis
+
+    tokens, requests = await get_redis().hmget(
+        _quota_key(user_id, datetime.now(timezone.utc)), "tokens", "requests"
+    )
+    return {
+        "tokens": int(tokens or 0),
+        "requests": int(requests or 0),
+        "token_quota": AI_DAILY_TOKEN_QUOTA or None,
+        "request_quota": AI_DAILY_REQUEST_QUOTA or None,
+    }
+
+
+usage_recorder = AIUsageRecorder()
@@ -0,0 +1,351 @@
+"""
+Bulk import/export of content tables (facts and braces FAQ)
+
+Import streams JSONL/CSV rows through asyncpg COPY into a temporary staging
+table and upserts them into the target table with a single INSERT ... SELECT,
+so large files are loaded without row-by-row ORM inserts.
+"""
+
+import csv
+import io
+import json
+import logging
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from pydantic import BaseModel, Field, ValidationError, field_validator
+from routers.faq_search import decode_keywords
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncSession
+from starlette.concurrency import run_in_threadpool
+
+logger = logging.getLogger(__name__)
+
+SUPPORTED_FORMATS = ("jsonl", "csv")
+DEFAULT_BATCH_SIZE = 5000
+MAX_REPORTED_ERRORS = 100
+
+
+class FactRecord(BaseModel):
+    id: Optional[int] = Field(None, gt=0)
+    title: str = Field(..., min_length=1)
+    content: str = Field(..., min_length=1)
+    category: str = Field(..., min_length=1)
+    is_active: bool = True
+
+
+class BracesFAQRecord(BaseModel):
+    id: Optional[int] = Field(None, gt=0)
+    question: str = Field(..., min_length=1)
+    answer: str = Field(..., min_length=1)
+    category: str = Field(..., min_length=1)
+    keywords: List[str] = []
+    is_active: bool = True
+
+    @field_validator("keywords", mode="before")
+    @classmethod
+    def split_keywords(cls, value: Any) -> Any:
+        """Accept a JSON array, a ';'-separated string (CSV) or a list"""
+        if value is None or value == "":
+            return []
+        if isinstance(value, str):
+            stripped = value.strip()
+            if stripped.startswith("["):
+                return json.loads(stripped)
+            return [part.strip() for part in stripped.split(";") if part.strip()]
+        return value
+
+
+@dataclass(frozen=True)
+class ContentKind:
+    """Describes how one content table is imported and exported"""
+
+    table: str
+    record_model: type
+    columns: Tuple[str, ...]
+    staging_types: Tuple[str, ...]
+
+
+CONTENT_KINDS: Dict[str, ContentKind] = {
+    "facts": ContentKind(
+        table="facts",
+        record_model=FactRecord,
+        columns=("id", "title", "content", "category", "is_active"),
+        staging_types=("integer", "varchar", "text", "varchar", "boolean"),
+    ),
+    "braces_faq": ContentKind(
+        table="braces_faq",
+        record_model=BracesFAQRecord,
+        columns=("id", "question", "answer", "category", "keywords", "is_active"),
+        staging_types=("integer", "varchar", "text", "varchar", "text", "boolean"),
+    ),
+}
+
+
+@dataclass
+class ImportReport:
+    """Result of an import run"""
+
+    kind: str
+    total_rows: int = 0
+    inserted: int = 0
+    updated: int = 0
+    errors: List[Dict[str, Any]] = field(default_factory=list)
+    error_count: int = 0
+
+    def add_error(self, line: int, message: str):
+        self.error_count += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({"line": line, "error": message})
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "kind": self.kind,
+            "total_rows": self.total_rows,
+            "inserted": self.inserted,
+            "updated": self.updated,
+            "error_count": self.error_count,
+            "errors": self.errors,
+        }
+
+
+class ContentImportError(ValueError):
+    """Raised when an import is rejected (unknown kind/format or strict mode)"""
+
+
+def get_content_kind(kind: str) -> ContentKind:
+    if kind not in CONTENT_KINDS:
+        raise ContentImportError(
+            f"Unknown content kind '{kind}'. Supported: {', '.join(CONTENT_KINDS)}"
+        )
+    return CONTENT_KINDS[kind]
+
+
+def detect_format(filename: Optional[str], fmt: Optional[str] = None) -> str:
+    """Resolve the file format from an explicit value or the file extension"""
+    if fmt:
+        fmt = fmt.lower()
+    elif filename and filename.lower().endswith(".csv"):
+        fmt = "csv"
+    else:
+        fmt = "jsonl"
+    if fmt not in SUPPORTED_FORMATS:
+        raise ContentImportError(
+            f"Unsupported format '{fmt}'. Supported: {', '.join(SUPPORTED_FORMATS)}"
+        )
+    return fmt
+
+
+def iter_raw_rows(lines: Iterable[str], fmt: str) -> Iterator[Tuple[int, Any]]:
+    """Yield (line number, raw row) pairs; undecodable rows yield the exception"""
+    if fmt == "csv":
+        reader = csv.DictReader(lines)
+        for row in reader:
+            # Пустые ячейки CSV трактуем как отсутствующие значения
+            yield reader.line_num, {k: v for k, v in row.items() if v not in ("", None)}
+        return
+
+    for line_no, line in enumerate(lines, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield line_no, json.loads(line)
+        except json.JSONDecodeError as e:
+            yield line_no, e
+
+
+def _to_copy_record(kind: ContentKind, record: BaseModel, seq: int) -> Tuple[Any, ...]:
+    values = record.model_dump()
+    if "keywords" in values:
+        values["keywords"] = json.dumps(values["keywords"], ensure_ascii=False)
+    return (seq,) + tuple(values[column] for column in kind.columns)
+
+
+def iter_validated_batches(
+    kind: ContentKind,
+    lines: Iterable[str],
+    fmt: str,
+    report: ImportReport,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    strict: bool = False,
+) -> Iterator[List[Tuple[Any, ...]]]:
+    """Validate rows and group them into COPY-ready batches"""
+    batch: List[Tuple[Any, ...]] = []
+    for line_no, raw in iter_raw_rows(lines, fmt):
+        report.total_rows += 1
+        try:
+            if isinstance(raw, Exception):
+                raise raw
+            if not isinstance(raw, dict):
+                raise ValueError("row must be an object")
+            record = kind.record_model.model_validate(raw)
+        except (ValidationError, ValueError) as e:
+            message = (
+                "; ".join(
+                    f"{'.'.join(str(p) for p in err['loc'])}: {err['msg']}"
+                    for err in e.errors()
+                )
+                if isinstance(e, ValidationError)
+                else str(e)
+            )
+            if strict:
+                raise ContentImportError(f"Line {line_no}: {message}") from e
+            report.add_error(line_no, message)
+            continue
+
+        batch.append(_to_copy_record(kind, record, line_no))
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+
+    if batch:
+        yield batch
+
+
+def _next_batch(batches: Iterator[List[Tuple[Any, ...]]]) -> Optional[List[Tuple[Any, ...]]]:
+    """Read, decode and validate the next batch (runs in a worker thread)"""
+    try:
+        return next(batches, None)
+    except (csv.Error, UnicodeDecodeError) as e:
+        raise ContentImportError(f"Could not read the file: {e}") from e
+
+
+async def import_content(
+    conn: AsyncConnection,
+    kind_name: str,
+    lines: Iterable[str],
+    fmt: str,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    strict: bool = False,
+) -> ImportReport:
+    """
+    Import rows into the content table inside the caller's transaction.
+
+    Rows with an id are upserted (updated on conflict), rows without an id
+    are inserted with a new id from the table sequence. If the same id
+    appears several times in the input, the last occurrence wins.
+    """
+    kind = get_content_kind(kind_name)
+    report = ImportReport(kind=kind_name)
+    staging = f"_import_{kind.table}"
+
+    staging_columns = ", ".join(
+        f"{column} {column_type}"
+        for column, column_type in zip(kind.columns, kind.staging_types)
+    )
+    # Первый execute открывает транзакцию, в которой затем выполняется COPY
+    await conn.execute(
+        text(
+            f"CREATE TEMP TABLE IF NOT EXISTS {staging} "
+            f"(seq integer, {staging_columns}) ON COMMIT DROP"
+        )
+    )
+
+    raw_connection = await conn.get_raw_connection()
+    driver_connection = raw_connection.driver_connection
+    copy_columns = ["seq", *kind.columns]
+
+    # Чтение файла, декодирование и валидация - синхронные и тяжелые для
+    # больших файлов, поэтому каждая пачка готовится в пуле потоков
+    batches = iter_validated_batches(
+        kind, lines, fmt, report, batch_size=batch_size, strict=strict
+    )
+    while True:
+        batch = await run_in_threadpool(_next_batch, batches)
+        if batch is None:
+            break
+        await driver_connection.copy_records_to_table(
+            staging, records=batch, columns=copy_columns
+        )
+
+    target_columns = ", ".join(kind.columns)
+    select_columns = ", ".join(
+        f"COALESCE(id, nextval(pg_get_serial_sequence('{kind.table}', 'id')))"
+        if column == "id"
+        else column
+        for column in kind.columns
+    )
+    update_columns = ", ".join(
+        f"{column} = EXCLUDED.{column}" for column in kind.columns if column != "id"
+    )
+    result = await conn.execute(
+        text(
+            f"""
+            INSERT INTO {kind.table} ({target_columns})
+            SELECT {select_columns}
+            FROM (
+                SELECT DISTINCT ON (COALESCE(id, -seq)) *
+                FROM {staging}
+                ORDER BY COALESCE(id, -seq), seq DESC
+            ) AS deduplicated
+            ORDER BY seq
+            ON CONFLICT (id) DO UPDATE SET {update_columns}
+            RETURNING (xmax = 0) AS inserted
+            """
+        )
+    )
+    for (inserted,) in result:
+        if inserted:
+            report.inserted += 1
+        else:
+            report.updated += 1
+
+    # Явно заданные id не двигают sequence - выравниваем его по максимуму
+    await conn.execute(
+        text(
+            f"SELECT setval(pg_get_serial_sequence('{kind.table}', 'id'), "
+            f"GREATEST((SELECT MAX(id) FROM {kind.table}), 1))"
+        )
+    )
+    await conn.execute(text(f"DROP TABLE IF EXISTS {staging}"))
+
+    logger.info(
+        "Imported %s: %d rows, %d inserted, %d updated, %d errors",
+        kind_name,
+        report.total_rows,
+        report.inserted,
+        report.updated,
+        report.error_count,
+    )
+    return report
+
+
+async def export_content(
+    session: AsyncSession, kind_name: str, fmt: str, batch_size: int = 1000
+) -> AsyncIterator[str]:
+    """Stream a content table as JSONL or CSV text chunks ordered by id"""
+    kind = get_content_kind(kind_name)
+    columns = ", ".join(kind.columns)
+    result = await session.stream(
+        text(f"SELECT {columns} FROM {kind.table} ORDER BY id").execution_options(
+            yield_per=batch_size
+        )
+    )
+
+    if fmt == "csv":
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(kind.columns)
+        async for partition in result.partitions():
+            for row in partition:
+                values = list(row)
+                if "keywords" in kind.columns:
+                    index = kind.columns.index("keywords")
+                    values[index] = ";".join(decode_keywords(values[index]))
+                writer.writerow(values)
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate(0)
+        yield buffer.getvalue()
+        return
+
+    async for partition in result.partitions():
+        chunk = []
+        for row in partition:
+            item = dict(row._mapping)
+            if "keywords" in item:
+                item["keywords"] = decode_keywords(item["keywords"])
+            chunk.append(json.dumps(item, ensure_ascii=False))
+        yield "\n".join(chunk) + "\n"
+
@@ -0,0 +1,10 @@
+"""
+Dependencies for resources owned by the application lifespan
+"""
+
+from fastapi import Request
+
+
+def get_ml_manager(request: Request):
+    """MLServiceManager of this worker (created in main.lifespan)"""
+    return request.app.state.ml_manager
@@ -0,0 +1,63 @@
+"""
+Gunicorn configuration for production (several uvicorn worker processes)
+
+    gunicorn -c gunicorn.conf.py main:app
+
+Every worker imports the app itself (no preload) and creates its own OpenAI
+client, Redis pool and database engines in main.lifespan, so nothing
+opened in one process is used by another. Pool sizes (DB_POOL_SIZE,
+REDIS_MAX_CONNECTIONS) are per worker.
+
+Database migrations run once in the master before any worker is forked;
+workers only check the schema version. With RUN_MIGRATIONS_ON_START=false
+they are expected to have been applied by a release step (python migrate_db.py).
+"""
+
+import multiprocessing
+import os
+import shutil
+
+bind = os.getenv("BIND", "0.0.0.0:8000")
+# Воркеры асинхронные: одного на ядро достаточно
+workers = int(os.getenv("WEB_CONCURRENCY") or multiprocessing.cpu_count())
+worker_class = "uvicorn.workers.UvicornWorker"
+# Запросы к OpenAI длятся до минуты и дольше
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "180"))
+graceful_timeout = int(os.getenv("GUNICORN_GRACEFUL_TIMEOUT", "30"))
+keepalive = int(os.getenv("GUNICORN_KEEPALIVE", "5"))
+# Перезапуск воркера после N запросов (0 - никогда); jitter разносит рестарты
+max_requests = int(os.getenv("GUNICORN_MAX_REQUESTS", "0"))
+max_requests_jitter = int(os.getenv("GUNICORN_MAX_REQUESTS_JITTER", "100"))
+
+# Access log пишет приложение (access_log.py, с выборкой)
+accesslog = None
+errorlog = "-"
+loglevel = os.getenv("LOG_LEVEL", "info").lower()
+
+PROMETHEUS_MULTIPROC_DIR = os.getenv("PROMETHEUS_MULTIPROC_DIR")
+RUN_MIGRATIONS_ON_START = os.getenv("RUN_MIGRATIONS_ON_START", "true").lower() in ("1", "true", "yes")
+
+
+def on_starting(server):
+    """Start with an empty Prometheus directory and an up-to-date schema"""
+    if PROMETHEUS_MULTIPROC_DIR:
+        shutil.rmtree(PROMETHEUS_MULTIPROC_DIR, ignore_errors=True)
+        os.makedirs(PROMETHEUS_MULTIPROC_DIR, exist_ok=True)
+
+    # Миграции до fork: воркеры, ожидающие блокировку миграций внутри
+    # транзакции, блокировали бы CREATE INDEX CONCURRENTLY (deadlock)
+    if RUN_MIGRATIONS_ON_START:
+        from migrate_db import run_migrations
+
+        version = run_migrations()
+        server.log.info(f"Database schema version: {version}")
+    # Наследуется воркерами: в lifespan только проверка версии (startup.py)
+    os.environ["DB_MIGRATIONS_APPLIED"] = "1"
+
+
+def child_exit(server, worker):
+    """Drop live gauges (in-flight requests, pool usage) of an exited worker"""
+    if PROMETHEUS_MULTIPROC_DIR:
+        from prometheus_client import multiprocess
+
+        multiprocess.mark_process_dead(worker.pid)
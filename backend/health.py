@@ -0,0 +1,211 @@
+"""
+Health checks
+
+- GET /api/health/live: the process is up and serving requests (no I/O)
+- GET /api/health/ready: 200 if the required dependencies were reachable at
+  the last probe, else 503
+- GET /api/health: status of every dependency with latency and last error
+
+Dependencies are probed by a background task every HEALTH_CHECK_INTERVAL
+seconds over the regular pooled connections. The endpoints only read the
+cached result, so load balancer probes cost no connections or queries.
+"""
+
+import asyncio
+import logging
+import os
+import time
+from dataclasses import asdict, dataclass
+from typing import Awaitable, Callable, Dict, Optional
+
+from fastapi import APIRouter, Request
+from fastapi.responses import JSONResponse
+
+logger = logging.getLogger(__name__)
+
+HEALTH_CHECK_INTERVAL = float(os.getenv("HEALTH_CHECK_INTERVAL", "5"))
+HEALTH_CHECK_TIMEOUT = float(os.getenv("HEALTH_CHECK_TIMEOUT", "2"))
+# OpenAI проверяется реже: запрос к API (без токенов), 0 - не проверять
+HEALTH_OPENAI_INTERVAL = float(os.getenv("HEALTH_OPENAI_INTERVAL", "60"))
+# Без этих зависимостей сервис не готов принимать трафик; остальные
+# (Redis, OpenAI) имеют обходные пути и только понижают статус до degraded
+HEALTH_REQUIRED = frozenset(
+    name.strip()
+    for name in os.getenv("HEALTH_REQUIRED", "database").split(",")
+    if name.strip()
+)
+# Результат старше этого считается неизвестным (прокси завис)
+HEALTH_STALE_AFTER = HEALTH_CHECK_INTERVAL * 3
+
+
+@dataclass
+class ComponentStatus:
+    ok: bool
+    latency_ms: float
+    checked_at: float
+    error: Optional[str] = None
+
+
+class HealthProber:
+    """Periodically checks dependencies and keeps the latest result of each"""
+
+    def __init__(self):
+        self._checks: Dict[str, Callable[[], Awaitable[None]]] = {}
+        self._intervals: Dict[str, float] = {}
+        self.results: Dict[str, ComponentStatus] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    def add_check(
+        self, name: str, check: Callable[[], Awaitable[None]], interval: Optional[float] = None
+    ):
+        self._checks[name] = check
+        self._intervals[name] = interval or HEALTH_CHECK_INTERVAL
+
+    async def start(self):
+        if self._task is None:
+            # Первая проверка до приема трафика, чтобы ready не начинал с 503
+            await self.probe()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(HEALTH_CHECK_INTERVAL)
+            try:
+                await self.probe()
+            except Exception as e:
+                logger.error(f"Health probe failed: {e}")
+
+    async def probe(self):
+        """Run every check that is due, concurrently"""
+        now = time.time()
+        due = [
+            name
+            for name in self._checks
+            if name not in self.results
+            or now - self.results[name].checked_at >= self._intervals[name] - 0.5
+        ]
+        results = await asyncio.gather(*(self._check(name) for name in due))
+        for name, result in zip(due, results):
+            previous = self.results.get(name)
+            if previous is not None and previous.ok != result.ok:
+                log = logger.info if result.ok else logger.warning
+                log(f"Health: {name} is {'up' if result.ok else 'down'} ({result.error or 'ok'})")
+            self.results[name] = result
+
+    async def _check(self, name: str) -> ComponentStatus:
+        start = time.perf_counter()
+        error = None
+        try:
+            await asyncio.wait_for(self._checks[name](), timeout=HEALTH_CHECK_TIMEOUT)
+        except asyncio.TimeoutError:
+            error = f"timeout after {HEALTH_CHECK_TIMEOUT}s"
+        except Exception as e:
+            error = str(e) or type(e).__name__
+        return ComponentStatus(
+            ok=error is None,
+            latency_ms=round((time.perf_counter() - start) * 1000, 1),
+            checked_at=time.time(),
+            error=error,
+        )
+
+    def is_ok(self, name: str) -> bool:
+        result = self.results.get(name)
+        return (
+            result is not None
+            and result.ok
+            and time.time() - result.checked_at <= max(HEALTH_STALE_AFTER, self._intervals[name] * 2)
+        )
+
+    def ready(self) -> bool:
+        return all(self.is_ok(name) for name in HEALTH_REQUIRED if name in self._checks)
+
+    def snapshot(self) -> Dict[str, Dict]:
+        return {name: asdict(result) for name, result in self.results.items()}
+
+
+prober = HealthProber()
+router = APIRouter()
+
+
+@router.get("/live")
+async def liveness():
+    """The process is up (no dependency checks)"""
+    return {"status": "alive"}
+
+
+@router.get("/ready")
+async def readiness():
+    """Required dependencies were reachable at the last probe"""
+    if prober.ready():
+        return {"status": "ready"}
+    return JSONResponse(status_code=503, content={"status": "not_ready"})
+
+
+def _legacy_status(name: str) -> str:
+    result = prober.results.get(name)
+    if result is None:
+        return "unknown"
+    return "connected" if result.ok else f"error: {result.error}"
+
+
+@router.get("")
+async def health_check(request: Request):
+    """Detailed health from the last background probe"""
+    from startup import STARTUP_TIMINGS
+
+    ml_manager = request.app.state.ml_manager
+
+    if not prober.ready():
+        overall = "unhealthy"
+    elif all(prober.is_ok(name) for name in prober.results):
+        overall = "healthy"
+    else:
+        overall = "degraded"
+    return {
+        "status": overall,
+        "database": _legacy_status("database"),
+        "redis": _legacy_status("redis"),
+        "ml_service": "initialized" if ml_manager.client else "not_configured",
+        "checks": prober.snapshot(),
+        "startup": STARTUP_TIMINGS,
+    }
+
+
+def register_health_checks(ml_manager):
+    """Register the dependency checks of this worker (called from the lifespan)"""
+    from sqlalchemy import text
+
+    from database import engine, read_engine
+    from redis_client import get_redis
+
+    async def check_database():
+        async with engine.connect() as conn:
+            await conn.execute(text("SELECT 1"))
+
+    async def check_replica():
+        async with read_engine.connect() as conn:
+            await conn.execute(text("SELECT 1"))
+
+    async def check_redis():
+        await get_redis().ping()
+
+    async def check_openai():
+        await ml_manager.client.with_options(
+            timeout=HEALTH_CHECK_TIMEOUT, max_retries=0
+        ).models.retrieve(ml_manager.model_name)
+
+    prober.add_check("database", check_database)
+    if read_engine is not engine:
+        prober.add_check("database_replica", check_replica)
+    prober.add_check("redis", check_redis)
+    if ml_manager.client and HEALTH_OPENAI_INTERVAL > 0:
+        prober.add_check("openai", check_openai, interval=HEALTH_OPENAI_INTERVAL)
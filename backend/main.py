@@ -3,69 +3,34 @@ ProDentAI Backend API
 FastAPI application with all endpoints
 """
 
-import importlib.util
 import logging
 import os
-import sys
-import time
+from contextlib import asynccontextmanager
 
 import uvicorn
-from database import get_db, init_db
+from database import engine, read_engine
 from dotenv import load_dotenv
-from fastapi import Depends, FastAPI, Request, status
+from fastapi import FastAPI, Request
 from fastapi.exceptions import RequestValidationError
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
 from fastapi.security import HTTPBearer
 from pydantic import ValidationError
-from pydantic import ValidationError
 
 # Load environment variables FIRST, before importing MLServiceManager
 load_dotenv()
 
-# Настройка подробного логирования
-LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
-LOG_FORMAT = (
-    "%(asctime)s - %(name)s - %(levelname)s - [%(filename)s:%(lineno)d] - %(message)s"
-)
+# Логирование через очередь: запись в stdout идет в отдельном потоке
+from access_log import LOG_LEVEL, AccessLogMiddleware, setup_logging  # noqa: E402
 
-logging.basicConfig(
-    level=getattr(logging, LOG_LEVEL, logging.INFO),
-    format=LOG_FORMAT,
-    datefmt="%Y-%m-%d %H:%M:%S",
-    handlers=[
-        logging.StreamHandler(sys.stdout),
-    ],
-)
+setup_logging()
 
 # Создаем логгер для приложения
 logger = logging.getLogger(__name__)
 logger.info("Logging configured with level: %s", LOG_LEVEL)
 
-# Импорт shared модулей - проверяем разные пути ПЕРЕД импортом роутеров
-# В Docker: /app - это WORKDIR (соответствует ./backend на хосте)
-# /shared - это volume (соответствует ./shared на хосте)
-if os.path.exists("/shared"):
-    # Docker: volume монтируется в /shared
-    sys.path.insert(0, "/shared")
-    import types
-
-    if "shared" not in sys.modules:
-        shared_module = types.ModuleType("shared")
-        sys.modules["shared"] = shared_module
-
-    spec = importlib.util.spec_from_file_location(
-        "ml_services", "/shared/ml_services.py"
-    )
-    ml_services = importlib.util.module_from_spec(spec)
-    spec.loader.exec_module(ml_services)
-    sys.modules["ml_services"] = ml_services
-    sys.modules["shared"].ml_services = ml_services
-    MLServiceManager = ml_services.MLServiceManager
-else:
-    # Локальная разработка
-    sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
-    from shared.ml_services import MLServiceManager
+# shared/ (ml_services, db_engine, tracing) добавлен в sys.path модулем database
+from ml_services import MLServiceManager  # noqa: E402
 
 from routers import (
     auth,
@@ -74,10 +39,56 @@ from routers import (
     psychology,
     reminders,
     risk_assessment,
+    usage,
     users,
 )
 from sqlalchemy.exc import IntegrityError
-from sqlalchemy.ext.asyncio import AsyncSession
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Per-worker resources: created after the worker process starts and
+    closed when it stops, so nothing is shared across forked workers.
+    """
+    from redis_client import close_redis, get_redis
+    from startup import run_startup
+
+    ml_manager = MLServiceManager()
+    ml_manager.add_call_observer(observe_ai_call)
+    ml_manager.add_call_observer(usage_recorder.observe)
+    app.state.ml_manager = ml_manager
+    app.state.redis = get_redis()
+    app.state.db_engine = engine
+    app.state.read_db_engine = read_engine
+    register_health_checks(ml_manager)
+
+    # Миграции и прогрев (пулы БД и Redis, OpenAI, кэш фактов) - параллельно,
+    # с разбивкой времени по фазам в логе
+    await run_startup(ml_manager)
+    await usage_recorder.start()
+    await prober.start()
+
+    if ml_manager.client:
+        logger.info(
+            f"✅ ML Service initialized with OpenAI API (model: {ml_manager.model_name})"
+        )
+    else:
+        logger.warning("⚠️ ML Service not configured - using fallback responses")
+
+    try:
+        yield
+    finally:
+        await prober.stop()
+        # Буфер учета AI пишется в БД - до закрытия пулов
+        await usage_recorder.stop()
+        shutdown_tracing()
+        await ml_manager.aclose()
+        await close_redis()
+        await engine.dispose()
+        if read_engine is not engine:
+            await read_engine.dispose()
+
 
 # Initialize FastAPI app
 app = FastAPI(
@@ -86,58 +97,12 @@ app = FastAPI(
     version="1.0.0",
     docs_url="/docs",
     redoc_url="/redoc",
+    lifespan=lifespan,
 )
 
 
-# Middleware для логирования запросов
-@app.middleware("http")
-async def log_requests(request: Request, call_next):
-    """Логирование всех HTTP запросов"""
-    start_time = time.time()
-
-    # Логируем входящий запрос
-    client_host = request.client.host if request.client else "unknown"
-    logger.info(
-        "→ %s %s | Client: %s | Query: %s",
-        request.method,
-        request.url.path,
-        client_host,
-        dict(request.query_params),
-    )
-
-    # Логируем заголовки (без чувствительных данных)
-    headers_to_log = {
-        k: v
-        for k, v in request.headers.items()
-        if k.lower() not in ["authorization", "cookie"]
-    }
-    logger.debug("Request headers: %s", headers_to_log)
-
-    try:
-        response = await call_next(request)
-        process_time = time.time() - start_time
-
-        # Логируем ответ
-        logger.info(
-            "← %s %s | Status: %d | Time: %.3fs",
-            request.method,
-            request.url.path,
-            response.status_code,
-            process_time,
-        )
-
-        return response
-    except Exception as e:
-        process_time = time.time() - start_time
-        logger.error(
-            "✗ %s %s | Error: %s | Time: %.3fs",
-            request.method,
-            request.url.path,
-            str(e),
-            process_time,
-            exc_info=True,
-        )
-        raise
+# Access log: медленные запросы и ошибки всегда, остальные - выборочно
+app.add_middleware(AccessLogMiddleware)
 
 
 # CORS middleware
@@ -161,8 +126,27 @@ app.add_middleware(
 # Security
 security = HTTPBearer()
 
-# Initialize ML services
-ml_manager = MLServiceManager()
+# ML services (MLServiceManager) создаются в lifespan каждого воркера:
+# в обработчиках - Depends(get_ml_manager)
+
+# Prometheus: /metrics, латентность по маршрутам, пул БД, вызовы OpenAI
+from metrics import observe_ai_call, setup_metrics  # noqa: E402
+
+setup_metrics(app)
+
+# Учет токенов OpenAI по функциям и пользователям (пакетная запись в ai_usage)
+from ai_usage import usage_recorder  # noqa: E402
+
+# Трассировка (OpenTelemetry, если установлен и OTEL_TRACES_EXPORTER != none):
+# входящие запросы, SQL-запросы, исходящие httpx и вызовы OpenAI
+from db_engine import _engines  # noqa: E402
+from tracing import setup_tracing, shutdown_tracing  # noqa: E402
+
+setup_tracing("prodentai-backend", app=app, engines=_engines.values())
+
+# Health: /api/health/live, /api/health/ready и /api/health из фоновой проверки
+from health import prober, register_health_checks  # noqa: E402
+from health import router as health_router  # noqa: E402
 
 # Global exception handlers
 # Request уже импортирован выше
@@ -188,8 +172,10 @@ async def value_error_handler(request: Request, exc: ValueError):
 async def validation_exception_handler(request: Request, exc: RequestValidationError):
     """Handle request validation errors with detailed logging"""
     logger.error(
-        f"RequestValidationError: {exc.errors()} | Path: {request.url.path} | "
-        f"Method: {request.method} | Headers: {dict(request.headers)}"
+        "RequestValidationError: %s | Path: %s | Method: %s",
+        exc.errors(),
+        request.url.path,
+        request.method,
     )
     return JSONResponse(
         status_code=422,
@@ -223,35 +209,8 @@ app.include_router(nutrition.router, prefix="/api/nutrition", tags=["Nutrition"]
 app.include_router(psychology.router, prefix="/api/psychology", tags=["Psychology"])
 app.include_router(reminders.router, prefix="/api/reminders", tags=["Reminders"])
 app.include_router(facts.router, prefix="/api/facts", tags=["Facts"])
-
-
-@app.on_event("startup")
-async def startup_event():
-    """Initialize database and ML models on startup"""
-    import logging
-
-    logging.basicConfig(level=logging.INFO)
-
-    # Сначала создаем таблицы (если их нет)
-    await init_db()
-    logger.info("Database tables created/verified")
-
-    # Затем запускаем миграции (для добавления недостающих колонок в существующие таблицы)
-    try:
-        from migrate_db import migrate_database
-        await migrate_database()
-        logger.info("Database migrations completed")
-    except Exception as e:
-        logger.warning(f"Migration check failed (may be expected): {e}")
-    await ml_manager.initialize_models()
-
-    # Log ML service status
-    if ml_manager.client:
-        logging.info(
-            f"✅ ML Service initialized with OpenAI API (model: {ml_manager.model_name})"
-        )
-    else:
-        logging.warning("⚠️ ML Service not configured - using fallback responses")
+app.include_router(usage.router, prefix="/api/usage", tags=["AI Usage"])
+app.include_router(health_router, prefix="/api/health", tags=["Health"])
 
 
 @app.get("/")
@@ -264,38 +223,14 @@ async def root():
     }
 
 
-@app.get("/api/health")
-async def health_check(db: AsyncSession = Depends(get_db)):
-    """Detailed health check"""
-    try:
-        # Check database connection
-        from sqlalchemy import text
-        await db.execute(text("SELECT 1"))
-        db_status = "connected"
-    except Exception as e:
-        db_status = f"error: {str(e)}"
-
-    try:
-        # Check Redis connection (if needed)
-        import redis.asyncio as aioredis
-
-        # In Docker: use "redis://redis:6379" (service name)
-        # Locally: use "redis://localhost:6379"
-        redis_url = os.getenv("REDIS_URL", "redis://localhost:6379")
-        redis_client = aioredis.from_url(redis_url)
-        await redis_client.ping()
-        await redis_client.close()
-        redis_status = "connected"
-    except Exception as e:
-        redis_status = f"error: {str(e)}"
+@app.get("/api/metrics/db-pool")
+async def db_pool_metrics():
+    """Connection pool gauges and checkout latency"""
+    from db_engine import pool_stats
 
-    return {
-        "status": "healthy",
-        "database": db_status,
-        "redis": redis_status,
-        "ml_service": "initialized" if ml_manager.client else "not_configured",
-    }
+    return {"pools": pool_stats()}
 
 
 if __name__ == "__main__":
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+    # Локальный запуск, один процесс. Production: gunicorn -c gunicorn.conf.py main:app
+    uvicorn.run(app, host="0.0.0.0", port=8000, access_log=False)
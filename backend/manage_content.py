@@ -0,0 +1,93 @@
+"""
+Content management CLI
+Bulk import/export of facts and braces FAQ
+
+Usage:
+    python manage_content.py import facts facts.jsonl
+    python manage_content.py import braces_faq faq.csv --strict
+    python manage_content.py export facts facts.csv
+    python manage_content.py seed-facts
+"""
+import argparse
+import asyncio
+import json
+import sys
+
+from content_io import CONTENT_KINDS, detect_format, export_content, import_content
+from database import AsyncSessionLocal, engine
+
+
+async def run_import(kind: str, path: str, fmt: str, strict: bool, batch_size: int):
+    with open(path, encoding="utf-8-sig", newline="") as source:
+        async with engine.begin() as conn:
+            report = await import_content(
+                conn, kind, source, fmt, batch_size=batch_size, strict=strict
+            )
+    print(json.dumps(report.as_dict(), ensure_ascii=False, indent=2))
+
+
+async def run_export(kind: str, path: str, fmt: str):
+    rows = 0
+    with open(path, "w", encoding="utf-8", newline="") as target:
+        async with AsyncSessionLocal() as session:
+            async for chunk in export_content(session, kind, fmt):
+                target.write(chunk)
+                rows += chunk.count("\n")
+    print(f"✓ Exported {kind} to {path} ({rows} lines)")
+
+
+async def run_seed_facts():
+    """Load the built-in DEFAULT_FACTS into the facts table"""
+    from routers.facts import DEFAULT_FACTS
+
+    lines = (json.dumps(fact, ensure_ascii=False) for fact in DEFAULT_FACTS)
+    async with engine.begin() as conn:
+        report = await import_content(conn, "facts", lines, "jsonl", strict=True)
+    print(f"✓ Seeded facts: {report.inserted} inserted, {report.updated} updated")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="ProDentAI content import/export")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    import_parser = subparsers.add_parser("import", help="Import a JSONL/CSV file")
+    import_parser.add_argument("kind", choices=sorted(CONTENT_KINDS))
+    import_parser.add_argument("path")
+    import_parser.add_argument("--format", choices=["jsonl", "csv"])
+    import_parser.add_argument("--strict", action="store_true")
+    import_parser.add_argument("--batch-size", type=int, default=5000)
+
+    export_parser = subparsers.add_parser("export", help="Export to a JSONL/CSV file")
+    export_parser.add_argument("kind", choices=sorted(CONTENT_KINDS))
+    export_parser.add_argument("path")
+    export_parser.add_argument("--format", choices=["jsonl", "csv"])
+
+    subparsers.add_parser("seed-facts", help="Load built-in default facts")
+
+    args = parser.parse_args()
+
+    if args.command == "import":
+        fmt = detect_format(args.path, args.format)
+        coro = run_import(args.kind, args.path, fmt, args.strict, args.batch_size)
+    elif args.command == "export":
+        fmt = detect_format(args.path, args.format)
+        coro = run_export(args.kind, args.path, fmt)
+    else:
+        coro = run_seed_facts()
+
+    async def run():
+        try:
+            await coro
+        finally:
+            await engine.dispose()
+
+    asyncio.run(run())
+    return 0
+
+
+if __name__ == "__main__":
+    try:
+        sys.exit(main())
+    except Exception as e:
+        print(f"✗ Command failed: {e}")
+        sys.exit(1)
@@ -0,0 +1,217 @@
+"""
+Prometheus metrics for the backend
+
+HTTP request latency by route template and status, in-flight requests,
+database pool usage and OpenAI call latency/tokens by feature, exposed on
+GET /metrics.
+
+With several worker processes set PROMETHEUS_MULTIPROC_DIR to an empty
+directory (cleared on deploy): every worker writes its samples there and
+/metrics aggregates all of them, whichever worker serves the scrape.
+"""
+
+import os
+import time
+from typing import Dict, Tuple
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+)
+from prometheus_client import multiprocess
+from starlette.requests import Request
+from starlette.responses import Response
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+MULTIPROCESS = bool(os.getenv("PROMETHEUS_MULTIPROC_DIR"))
+
+# Интервал обновления метрик пула соединений (не на каждый запрос)
+POOL_SYNC_INTERVAL = 5.0
+
+# Пути, которые не учитываем (сам сбор метрик)
+EXCLUDED_PATHS = {"/metrics"}
+
+HTTP_REQUESTS = Counter(
+    "http_requests_total",
+    "HTTP requests",
+    ["method", "route", "status"],
+)
+HTTP_LATENCY = Histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency",
+    ["method", "route", "status"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0),
+)
+HTTP_IN_FLIGHT = Gauge(
+    "http_requests_in_flight",
+    "HTTP requests being processed",
+    ["method"],
+    multiprocess_mode="livesum",
+)
+
+DB_POOL_IN_USE = Gauge(
+    "db_pool_connections_in_use",
+    "Checked out database connections",
+    ["pool"],
+    multiprocess_mode="livesum",
+)
+DB_POOL_IDLE = Gauge(
+    "db_pool_connections_idle",
+    "Idle database connections in the pool",
+    ["pool"],
+    multiprocess_mode="livesum",
+)
+DB_POOL_OVERFLOW = Gauge(
+    "db_pool_connections_overflow",
+    "Database connections opened above pool_size",
+    ["pool"],
+    multiprocess_mode="livesum",
+)
+DB_POOL_CHECKOUTS = Counter(
+    "db_pool_checkouts_total", "Connection checkouts", ["pool"]
+)
+DB_POOL_CHECKOUT_TIMEOUTS = Counter(
+    "db_pool_checkout_timeouts_total", "Connection checkouts that timed out", ["pool"]
+)
+DB_POOL_CHECKOUT_ERRORS = Counter(
+    "db_pool_checkout_errors_total", "Connection checkouts that failed to connect", ["pool"]
+)
+DB_POOL_CHECKOUT_WAIT = Counter(
+    "db_pool_checkout_wait_seconds_total", "Time spent waiting for a connection", ["pool"]
+)
+
+OPENAI_LATENCY = Histogram(
+    "openai_request_duration_seconds",
+    "OpenAI chat completion latency",
+    ["feature", "model", "outcome"],
+    buckets=(0.25, 0.5, 1.0, 2.0, 3.0, 5.0, 7.5, 10.0, 15.0, 20.0, 30.0, 60.0, 120.0),
+)
+OPENAI_TOKENS = Counter(
+    "openai_tokens_total",
+    "OpenAI tokens used",
+    ["feature", "model", "kind"],
+)
+
+AI_QUOTA_REJECTIONS = Counter(
+    "ai_quota_rejections_total",
+    "AI requests rejected by the per-user daily quota",
+    ["feature"],
+)
+
+
+class PrometheusMiddleware:
+    """ASGI middleware recording request count, latency and in-flight requests"""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or scope["path"] in EXCLUDED_PATHS:
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        status_code = 500
+        start = time.perf_counter()
+
+        async def send_wrapper(message: Message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        in_flight = HTTP_IN_FLIGHT.labels(method)
+        in_flight.inc()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            in_flight.dec()
+            # Шаблон маршрута (/api/risks/history/{user_id}), а не сам путь -
+            # иначе число временных рядов растет с числом пользователей
+            route = scope.get("route")
+            route_path = getattr(route, "path", None) or "unmatched"
+            status = str(status_code)
+            HTTP_REQUESTS.labels(method, route_path, status).inc()
+            HTTP_LATENCY.labels(method, route_path, status).observe(
+                time.perf_counter() - start
+            )
+            sync_pool_metrics()
+
+
+_pool_synced_at = 0.0
+# pool -> (checkouts, timeouts, wait_seconds_total) на момент прошлой синхронизации
+_pool_totals: Dict[str, Tuple[int, int, float, int]] = {}
+
+
+def sync_pool_metrics(force: bool = False):
+    """Copy this process's pool gauges and counter deltas into Prometheus metrics"""
+    global _pool_synced_at
+    now = time.monotonic()
+    if not force and now - _pool_synced_at < POOL_SYNC_INTERVAL:
+        return
+    _pool_synced_at = now
+
+    from db_engine import _engines
+
+    for name, engine in _engines.items():
+        pool = engine.sync_engine.pool
+        DB_POOL_IN_USE.labels(name).set(pool.checkedout())
+        DB_POOL_IDLE.labels(name).set(pool.checkedin())
+        DB_POOL_OVERFLOW.labels(name).set(max(pool.overflow(), 0))
+
+        metrics = getattr(pool, "metrics", None)
+        if metrics is None:
+            continue
+        with metrics._lock:
+            totals = (
+                metrics.checkouts,
+                metrics.timeouts,
+                metrics.wait_seconds_total,
+                metrics.errors,
+            )
+        previous = _pool_totals.get(name, (0, 0, 0.0, 0))
+        # Пул мог быть пересоздан (dispose) - тогда считаем с нуля
+        if totals[0] < previous[0]:
+            previous = (0, 0, 0.0, 0)
+        DB_POOL_CHECKOUTS.labels(name).inc(totals[0] - previous[0])
+        DB_POOL_CHECKOUT_TIMEOUTS.labels(name).inc(totals[1] - previous[1])
+        DB_POOL_CHECKOUT_WAIT.labels(name).inc(max(totals[2] - previous[2], 0.0))
+        DB_POOL_CHECKOUT_ERRORS.labels(name).inc(max(totals[3] - previous[3], 0))
+        _pool_totals[name] = totals
+
+
+def observe_ai_call(record):
+    """MLServiceManager call observer: OpenAI latency and tokens by feature"""
+    outcome = "ok" if record.success else "error"
+    OPENAI_LATENCY.labels(record.feature, record.model, outcome).observe(
+        record.latency_seconds
+    )
+    for kind, value in (
+        ("prompt", record.prompt_tokens),
+        ("completion", record.completion_tokens),
+        ("reasoning", record.reasoning_tokens),
+    ):
+        if value:
+            OPENAI_TOKENS.labels(record.feature, record.model, kind).inc(value)
+
+
+async def metrics_endpoint(request: Request) -> Response:
+    """Prometheus text exposition (aggregated over all workers in multiprocess mode)"""
+    sync_pool_metrics(force=True)
+    if MULTIPROCESS:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        data = generate_latest(registry)
+    else:
+        data = generate_latest()
+    return Response(data, media_type=CONTENT_TYPE_LATEST)
+
+
+def setup_metrics(app):
+    """Install the middleware and the /metrics route"""
+    app.add_middleware(PrometheusMiddleware)
+    app.add_route("/metrics", metrics_endpoint, methods=["GET"], include_in_schema=False)
@@ -1,4 +1,5 @@
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, Text, ForeignKey, Float
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, Text, ForeignKey, Float, Index
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from database import Base
@@ -14,6 +15,8 @@ class User(Base):
     first_name = Column(String, nullable=True)
     last_name = Column(String, nullable=True)
     is_active = Column(Boolean, default=True)
+    token_version = Column(Integer, nullable=False, default=0, server_default="0")
+    tokens_revoked_at = Column(DateTime(timezone=True), nullable=True, index=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     
     risk_assessments = relationship("RiskAssessment", back_populates="user")
@@ -26,13 +29,17 @@ class RiskAssessment(Base):
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"))
     risk_data = Column(Text, nullable=True)  # JSON string (legacy)
-    assessment_data = Column(Text, nullable=True)  # JSON string
-    risk_scores = Column(Text, nullable=True)  # JSON string
-    recommendations = Column(Text, nullable=True)  # JSON string or array
+    assessment_data = Column(JSONB, nullable=True)
+    risk_scores = Column(JSONB, nullable=True)
+    recommendations = Column(JSONB, nullable=True)  # array
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     
     user = relationship("User", back_populates="risk_assessments")
 
+    __table_args__ = (
+        Index("ix_risk_assessments_user_id_created_at_id", "user_id", "created_at", "id"),
+    )
+
 class Reminder(Base):
     __tablename__ = "reminders"
     
@@ -48,12 +55,34 @@ class Reminder(Base):
     
     user = relationship("User", back_populates="reminders")
 
+    __table_args__ = (
+        Index("ix_reminders_user_id_created_at_id", "user_id", "created_at", "id"),
+    )
+
+class PsychologyConversation(Base):
+    """Psychology chat conversation with a rolling summary of its older turns"""
+
+    __tablename__ = "psychology_conversations"
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), index=True)
+    session_type = Column(String, nullable=True, default="general")
+    summary = Column(Text, nullable=True)
+    # id последней реплики (psychology_sessions.id), вошедшей в summary
+    summarized_through_id = Column(Integer, nullable=False, default=0, server_default="0")
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+
 class PsychologySession(Base):
+    """One exchange (user message + AI response) of a psychology conversation"""
+
     __tablename__ = "psychology_sessions"
     
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"))
-    messages = Column(Text, nullable=True)  # JSON string (legacy)
+    conversation_id = Column(Integer, ForeignKey("psychology_conversations.id"), nullable=True)
+    messages = Column(JSONB, nullable=True)  # legacy transcript
     session_type = Column(String, nullable=True, default="general")
     user_message = Column(Text, nullable=True)
     ai_response = Column(Text, nullable=True)
@@ -62,6 +91,11 @@ class PsychologySession(Base):
     
     user = relationship("User", back_populates="psychology_sessions")
 
+    __table_args__ = (
+        Index("ix_psychology_sessions_user_id_created_at_id", "user_id", "created_at", "id"),
+        Index("ix_psychology_sessions_conversation_id_id", "conversation_id", "id"),
+    )
+
 
 class Fact(Base):
     __tablename__ = "facts"
@@ -84,9 +118,25 @@ class NutritionLog(Base):
     sugar_content = Column(Float, nullable=True)
     acidity_level = Column(Float, nullable=True)
     health_score = Column(Float, nullable=True)
-    recommendations = Column(Text, nullable=True)  # JSON string or array
+    recommendations = Column(JSONB, nullable=True)  # array
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
+    __table_args__ = (
+        Index("ix_nutrition_logs_user_id_created_at_id", "user_id", "created_at", "id"),
+    )
+
+
+class UserStatsAggregate(Base):
+    """Per-user counters maintained on insert of assessments and nutrition logs"""
+    __tablename__ = "user_stats"
+    
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    total_assessments = Column(Integer, nullable=False, default=0, server_default="0")
+    total_nutrition_logs = Column(Integer, nullable=False, default=0, server_default="0")
+    last_assessment_at = Column(DateTime(timezone=True), nullable=True)
+    risk_level = Column(String, nullable=True)  # low / medium / high по последней оценке
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
 
 class BracesFAQ(Base):
     __tablename__ = "braces_faq"
@@ -99,3 +149,25 @@ class BracesFAQ(Base):
     is_active = Column(Boolean, default=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
+
+class AIUsage(Base):
+    """One OpenAI call: tokens, latency and model, attributed to a feature and user"""
+
+    __tablename__ = "ai_usage"
+
+    id = Column(Integer, primary_key=True)
+    # Без внешнего ключа: журнал пишется пакетами и не должен блокировать users
+    user_id = Column(Integer, nullable=True)
+    feature = Column(String(32), nullable=False)
+    model = Column(String(64), nullable=False)
+    prompt_tokens = Column(Integer, nullable=False, default=0)
+    completion_tokens = Column(Integer, nullable=False, default=0)
+    reasoning_tokens = Column(Integer, nullable=False, default=0)
+    latency_ms = Column(Integer, nullable=False, default=0)
+    success = Column(Boolean, nullable=False, default=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    __table_args__ = (
+        Index("ix_ai_usage_created_at", "created_at"),
+        Index("ix_ai_usage_user_id_created_at", "user_id", "created_at"),
+    )
@@ -0,0 +1,41 @@
+"""
+Shared Redis connection pool
+"""
+
+import os
+from typing import Optional
+
+import redis.asyncio as aioredis
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# In Docker: use "redis://redis:6379" (service name)
+# Locally: use "redis://localhost:6379"
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379")
+REDIS_MAX_CONNECTIONS = int(os.getenv("REDIS_MAX_CONNECTIONS", "50"))
+REDIS_SOCKET_TIMEOUT = float(os.getenv("REDIS_SOCKET_TIMEOUT", "2.0"))
+
+_redis: Optional[aioredis.Redis] = None
+
+
+def get_redis() -> aioredis.Redis:
+    """Return the process-wide Redis client (connections are pooled)"""
+    global _redis
+    if _redis is None:
+        _redis = aioredis.from_url(
+            REDIS_URL,
+            decode_responses=True,
+            max_connections=REDIS_MAX_CONNECTIONS,
+            socket_timeout=REDIS_SOCKET_TIMEOUT,
+            socket_connect_timeout=REDIS_SOCKET_TIMEOUT,
+        )
+    return _redis
+
+
+async def close_redis():
+    """Close the pool (on application shutdown)"""
+    global _redis
+    if _redis is not None:
+        await _redis.aclose()
+        _redis = None
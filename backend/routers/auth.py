@@ -1,5 +1,10 @@
+import asyncio
+import logging
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Optional, Tuple
 
 from database import get_db
 from fastapi import APIRouter, Depends, HTTPException, status
@@ -11,14 +16,40 @@ from pydantic import BaseModel, EmailStr
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from redis_client import get_redis
+from routers.auth_utils import (
+    ACCESS_TOKEN_EXPIRE_MINUTES,
+    is_token_current,
+    revoke_user_tokens,
+    revoked_users,
+)
+
 router = APIRouter()
+logger = logging.getLogger(__name__)
 
 import os
 SECRET_KEY = os.getenv("SECRET_KEY", "your-secret-key-change-in-production-CHANGE-THIS")
 ALGORITHM = "HS256"
-ACCESS_TOKEN_EXPIRE_MINUTES = 30
+# Refresh token продлевается при каждом обновлении (sliding session),
+# но сессия не может жить дольше REFRESH_SESSION_MAX_DAYS с момента входа
+REFRESH_TOKEN_EXPIRE_DAYS = int(os.getenv("REFRESH_TOKEN_EXPIRE_DAYS", "7"))
+REFRESH_SESSION_MAX_DAYS = int(os.getenv("REFRESH_SESSION_MAX_DAYS", "30"))
+
+# bcrypt cost factor. min/max равны default, поэтому хеши с другим cost
+# помечаются как устаревшие и пересчитываются при следующем входе
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", "2"))
+# Сколько вызовов bcrypt может ждать/выполняться в процессе; сверх этого
+# запросы входа сразу получают 503, а не копятся в очереди пула
+PASSWORD_HASH_MAX_PENDING = int(os.getenv("PASSWORD_HASH_MAX_PENDING", "64"))
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__default_rounds=BCRYPT_ROUNDS,
+    bcrypt__min_rounds=BCRYPT_ROUNDS,
+    bcrypt__max_rounds=BCRYPT_ROUNDS,
+)
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="api/auth/token")
 
 
@@ -44,14 +75,63 @@ class UserResponse(BaseModel):
 class Token(BaseModel):
     access_token: str
     token_type: str
+    refresh_token: Optional[str] = None
+    expires_in: Optional[int] = None
+
+
+class RefreshRequest(BaseModel):
+    refresh_token: str
+
+
+@dataclass(frozen=True)
+class TokenPrincipal:
+    """Authenticated caller as described by the access token claims"""
+
+    id: int
+    email: Optional[str]
+    token_version: int = 0
+
 
+# bcrypt отпускает GIL, поэтому хеширование в пуле потоков не блокирует event loop
+_password_executor = ThreadPoolExecutor(
+    max_workers=PASSWORD_HASH_WORKERS, thread_name_prefix="bcrypt"
+)
+_password_pending = 0
 
-def verify_password(plain_password, hashed_password):
-    return pwd_context.verify(plain_password, hashed_password)
+
+async def _run_password_task(func, *args):
+    """Run a bcrypt call on the bounded executor, shedding load when it is backed up"""
+    global _password_pending
+    if _password_pending >= PASSWORD_HASH_MAX_PENDING:
+        logger.warning(f"Password hashing queue is full ({_password_pending} pending)")
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Too many login attempts in progress, try again later",
+            headers={"Retry-After": "1"},
+        )
+    _password_pending += 1
+    try:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(_password_executor, func, *args)
+    finally:
+        _password_pending -= 1
+
+
+async def verify_password(plain_password, hashed_password) -> bool:
+    return await _run_password_task(pwd_context.verify, plain_password, hashed_password)
+
+
+async def verify_and_update_password(
+    plain_password, hashed_password
+) -> Tuple[bool, Optional[str]]:
+    """Verify a password and return a new hash if the stored one is outdated"""
+    return await _run_password_task(
+        pwd_context.verify_and_update, plain_password, hashed_password
+    )
 
 
-def get_password_hash(password):
-    return pwd_context.hash(password)
+async def get_password_hash(password) -> str:
+    return await _run_password_task(pwd_context.hash, password)
 
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
@@ -72,7 +152,7 @@ async def register(user: UserCreate, db: AsyncSession = Depends(get_db)):
     if db_user:
         raise HTTPException(status_code=400, detail="Email already registered")
 
-    hashed_password = get_password_hash(user.password)
+    hashed_password = await get_password_hash(user.password)
     db_user = User(
         email=user.email,
         first_name=user.first_name,
@@ -91,47 +171,254 @@ async def login(
 ):
     result = await db.execute(select(User).where(User.email == form_data.username))
     user = result.scalar_one_or_none()
-    if not user:
+    if not user or not user.hashed_password:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
-    if not verify_password(form_data.password, user.hashed_password):
+    verified, new_hash = await verify_and_update_password(
+        form_data.password, user.hashed_password
+    )
+    if not verified:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
+    if new_hash:
+        # Cost factor изменился - сохраняем пересчитанный хеш
+        user.hashed_password = new_hash
+        await db.commit()
+    return await issue_tokens(build_token_claims(user))
+
+
+@router.post("/refresh", response_model=Token)
+async def refresh_access_token(request: RefreshRequest):
+    """Exchange a refresh token for a new token pair (the old one is consumed)"""
+    invalid_token = HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Invalid refresh token",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+    try:
+        payload = jwt.decode(request.refresh_token, SECRET_KEY, algorithms=[ALGORITHM])
+    except JWTError:
+        raise invalid_token
+    if payload.get("type") != "refresh" or not payload.get("jti"):
+        raise invalid_token
+
+    jti, family = payload["jti"], payload.get("fam")
+    try:
+        redis = get_redis()
+        async with redis.pipeline(transaction=True) as pipe:
+            pipe.getdel(_refresh_key(jti))
+            pipe.exists(_revoked_family_key(family))
+            stored_family, family_revoked = await pipe.execute()
+        if stored_family is None and not family_revoked:
+            # Повторное использование уже обмененного токена - вероятная утечка,
+            # отзываем всю цепочку токенов этой сессии
+            logger.warning(f"Refresh token reuse detected for user {payload.get('uid')}")
+            await _revoke_refresh_family(family)
+        elif stored_family is not None and stored_family != family:
+            # Запись хранилища не соответствует токену - не переносим сессию
+            # в чужую цепочку, отзываем обе
+            logger.warning(
+                f"Refresh token family mismatch for user {payload.get('uid')}"
+            )
+            await _revoke_refresh_family(family)
+            await _revoke_refresh_family(stored_family)
+    except Exception as e:
+        logger.error(f"Refresh token store unavailable: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Session store unavailable",
+        )
+    if stored_family is None or family_revoked or stored_family != family:
+        raise invalid_token
+
+    # Refresh token живет дольше окна кэша отзывов - проверяем по строке пользователя
+    if not await is_token_current(payload["uid"], payload.get("ver", 0)):
+        raise invalid_token
+
+    claims = {
+        "sub": payload.get("sub"),
+        "uid": payload["uid"],
+        "ver": payload.get("ver", 0),
+        "act": True,
+    }
+    return await issue_tokens(claims, family=family, auth_time=payload.get("auth_time"))
+
+
+@router.post("/logout")
+async def logout(request: RefreshRequest):
+    """Revoke the session that the refresh token belongs to"""
+    try:
+        payload = jwt.decode(request.refresh_token, SECRET_KEY, algorithms=[ALGORITHM])
+    except JWTError:
+        raise HTTPException(status_code=400, detail="Invalid refresh token")
+    if payload.get("type") == "refresh":
+        try:
+            await _revoke_refresh_family(payload.get("fam"))
+            await get_redis().delete(_refresh_key(payload.get("jti")))
+        except Exception as e:
+            logger.error(f"Could not revoke refresh token: {e}")
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Session store unavailable",
+            )
+    return {"message": "Logged out"}
+
+
+def _refresh_key(jti: str) -> str:
+    return f"auth:refresh:{jti}"
+
+
+def _revoked_family_key(family: Optional[str]) -> str:
+    return f"auth:refresh_family_revoked:{family}"
+
+
+async def _revoke_refresh_family(family: Optional[str]):
+    if family:
+        await get_redis().set(
+            _revoked_family_key(family),
+            1,
+            ex=REFRESH_SESSION_MAX_DAYS * 24 * 3600,
+        )
+
+
+async def issue_tokens(
+    claims: dict, family: Optional[str] = None, auth_time: Optional[int] = None
+) -> dict:
+    """Create an access token and a rotated refresh token stored in Redis"""
     access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = create_access_token(
-        data={"sub": user.email}, expires_delta=access_token_expires
+        data=claims, expires_delta=access_token_expires
     )
-    return {"access_token": access_token, "token_type": "bearer"}
+    response = {
+        "access_token": access_token,
+        "token_type": "bearer",
+        "expires_in": int(access_token_expires.total_seconds()),
+    }
 
+    now = datetime.utcnow()
+    auth_time = auth_time or int(now.timestamp())
+    session_end = datetime.utcfromtimestamp(auth_time) + timedelta(
+        days=REFRESH_SESSION_MAX_DAYS
+    )
+    refresh_expires = min(now + timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS), session_end)
+    if refresh_expires <= now:
+        return response
 
-async def get_current_user(
-    token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_db)
-):
-    credentials_exception = HTTPException(
+    jti = uuid.uuid4().hex
+    family = family or uuid.uuid4().hex
+    try:
+        await get_redis().set(
+            _refresh_key(jti),
+            family,
+            ex=int((refresh_expires - now).total_seconds()),
+        )
+    except Exception as e:
+        # Без хранилища сессий выдаем только access token
+        logger.error(f"Could not store refresh token: {e}")
+        return response
+
+    response["refresh_token"] = jwt.encode(
+        {
+            **claims,
+            "type": "refresh",
+            "jti": jti,
+            "fam": family,
+            "auth_time": auth_time,
+            "exp": refresh_expires,
+        },
+        SECRET_KEY,
+        algorithm=ALGORITHM,
+    )
+    return response
+
+
+def build_token_claims(user: User) -> dict:
+    """Claims that let authenticated endpoints skip the user lookup"""
+    return {
+        "sub": user.email,
+        "uid": user.id,
+        "ver": user.token_version or 0,
+        "act": bool(user.is_active),
+    }
+
+
+def _credentials_exception() -> HTTPException:
+    return HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
+
+
+async def get_current_principal(token: str = Depends(oauth2_scheme)) -> TokenPrincipal:
+    """Validate the access token without a database round-trip"""
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        email: str = payload.get("sub")
-        if email is None:
-            raise credentials_exception
     except JWTError:
-        raise credentials_exception
-    result = await db.execute(select(User).where(User.email == email))
+        raise _credentials_exception()
+    if payload.get("type") == "refresh":
+        raise _credentials_exception()
+
+    user_id = payload.get("uid")
+    if user_id is None:
+        # Токены старого формата содержат только email
+        return await _get_legacy_principal(payload.get("sub"))
+
+    token_version = payload.get("ver", 0)
+    if not payload.get("act", True) or not await revoked_users.is_token_valid(
+        user_id, token_version
+    ):
+        raise _credentials_exception()
+
+    return TokenPrincipal(
+        id=user_id, email=payload.get("sub"), token_version=token_version
+    )
+
+
+async def _get_legacy_principal(email: Optional[str]) -> TokenPrincipal:
+    from database import AsyncSessionLocal
+
+    if email is None:
+        raise _credentials_exception()
+    async with AsyncSessionLocal() as session:
+        result = await session.execute(
+            select(User.id, User.is_active, User.token_version).where(
+                User.email == email
+            )
+        )
+        row = result.one_or_none()
+    if row is None or not row.is_active or row.token_version:
+        raise _credentials_exception()
+    return TokenPrincipal(id=row.id, email=email, token_version=0)
+
+
+async def get_current_user(
+    principal: TokenPrincipal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_db),
+):
+    """Load the full user row for endpoints that actually need it"""
+    result = await db.execute(select(User).where(User.id == principal.id))
     user = result.scalar_one_or_none()
     if user is None:
-        raise credentials_exception
+        raise _credentials_exception()
     return user
 
 
 @router.get("/me", response_model=UserResponse)
 async def read_users_me(current_user: User = Depends(get_current_user)):
     return current_user
+
+
+@router.post("/logout-all")
+async def logout_all_sessions(
+    current_user: User = Depends(get_current_user), db: AsyncSession = Depends(get_db)
+):
+    """Revoke all tokens issued to the current user"""
+    await revoke_user_tokens(current_user, db)
+    return {"message": "All sessions revoked"}
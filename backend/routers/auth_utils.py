@@ -2,11 +2,21 @@
 Authentication utilities
 """
 
-from fastapi import HTTPException, status
+import asyncio
+import logging
+import os
+import secrets
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Optional, Tuple
+
+from fastapi import Header, HTTPException, status
 from models import User
-from sqlalchemy import select
+from sqlalchemy import or_, select
 from sqlalchemy.ext.asyncio import AsyncSession
 
+logger = logging.getLogger(__name__)
+
 
 async def get_user_by_id(user_id: int, db: AsyncSession) -> User:
     """Get user by ID"""
@@ -20,3 +30,110 @@ async def get_user_by_id(user_id: int, db: AsyncSession) -> User:
     
     return user
 
+
+ADMIN_API_KEY = os.getenv("ADMIN_API_KEY")
+
+
+async def require_admin(x_admin_key: Optional[str] = Header(None)) -> None:
+    """Allow access only to requests carrying the ADMIN_API_KEY header"""
+    if not ADMIN_API_KEY:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN, detail="Admin API is disabled"
+        )
+    if not x_admin_key or not secrets.compare_digest(x_admin_key, ADMIN_API_KEY):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN, detail="Invalid admin key"
+        )
+
+
+# Access token живет столько же; отзывы старше уже не нужны в кэше
+ACCESS_TOKEN_EXPIRE_MINUTES = 30
+
+
+class RevokedUserCache:
+    """
+    TTL cache of disabled users and recent token revocations.
+
+    Holds the users that are inactive or revoked their tokens within the
+    last window_seconds (the access token lifetime: older access tokens
+    have expired anyway), refreshed with a single query once per TTL. Token
+    validation checks this set instead of loading the user row, so a
+    revocation made by another worker takes effect within AUTH_REVOCATION_TTL.
+    Refresh tokens live longer and are checked against the row itself
+    (is_token_current).
+    """
+
+    def __init__(self, ttl_seconds: float, window_seconds: float):
+        self.ttl_seconds = ttl_seconds
+        self.window_seconds = window_seconds
+        self._entries: Dict[int, Tuple[bool, int]] = {}
+        self._expires_at = 0.0
+        self._lock = asyncio.Lock()
+
+    async def _refresh(self):
+        from database import AsyncSessionLocal
+
+        async with self._lock:
+            if time.monotonic() < self._expires_at:
+                return
+            revoked_since = datetime.now(timezone.utc) - timedelta(
+                seconds=self.window_seconds + self.ttl_seconds
+            )
+            try:
+                async with AsyncSessionLocal() as session:
+                    result = await session.execute(
+                        select(User.id, User.is_active, User.token_version).where(
+                            or_(
+                                User.is_active.is_(False),
+                                User.tokens_revoked_at > revoked_since,
+                            )
+                        )
+                    )
+                    self._entries = {
+                        row.id: (bool(row.is_active), row.token_version)
+                        for row in result
+                    }
+            except Exception as e:
+                # Оставляем прежний список и повторим попытку позже
+                logger.error(f"Error refreshing revoked users cache: {e}")
+            self._expires_at = time.monotonic() + self.ttl_seconds
+
+    async def is_token_valid(self, user_id: int, token_version: int) -> bool:
+        """Check an access token's user id and version against the revocation list"""
+        if time.monotonic() >= self._expires_at:
+            await self._refresh()
+        entry = self._entries.get(user_id)
+        if entry is None:
+            return True
+        is_active, current_version = entry
+        return is_active and token_version >= current_version
+
+    def record(self, user_id: int, is_active: bool, token_version: int):
+        """Apply a local revocation immediately, without waiting for the TTL"""
+        self._entries[user_id] = (is_active, token_version)
+
+
+revoked_users = RevokedUserCache(
+    ttl_seconds=float(os.getenv("AUTH_REVOCATION_TTL", "30")),
+    window_seconds=ACCESS_TOKEN_EXPIRE_MINUTES * 60,
+)
+
+
+async def is_token_current(user_id: int, token_version: int) -> bool:
+    """Check a long-lived (refresh) token against the user row"""
+    from database import AsyncSessionLocal
+
+    async with AsyncSessionLocal() as session:
+        result = await session.execute(
+            select(User.is_active, User.token_version).where(User.id == user_id)
+        )
+        row = result.one_or_none()
+    return row is not None and bool(row.is_active) and token_version >= row.token_version
+
+
+async def revoke_user_tokens(user: User, db: AsyncSession) -> None:
+    """Invalidate every token issued to the user so far"""
+    user.token_version = (user.token_version or 0) + 1
+    user.tokens_revoked_at = datetime.now(timezone.utc)
+    await db.commit()
+    revoked_users.record(user.id, bool(user.is_active), user.token_version)
@@ -0,0 +1,243 @@
+"""
+Conversation memory for the psychology chat
+
+Every exchange is appended to psychology_sessions under its conversation.
+The prompt gets the newest exchanges that fit a token budget plus a rolling
+summary of older ones, so prompt size and per-row storage stay bounded no
+matter how long the conversation runs.
+"""
+
+import logging
+import math
+import os
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Sequence
+
+from models import PsychologyConversation, PsychologySession
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+logger = logging.getLogger(__name__)
+
+# Бюджет токенов на историю в промпте (вместе с конспектом)
+HISTORY_TOKEN_BUDGET = int(os.getenv("PSYCHOLOGY_HISTORY_TOKEN_BUDGET", "1500"))
+# Сколько токенов старых реплик вне окна копится до обновления конспекта
+SUMMARY_TRIGGER_TOKENS = int(os.getenv("PSYCHOLOGY_SUMMARY_TRIGGER_TOKENS", "800"))
+# После такой паузы новое сообщение начинает новый разговор
+CONVERSATION_IDLE_HOURS = float(os.getenv("PSYCHOLOGY_CONVERSATION_IDLE_HOURS", "6"))
+# Больше реплик в окно не попадет при любом бюджете
+MAX_WINDOW_TURNS = 40
+
+# Служебные токены на одно сообщение chat-формата
+_MESSAGE_OVERHEAD_TOKENS = 4
+
+
+def estimate_tokens(text: Optional[str]) -> int:
+    """
+    Rough token count without a tokenizer.
+
+    About 3 characters per token for mixed Russian/English text with
+    OpenAI's tokenizers; errs on the high side, which is what a budget needs.
+    """
+    return math.ceil(len(text or "") / 3) + _MESSAGE_OVERHEAD_TOKENS
+
+
+def exchange_messages(turn: PsychologySession) -> List[Dict[str, str]]:
+    messages = []
+    if turn.user_message:
+        messages.append({"role": "user", "content": turn.user_message})
+    if turn.ai_response:
+        messages.append({"role": "assistant", "content": turn.ai_response})
+    return messages
+
+
+def exchange_tokens(turn: PsychologySession) -> int:
+    return estimate_tokens(turn.user_message) + estimate_tokens(turn.ai_response)
+
+
+@dataclass
+class PromptContext:
+    history: List[Dict[str, str]]
+    summary: Optional[str]
+    # Реплики вне окна, еще не вошедшие в конспект
+    unsummarized_tokens: int
+
+
+def window_size(
+    turns_newest_first: Sequence[PsychologySession],
+    summary: Optional[str],
+    budget: int = HISTORY_TOKEN_BUDGET,
+) -> int:
+    """How many of the newest exchanges fit the budget left after the summary"""
+    remaining = budget - (estimate_tokens(summary) if summary else 0)
+    for index, turn in enumerate(turns_newest_first):
+        tokens = exchange_tokens(turn)
+        if index >= MAX_WINDOW_TURNS or tokens > remaining:
+            return index
+        remaining -= tokens
+    return len(turns_newest_first)
+
+
+def fit_to_budget(
+    turns_newest_first: Sequence[PsychologySession],
+    summary: Optional[str],
+    budget: int = HISTORY_TOKEN_BUDGET,
+) -> PromptContext:
+    """Newest exchanges that fit the budget (after the summary), oldest first"""
+    size = window_size(turns_newest_first, summary, budget)
+    history: List[Dict[str, str]] = []
+    for turn in reversed(turns_newest_first[:size]):
+        history.extend(exchange_messages(turn))
+    # Все, что старше окна, попадает в промпт только через конспект
+    overflow_tokens = sum(exchange_tokens(t) for t in turns_newest_first[size:])
+    return PromptContext(history, summary, overflow_tokens)
+
+
+def fit_messages_to_budget(
+    messages: Sequence[Dict[str, str]], budget: int = HISTORY_TOKEN_BUDGET
+) -> List[Dict[str, str]]:
+    """Trim a client-supplied transcript to the newest messages within the budget"""
+    kept: List[Dict[str, str]] = []
+    for message in reversed(messages):
+        tokens = estimate_tokens(message["content"])
+        if tokens > budget:
+            break
+        kept.append(message)
+        budget -= tokens
+    return list(reversed(kept))
+
+
+async def get_or_create_conversation(
+    db: AsyncSession,
+    user_id: int,
+    conversation_id: Optional[int] = None,
+    session_type: str = "general",
+) -> PsychologyConversation:
+    """The requested conversation, else the user's latest active one, else a new one"""
+    conversation = None
+    if conversation_id is not None:
+        conversation = await db.get(PsychologyConversation, conversation_id)
+        if conversation is not None and conversation.user_id != user_id:
+            conversation = None
+    else:
+        idle_since = datetime.now(timezone.utc) - timedelta(hours=CONVERSATION_IDLE_HOURS)
+        result = await db.execute(
+            select(PsychologyConversation)
+            .where(
+                PsychologyConversation.user_id == user_id,
+                PsychologyConversation.session_type == session_type,
+                PsychologyConversation.updated_at >= idle_since,
+            )
+            .order_by(PsychologyConversation.updated_at.desc())
+            .limit(1)
+        )
+        conversation = result.scalar_one_or_none()
+
+    if conversation is None:
+        conversation = PsychologyConversation(user_id=user_id, session_type=session_type)
+        db.add(conversation)
+        await db.flush()
+    return conversation
+
+
+async def load_prompt_context(
+    db: AsyncSession, conversation: PsychologyConversation
+) -> PromptContext:
+    """Summary plus the newest unsummarized exchanges within the token budget"""
+    result = await db.execute(
+        select(PsychologySession)
+        .where(
+            PsychologySession.conversation_id == conversation.id,
+            PsychologySession.id > conversation.summarized_through_id,
+        )
+        .order_by(PsychologySession.id.desc())
+        .limit(MAX_WINDOW_TURNS)
+    )
+    return fit_to_budget(result.scalars().all(), conversation.summary)
+
+
+async def refresh_summary(ml_manager, conversation_id: int):
+    """
+    Fold exchanges that fell out of the prompt window into the summary.
+
+    Runs after the response is sent, with its own session. Exchanges are
+    folded oldest first, a page at a time, and summarized_through_id only
+    advances to the last exchange actually folded. Each update is conditional
+    on the previous summarized_through_id, so concurrent runs for the same
+    conversation cannot fold the same exchanges twice.
+    """
+    from database import AsyncSessionLocal
+
+    async with AsyncSessionLocal() as db:
+        conversation = await db.get(PsychologyConversation, conversation_id)
+        if conversation is None:
+            return
+
+        # Граница окна: самые новые реплики, которые сейчас идут в промпт
+        result = await db.execute(
+            select(PsychologySession)
+            .where(
+                PsychologySession.conversation_id == conversation_id,
+                PsychologySession.id > conversation.summarized_through_id,
+            )
+            .order_by(PsychologySession.id.desc())
+            .limit(MAX_WINDOW_TURNS)
+        )
+        newest = result.scalars().all()
+        size = window_size(newest, conversation.summary)
+        window_start_id = newest[size - 1].id if size else None
+
+        summary = conversation.summary
+        through_id = conversation.summarized_through_id
+        folded_total = 0
+        while True:
+            # Следующая страница вне окна, от старых к новым, начиная с отметки
+            query = select(PsychologySession).where(
+                PsychologySession.conversation_id == conversation_id,
+                PsychologySession.id > through_id,
+            )
+            if window_start_id is not None:
+                query = query.where(PsychologySession.id < window_start_id)
+            result = await db.execute(
+                query.order_by(PsychologySession.id.asc()).limit(MAX_WINDOW_TURNS * 2)
+            )
+            to_fold = result.scalars().all()
+            if not to_fold:
+                break
+            page_full = len(to_fold) == MAX_WINDOW_TURNS * 2
+            if (
+                not folded_total
+                and not page_full
+                and sum(exchange_tokens(t) for t in to_fold) < SUMMARY_TRIGGER_TOKENS
+            ):
+                return
+
+            folded_messages: List[Dict[str, str]] = []
+            for turn in to_fold:
+                folded_messages.extend(exchange_messages(turn))
+            new_summary = await ml_manager.summarize_conversation(summary, folded_messages)
+            if not new_summary:
+                break
+
+            updated = await db.execute(
+                update(PsychologyConversation)
+                .where(
+                    PsychologyConversation.id == conversation_id,
+                    PsychologyConversation.summarized_through_id == through_id,
+                )
+                .values(summary=new_summary, summarized_through_id=to_fold[-1].id)
+            )
+            await db.commit()
+            if updated.rowcount != 1:
+                # Другой запуск уже свернул эти реплики
+                break
+            summary, through_id = new_summary, to_fold[-1].id
+            folded_total += len(to_fold)
+            if not page_full:
+                break
+
+        if folded_total:
+            logger.info(
+                f"Conversation {conversation_id}: folded {folded_total} exchanges into summary"
+            )
@@ -2,15 +2,41 @@
 Facts router
 """
 
+import io
+import os
 import random
-
-from database import get_db
-from fastapi import APIRouter, Depends, HTTPException, status
+import time
+from typing import List, Optional
+
+from ai_usage import ai_quota_guard
+from content_io import (
+    ContentImportError,
+    detect_format,
+    export_content,
+    get_content_kind,
+    import_content,
+)
+from database import ReadSessionLocal, get_db, get_read_db
+from dependencies import get_ml_manager
+from fastapi import (
+    APIRouter,
+    Depends,
+    File,
+    HTTPException,
+    Query,
+    UploadFile,
+    status,
+)
+from fastapi.responses import StreamingResponse
 from models import BracesFAQ, Fact, User
 from pydantic import BaseModel, Field
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from routers.auth import TokenPrincipal, get_current_principal
+from routers.auth_utils import require_admin
+from routers.faq_search import match_faqs
+
 router = APIRouter()
 
 # Default facts database (used when database is empty)
@@ -402,13 +428,36 @@ class BracesFAQResponse(BaseModel):
         from_attributes = True
 
 
+# Активные факты в памяти процесса: /random не читает всю таблицу на каждый запрос
+FACT_POOL_TTL = float(os.getenv("FACT_POOL_TTL", "300"))
+_fact_pool: List[FactResponse] = []
+_fact_pool_loaded_at = 0.0
+
+
+async def load_fact_pool(db: AsyncSession) -> int:
+    """(Re)load active facts into the in-process pool, return their count"""
+    global _fact_pool, _fact_pool_loaded_at
+    result = await db.execute(select(Fact).where(Fact.is_active))
+    _fact_pool = [
+        FactResponse(id=f.id, title=f.title, content=f.content, category=f.category)
+        for f in result.scalars().all()
+    ]
+    _fact_pool_loaded_at = time.monotonic()
+    return len(_fact_pool)
+
+
+def invalidate_fact_pool():
+    global _fact_pool_loaded_at
+    _fact_pool_loaded_at = 0.0
+
+
 @router.get("/random", response_model=FactResponse)
-async def get_random_fact(db: AsyncSession = Depends(get_db)):
+async def get_random_fact(db: AsyncSession = Depends(get_read_db)):
     """Get random hygiene fact"""
-    result = await db.execute(select(Fact).where(Fact.is_active))
-    facts = result.scalars().all()
+    if not _fact_pool_loaded_at or time.monotonic() - _fact_pool_loaded_at > FACT_POOL_TTL:
+        await load_fact_pool(db)
 
-    if not facts:
+    if not _fact_pool:
         # Return random default fact if no facts in database
         fact_data = random.choice(DEFAULT_FACTS)
         return FactResponse(
@@ -418,14 +467,11 @@ async def get_random_fact(db: AsyncSession = Depends(get_db)):
             category=fact_data["category"],
         )
 
-    fact = random.choice(facts)
-    return FactResponse(
-        id=fact.id, title=fact.title, content=fact.content, category=fact.category
-    )
+    return random.choice(_fact_pool)
 
 
 @router.get("/category/{category}")
-async def get_facts_by_category(category: str, db: AsyncSession = Depends(get_db)):
+async def get_facts_by_category(category: str, db: AsyncSession = Depends(get_read_db)):
     """Get facts by category"""
     result = await db.execute(
         select(Fact).where(Fact.category == category, Fact.is_active)
@@ -486,23 +532,13 @@ async def get_fact_categories():
 
 
 @router.get("/braces/search")
-async def search_braces_faq(query: str, db: AsyncSession = Depends(get_db)):
+async def search_braces_faq(query: str, db: AsyncSession = Depends(get_read_db)):
     """Search braces FAQ by query"""
     # Simple keyword search
     result = await db.execute(select(BracesFAQ).where(BracesFAQ.is_active))
     faqs = result.scalars().all()
 
-    # Filter by keywords (simple implementation)
-    matching_faqs = []
-    query_lower = query.lower()
-
-    for faq in faqs:
-        if (
-            query_lower in faq.question.lower()
-            or query_lower in faq.answer.lower()
-            or any(keyword.lower() in query_lower for keyword in faq.keywords or [])
-        ):
-            matching_faqs.append(faq)
+    matching_faqs = match_faqs(faqs, query)
 
     return [
         {
@@ -516,7 +552,7 @@ async def search_braces_faq(query: str, db: AsyncSession = Depends(get_db)):
 
 
 @router.get("/braces/category/{category}")
-async def get_braces_faq_by_category(category: str, db: AsyncSession = Depends(get_db)):
+async def get_braces_faq_by_category(category: str, db: AsyncSession = Depends(get_read_db)):
     """Get braces FAQ by category"""
     result = await db.execute(
         select(BracesFAQ).where(BracesFAQ.category == category, BracesFAQ.is_active)
@@ -573,8 +609,18 @@ class BracesChatResponse(BaseModel):
 
 
 @router.post("/braces/chat", response_model=BracesChatResponse)
-async def braces_chat(request: BracesChatRequest, db: AsyncSession = Depends(get_db)):
+async def braces_chat(
+    request: BracesChatRequest,
+    current_user: TokenPrincipal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_db),
+    ml_manager=Depends(get_ml_manager),
+):
     """Chat with AI assistant about braces"""
+    # Квота AI считается по владельцу токена, а не по user_id из тела запроса
+    if request.user_id != current_user.id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN, detail="Cannot chat on behalf of another user"
+        )
     # Check if user exists
     result = await db.execute(select(User).where(User.id == request.user_id))
     user = result.scalar_one_or_none()
@@ -582,12 +628,11 @@ async def braces_chat(request: BracesChatRequest, db: AsyncSession = Depends(get
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="User not found"
         )
+    await ai_quota_guard(current_user.id, "braces")
 
     # Используем AI API через MLServiceManager
     import logging
 
-    from main import ml_manager
-
     logger = logging.getLogger(__name__)
 
     try:
@@ -619,3 +664,59 @@ async def braces_chat(request: BracesChatRequest, db: AsyncSession = Depends(get
             ai_response = "Я помогу вам с вопросами о брекетах. Опишите вашу проблему более подробно, и я дам конкретные советы."
 
     return BracesChatResponse(response=ai_response)
+
+
+@router.post("/admin/import/{kind}", dependencies=[Depends(require_admin)])
+async def import_content_file(
+    kind: str,
+    file: UploadFile = File(...),
+    format: Optional[str] = Query(None, description="jsonl or csv"),
+    strict: bool = Query(False, description="Abort on the first invalid row"),
+    db: AsyncSession = Depends(get_db),
+):
+    """Bulk import facts or braces FAQ from a JSONL/CSV file (upsert by id)"""
+    try:
+        get_content_kind(kind)
+        fmt = detect_format(file.filename, format)
+        lines = io.TextIOWrapper(file.file, encoding="utf-8-sig", newline="")
+        conn = await db.connection()
+        report = await import_content(conn, kind, lines, fmt, strict=strict)
+        await db.commit()
+    except ContentImportError as e:
+        # Сюда же попадают битый CSV и файл не в UTF-8 (content_io._next_batch)
+        await db.rollback()
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except Exception:
+        await db.rollback()
+        raise
+    # Остальные воркеры подхватят изменения через FACT_POOL_TTL
+    invalidate_fact_pool()
+
+    return report.as_dict()
+
+
+@router.get("/admin/export/{kind}", dependencies=[Depends(require_admin)])
+async def export_content_file(
+    kind: str, format: str = Query("jsonl", description="jsonl or csv")
+):
+    """Stream facts or braces FAQ as a JSONL/CSV file"""
+    try:
+        get_content_kind(kind)
+        fmt = detect_format(None, format)
+    except ContentImportError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+    async def stream():
+        # Сессия открывается внутри генератора: зависимости с yield
+        # закрываются до того, как будет отправлено тело ответа.
+        # Выгрузка читает из реплики, если она настроена
+        async with ReadSessionLocal() as session:
+            async for chunk in export_content(session, kind, fmt):
+                yield chunk
+
+    media_type = "text/csv" if fmt == "csv" else "application/x-ndjson"
+    return StreamingResponse(
+        stream(),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{kind}.{fmt}"'},
+    )
@@ -0,0 +1,44 @@
+"""
+Braces FAQ matching (no database access)
+"""
+
+import json
+from typing import Any, List, Sequence, TypeVar
+
+FAQ = TypeVar("FAQ")
+
+
+def decode_keywords(value: Any) -> List[str]:
+    """Keywords as stored in BracesFAQ.keywords (JSON array text) as a list"""
+    if not value:
+        return []
+    if isinstance(value, list):
+        return value
+    try:
+        decoded = json.loads(value)
+        return decoded if isinstance(decoded, list) else [str(decoded)]
+    except (TypeError, json.JSONDecodeError):
+        return [value]
+
+
+def match_faqs(faqs: Sequence[FAQ], query: str) -> List[FAQ]:
+    """
+    FAQs whose question or answer contains the query, or that have a
+    keyword contained in the query (case-insensitive).
+
+    Works with ORM rows and any objects with question/answer/keywords;
+    keywords are the JSON array text stored in the database.
+    """
+    query_lower = query.lower()
+    matching = []
+    for faq in faqs:
+        if (
+            query_lower in faq.question.lower()
+            or query_lower in faq.answer.lower()
+            or any(
+                keyword.lower() in query_lower
+                for keyword in decode_keywords(faq.keywords)
+            )
+        ):
+            matching.append(faq)
+    return matching
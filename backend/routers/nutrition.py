@@ -1,15 +1,17 @@
-import json
 import os
 import tempfile
 from typing import Optional
 
-from database import get_db
+from ai_usage import ai_quota_guard
+from database import get_db, mark_user_write
+from dependencies import get_ml_manager
 from fastapi import APIRouter, Depends, File, HTTPException, Query, UploadFile
-from models import NutritionLog, User
+from models import NutritionLog
 from pydantic import BaseModel
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from routers.auth import get_current_user
+from routers.auth import TokenPrincipal, get_current_principal
+from routers.stats_utils import record_nutrition_stats
 
 router = APIRouter()
 
@@ -31,13 +33,13 @@ class NutritionAnalysisRequest(BaseModel):
 @router.post("/analyze")
 async def analyze_nutrition(
     request: NutritionAnalysisRequest,
-    current_user: Optional[User] = Depends(get_current_user),
+    current_user: TokenPrincipal = Depends(get_current_principal),
     db: AsyncSession = Depends(get_db),
+    ml_manager=Depends(get_ml_manager),
 ):
     """Analyze nutrition from text description"""
+    await ai_quota_guard(current_user.id, "nutrition")
     try:
-        from main import ml_manager
-
         # Формируем полное описание
         full_description = request.food_description
         if request.accompanying_foods:
@@ -58,10 +60,12 @@ async def analyze_nutrition(
             sugar_content=analysis_result.get("sugar_content", 0),
             acidity_level=analysis_result.get("acidity_level", 7.0),
             health_score=analysis_result.get("health_score", 5.0),
-            recommendations=json.dumps(analysis_result.get("recommendations", [])),
+            recommendations=analysis_result.get("recommendations", []),
         )
         db.add(nutrition_log)
+        await record_nutrition_stats(db, request.user_id)
         await db.commit()
+        await mark_user_write(request.user_id)
 
         # Формируем ответ
         return {
@@ -85,13 +89,13 @@ async def analyze_nutrition(
 async def analyze_nutrition_image(
     file: UploadFile = File(...),
     user_id: int = Query(...),
-    current_user: Optional[User] = Depends(get_current_user),
+    current_user: TokenPrincipal = Depends(get_current_principal),
     db: AsyncSession = Depends(get_db),
+    ml_manager=Depends(get_ml_manager),
 ):
     """Analyze nutrition from uploaded image"""
+    await ai_quota_guard(current_user.id, "nutrition_image")
     try:
-        from main import ml_manager
-
         # Сохраняем файл во временную директорию
         contents = await file.read()
         
@@ -115,10 +119,12 @@ async def analyze_nutrition_image(
                 sugar_content=analysis_result.get("sugar_content", 0),
                 acidity_level=analysis_result.get("acidity_level", 7.0),
                 health_score=analysis_result.get("health_score", 5.0),
-                recommendations=json.dumps(analysis_result.get("recommendations", [])),
+                recommendations=analysis_result.get("recommendations", []),
             )
             db.add(nutrition_log)
+            await record_nutrition_stats(db, user_id)
             await db.commit()
+            await mark_user_write(user_id)
 
             # Формируем ответ
             return {
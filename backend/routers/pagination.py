@@ -0,0 +1,100 @@
+"""
+Keyset pagination and field projection for per-user history endpoints
+"""
+
+import base64
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from fastapi import HTTPException, Response, status
+from sqlalchemy import select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+# Тело ответа остается списком (совместимость с ботом и web),
+# курсор следующей страницы передается в заголовке
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(created_at: datetime, row_id: int) -> str:
+    raw = f"{created_at.isoformat()}|{row_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, row_id = base64.urlsafe_b64decode(padded).decode().split("|")
+        return datetime.fromisoformat(created_at), int(row_id)
+    except (ValueError, UnicodeDecodeError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor"
+        )
+
+
+def parse_fields(
+    fields: Optional[str], allowed: Sequence[str], default: Sequence[str]
+) -> List[str]:
+    """Parse a comma-separated fields= projection against an allow-list"""
+    if not fields:
+        return list(default)
+    requested = [f.strip() for f in fields.split(",") if f.strip()]
+    unknown = [f for f in requested if f not in allowed]
+    if unknown:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unknown fields: {', '.join(unknown)}. Allowed: {', '.join(allowed)}",
+        )
+    return requested
+
+
+async def fetch_history_page(
+    db: AsyncSession,
+    model,
+    filters: Sequence[Any],
+    fields: Sequence[str],
+    cursor: Optional[str],
+    limit: Optional[int],
+    response: Response,
+) -> List[Dict[str, Any]]:
+    """
+    Select one page of rows ordered by (created_at, id) descending.
+
+    Only the projected columns are selected; id and created_at are always
+    read because the cursor is built from them. The cursor of the next page
+    is set in the X-Next-Cursor response header. limit=None selects all
+    remaining rows (no cursor header).
+    """
+    key_columns = [c for c in ("id", "created_at") if c not in fields]
+    columns = [getattr(model, name) for name in (*fields, *key_columns)]
+
+    stmt = select(*columns).where(*filters)
+    if cursor:
+        created_at, row_id = decode_cursor(cursor)
+        stmt = stmt.where(
+            tuple_(model.created_at, model.id) < tuple_(created_at, row_id)
+        )
+    stmt = stmt.order_by(model.created_at.desc(), model.id.desc())
+    if limit is not None:
+        stmt = stmt.limit(limit + 1)
+
+    result = await db.execute(stmt)
+    rows = result.mappings().all()
+
+    if limit is not None and len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(
+            last["created_at"], last["id"]
+        )
+
+    items = []
+    for row in rows:
+        item = {}
+        for name in fields:
+            value = row[name]
+            item[name] = value.isoformat() if isinstance(value, datetime) else value
+        items.append(item)
+    return items
@@ -1,14 +1,23 @@
-import json
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Optional
 
+from ai_usage import ai_quota_guard
 from database import get_db
-from fastapi import APIRouter, Depends, HTTPException
-from models import PsychologySession, User
+from dependencies import get_ml_manager
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException
+from models import PsychologySession
 from pydantic import BaseModel
-from sqlalchemy import select
+from sqlalchemy import func, select
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from routers.auth import get_current_user
+from routers.auth import TokenPrincipal, get_current_principal
+from routers.conversation_memory import (
+    SUMMARY_TRIGGER_TOKENS,
+    exchange_messages,
+    fit_messages_to_budget,
+    get_or_create_conversation,
+    load_prompt_context,
+    refresh_summary,
+)
 
 router = APIRouter()
 
@@ -19,50 +28,74 @@ class Message(BaseModel):
 
 
 class ChatRequest(BaseModel):
-    messages: List[Message]
+    # История хранится на сервере: достаточно прислать последнее сообщение
+    messages: List[Message] = []
+    message: Optional[str] = None
+    session_id: Optional[int] = None
+    session_type: str = "general"
 
 
 class ChatResponse(BaseModel):
     response: str
+    session_id: int
 
 
 @router.post("/chat", response_model=ChatResponse)
 async def chat_with_psychologist(
     chat_request: ChatRequest,
-    current_user: User = Depends(get_current_user),
+    background_tasks: BackgroundTasks,
+    current_user: TokenPrincipal = Depends(get_current_principal),
     db: AsyncSession = Depends(get_db),
+    ml_manager=Depends(get_ml_manager),
 ):
+    await ai_quota_guard(current_user.id, "psychology")
     try:
-        from main import ml_manager
+        # Get user message (explicit field or last message in chat)
+        if chat_request.message is not None:
+            user_message = chat_request.message
+        else:
+            user_message = chat_request.messages[-1].content if chat_request.messages else ""
+
+        conversation = await get_or_create_conversation(
+            db, current_user.id, chat_request.session_id, chat_request.session_type
+        )
+        context = await load_prompt_context(db, conversation)
+        history = context.history
+        if not history and not conversation.summary and len(chat_request.messages) > 1:
+            # Разговор начат клиентом до появления серверной истории
+            history = fit_messages_to_budget(
+                [{"role": m.role, "content": m.content} for m in chat_request.messages[:-1]]
+            )
 
-        # Get user message (last message in chat)
-        user_message = chat_request.messages[-1].content if chat_request.messages else ""
-        
         # Get AI response
-        response = await ml_manager.get_psychology_response(user_message)
-
-        # Save session
-        session = PsychologySession(
-            user_id=current_user.id,
-            messages=json.dumps(
-                [{"role": m.role, "content": m.content} for m in chat_request.messages] 
-                + [{"role": "assistant", "content": response}]
-            ),
-            user_message=user_message,
-            ai_response=response,
-            session_type="general",
+        response = await ml_manager.get_psychology_response(
+            user_message, history=history, summary=context.summary
+        )
+
+        # Save exchange (append-only; the transcript is not copied into every row)
+        db.add(
+            PsychologySession(
+                user_id=current_user.id,
+                conversation_id=conversation.id,
+                user_message=user_message,
+                ai_response=response,
+                session_type=chat_request.session_type,
+            )
         )
-        db.add(session)
+        conversation.updated_at = func.now()
         await db.commit()
 
-        return ChatResponse(response=response)
+        if context.unsummarized_tokens >= SUMMARY_TRIGGER_TOKENS:
+            background_tasks.add_task(refresh_summary, ml_manager, conversation.id)
+
+        return ChatResponse(response=response, session_id=conversation.id)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @router.get("/history")
 async def get_chat_history(
-    current_user: User = Depends(get_current_user), db: AsyncSession = Depends(get_db)
+    current_user: TokenPrincipal = Depends(get_current_principal), db: AsyncSession = Depends(get_db)
 ):
     result = await db.execute(
         select(PsychologySession)
@@ -75,7 +108,8 @@ async def get_chat_history(
     return [
         {
             "id": s.id, 
-            "messages": json.loads(s.messages) if s.messages else [],
+            "session_id": s.conversation_id,
+            "messages": s.messages or exchange_messages(s),
             "created_at": s.created_at.isoformat() if s.created_at else None
         }
         for s in sessions
@@ -4,13 +4,20 @@ Reminders router
 
 from typing import List, Optional
 
-from database import get_db
-from fastapi import APIRouter, Depends, HTTPException, status
+from database import get_db, get_read_db, mark_user_write
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
 from models import Reminder, User
 from pydantic import BaseModel
 from sqlalchemy import delete, select
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from routers.pagination import (
+    DEFAULT_PAGE_SIZE,
+    MAX_PAGE_SIZE,
+    fetch_history_page,
+    parse_fields,
+)
+
 router = APIRouter()
 
 
@@ -71,6 +78,7 @@ async def create_reminder(
 
     db.add(reminder)
     await db.commit()
+    await mark_user_write(reminder_data.user_id)
     await db.refresh(reminder)
 
     return ReminderResponse(
@@ -85,28 +93,43 @@ async def create_reminder(
     )
 
 
+REMINDER_FIELDS = (
+    "id",
+    "reminder_type",
+    "time",
+    "date",
+    "is_active",
+    "message",
+    "created_at",
+)
+
+
 @router.get("/user/{user_id}")
-async def get_user_reminders(user_id: int, db: AsyncSession = Depends(get_db)):
-    """Get user's reminders"""
-    result = await db.execute(
-        select(Reminder)
-        .where(Reminder.user_id == user_id)
-        .order_by(Reminder.created_at.desc())
+async def get_user_reminders(
+    user_id: int,
+    response: Response,
+    cursor: Optional[str] = Query(None, description="Value of X-Next-Cursor"),
+    limit: Optional[int] = Query(
+        None, ge=1, le=MAX_PAGE_SIZE, description="Page size; without cursor/limit all reminders are returned"
+    ),
+    fields: Optional[str] = Query(
+        None, description=f"Comma-separated subset of: {', '.join(REMINDER_FIELDS)}"
+    ),
+    db: AsyncSession = Depends(get_read_db),
+):
+    """Get user's reminders (newest first; keyset-paginated when cursor or limit is given)"""
+    # Бот (fetch_due_reminders_http) и web читают список целиком без курсора
+    if cursor is not None and limit is None:
+        limit = DEFAULT_PAGE_SIZE
+    return await fetch_history_page(
+        db,
+        Reminder,
+        [Reminder.user_id == user_id],
+        parse_fields(fields, REMINDER_FIELDS, REMINDER_FIELDS),
+        cursor,
+        limit,
+        response,
     )
-    reminders = result.scalars().all()
-
-    return [
-        {
-            "id": reminder.id,
-            "reminder_type": reminder.reminder_type,
-            "time": reminder.time,
-            "date": reminder.date,
-            "is_active": reminder.is_active,
-            "message": reminder.message,
-            "created_at": reminder.created_at.isoformat(),
-        }
-        for reminder in reminders
-    ]
 
 
 class ToggleRequest(BaseModel):
@@ -134,6 +157,7 @@ async def toggle_reminder(
         reminder.is_active = not reminder.is_active
     
     await db.commit()
+    await mark_user_write(reminder.user_id)
 
     return {
         "id": reminder.id,
@@ -154,6 +178,7 @@ async def delete_reminder(reminder_id: int, db: AsyncSession = Depends(get_db)):
 
     await db.execute(delete(Reminder).where(Reminder.id == reminder_id))
     await db.commit()
+    await mark_user_write(reminder.user_id)
 
     return {"message": "Reminder deleted successfully"}
 
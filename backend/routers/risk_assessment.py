@@ -3,15 +3,27 @@ Risk assessment router
 """
 
 import json
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Optional
 
-from database import get_db
-from fastapi import APIRouter, Depends, HTTPException, status
+from ai_usage import ai_quota_guard
+from database import get_db, get_read_db, mark_user_write
+from dependencies import get_ml_manager
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
+from ml_services import build_risk_map
 from models import RiskAssessment, User
 from pydantic import BaseModel, Field
-from sqlalchemy import select
+from sqlalchemy import or_, select
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from routers.auth import TokenPrincipal, get_current_principal
+from routers.pagination import (
+    DEFAULT_PAGE_SIZE,
+    MAX_PAGE_SIZE,
+    fetch_history_page,
+    parse_fields,
+)
+from routers.stats_utils import RISK_KEYS, record_assessment_stats
+
 router = APIRouter()
 
 
@@ -34,19 +46,26 @@ class RiskAssessmentResponse(BaseModel):
 
 @router.post("/assess", response_model=RiskAssessmentResponse)
 async def assess_risks(
-    request: RiskAssessmentRequest, db: AsyncSession = Depends(get_db)
+    request: RiskAssessmentRequest,
+    current_user: TokenPrincipal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_db),
+    ml_manager=Depends(get_ml_manager),
 ):
     """Perform risk assessment"""
+    # Квота AI считается по владельцу токена, а не по user_id из тела запроса
+    if request.user_id != current_user.id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN, detail="Cannot assess risks for another user"
+        )
     # Check if user exists and is active
     from routers.auth_utils import get_user_by_id
 
     user = await get_user_by_id(request.user_id, db)
+    await ai_quota_guard(current_user.id, "risk")
 
     # Используем AI API для оценки рисков
     import logging
 
-    from main import ml_manager
-
     logger = logging.getLogger(__name__)
 
     try:
@@ -111,28 +130,7 @@ async def assess_risks(
             "Регулярно используйте зубную нить",
         ]
 
-    risk_map = {
-        "cavity": (
-            "green"
-            if risk_scores["cavity_risk"] < 0.3
-            else "yellow" if risk_scores["cavity_risk"] < 0.6 else "red"
-        ),
-        "gum_disease": (
-            "green"
-            if risk_scores["gum_disease_risk"] < 0.3
-            else "yellow" if risk_scores["gum_disease_risk"] < 0.6 else "red"
-        ),
-        "sensitivity": (
-            "green"
-            if risk_scores["sensitivity_risk"] < 0.3
-            else "yellow" if risk_scores["sensitivity_risk"] < 0.6 else "red"
-        ),
-        "enamel_erosion": (
-            "green"
-            if risk_scores["enamel_erosion_risk"] < 0.3
-            else "yellow" if risk_scores["enamel_erosion_risk"] < 0.6 else "red"
-        ),
-    }
+    risk_map = build_risk_map(risk_scores)
 
     # Save assessment to database
     assessment = RiskAssessment(
@@ -143,7 +141,9 @@ async def assess_risks(
     )
 
     db.add(assessment)
+    await record_assessment_stats(db, request.user_id, risk_scores)
     await db.commit()
+    await mark_user_write(request.user_id)
     await db.refresh(assessment)
 
     return RiskAssessmentResponse(
@@ -156,28 +156,45 @@ async def assess_risks(
     )
 
 
+HISTORY_FIELDS = ("id", "risk_scores", "recommendations", "assessment_data", "created_at")
+DEFAULT_HISTORY_FIELDS = ("id", "risk_scores", "created_at")
+
+
 @router.get("/history/{user_id}")
-async def get_assessment_history(user_id: int, db: AsyncSession = Depends(get_db)):
-    """Get user's assessment history"""
-    result = await db.execute(
-        select(RiskAssessment)
-        .where(RiskAssessment.user_id == user_id)
-        .order_by(RiskAssessment.created_at.desc())
-    )
-    assessments = result.scalars().all()
+async def get_assessment_history(
+    user_id: int,
+    response: Response,
+    cursor: Optional[str] = Query(None, description="Value of X-Next-Cursor"),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    fields: Optional[str] = Query(
+        None, description=f"Comma-separated subset of: {', '.join(HISTORY_FIELDS)}"
+    ),
+    min_risk: Optional[float] = Query(
+        None, ge=0, le=1, description="Only assessments with any risk >= min_risk"
+    ),
+    db: AsyncSession = Depends(get_read_db),
+):
+    """Get user's assessment history (keyset-paginated, newest first)"""
+    filters = [RiskAssessment.user_id == user_id]
+    if min_risk is not None:
+        # Фильтрация по JSONB на стороне базы
+        filters.append(
+            or_(*(RiskAssessment.risk_scores[key].as_float() >= min_risk for key in RISK_KEYS))
+        )
 
-    return [
-        {
-            "id": assessment.id,
-            "risk_scores": assessment.risk_scores,
-            "created_at": assessment.created_at.isoformat(),
-        }
-        for assessment in assessments
-    ]
+    return await fetch_history_page(
+        db,
+        RiskAssessment,
+        filters,
+        parse_fields(fields, HISTORY_FIELDS, DEFAULT_HISTORY_FIELDS),
+        cursor,
+        limit,
+        response,
+    )
 
 
 @router.get("/latest/{user_id}")
-async def get_latest_assessment(user_id: int, db: AsyncSession = Depends(get_db)):
+async def get_latest_assessment(user_id: int, db: AsyncSession = Depends(get_read_db)):
     """Get user's latest assessment"""
     result = await db.execute(
         select(RiskAssessment)
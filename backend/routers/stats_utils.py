@@ -0,0 +1,68 @@
+"""
+User statistics utilities
+Keeps the user_stats aggregate table in sync with assessments and nutrition logs
+"""
+
+import json
+from typing import Any, Optional
+
+from models import UserStatsAggregate
+from sqlalchemy import func
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+RISK_KEYS = ("cavity_risk", "gum_disease_risk", "sensitivity_risk", "enamel_erosion_risk")
+
+
+def compute_risk_level(risk_scores: Any) -> Optional[str]:
+    """Overall risk level from the average of the four risk scores"""
+    if isinstance(risk_scores, str):
+        try:
+            risk_scores = json.loads(risk_scores)
+        except json.JSONDecodeError:
+            return None
+    if not isinstance(risk_scores, dict) or not risk_scores:
+        return None
+
+    avg_risk = sum(float(risk_scores.get(key, 0) or 0) for key in RISK_KEYS) / len(
+        RISK_KEYS
+    )
+    if avg_risk < 0.3:
+        return "low"
+    if avg_risk < 0.6:
+        return "medium"
+    return "high"
+
+
+async def record_assessment_stats(db: AsyncSession, user_id: int, risk_scores: Any):
+    """Count a new assessment; must run in the same transaction as the insert"""
+    risk_level = compute_risk_level(risk_scores)
+    stmt = insert(UserStatsAggregate).values(
+        user_id=user_id,
+        total_assessments=1,
+        last_assessment_at=func.now(),
+        risk_level=risk_level,
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[UserStatsAggregate.user_id],
+        set_={
+            "total_assessments": UserStatsAggregate.total_assessments + 1,
+            "last_assessment_at": stmt.excluded.last_assessment_at,
+            "risk_level": stmt.excluded.risk_level,
+            "updated_at": func.now(),
+        },
+    )
+    await db.execute(stmt)
+
+
+async def record_nutrition_stats(db: AsyncSession, user_id: int):
+    """Count a new nutrition log; must run in the same transaction as the insert"""
+    stmt = insert(UserStatsAggregate).values(user_id=user_id, total_nutrition_logs=1)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[UserStatsAggregate.user_id],
+        set_={
+            "total_nutrition_logs": UserStatsAggregate.total_nutrition_logs + 1,
+            "updated_at": func.now(),
+        },
+    )
+    await db.execute(stmt)
@@ -0,0 +1,87 @@
+"""
+OpenAI usage reports
+"""
+
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from ai_usage import estimate_cost, get_daily_usage
+from database import get_read_db
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from models import AIUsage
+from sqlalchemy import Integer, cast, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from routers.auth import TokenPrincipal, get_current_principal
+from routers.auth_utils import require_admin
+
+router = APIRouter()
+
+GROUP_COLUMNS = {
+    "day": func.date_trunc("day", AIUsage.created_at),
+    "feature": AIUsage.feature,
+    "user": AIUsage.user_id,
+    "model": AIUsage.model,
+}
+
+
+@router.get("/summary", dependencies=[Depends(require_admin)])
+async def get_usage_summary(
+    days: int = Query(7, ge=1, le=90),
+    group_by: str = Query("day,feature", description="Comma-separated: day, feature, user, model"),
+    user_id: Optional[int] = Query(None),
+    feature: Optional[str] = Query(None),
+    db: AsyncSession = Depends(get_read_db),
+):
+    """Token usage, latency and estimated cost aggregated by day/feature/user/model"""
+    groups = [g.strip() for g in group_by.split(",") if g.strip()]
+    unknown = [g for g in groups if g not in GROUP_COLUMNS]
+    if unknown:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unknown group_by: {', '.join(unknown)}. Allowed: {', '.join(GROUP_COLUMNS)}",
+        )
+    # Стоимость считается по модели, поэтому модель группируем всегда
+    if "model" not in groups:
+        groups.append("model")
+
+    columns = [GROUP_COLUMNS[g].label(g) for g in groups]
+    stmt = select(
+        *columns,
+        func.count().label("requests"),
+        func.sum(cast(~AIUsage.success, Integer)).label("errors"),
+        func.sum(AIUsage.prompt_tokens).label("prompt_tokens"),
+        func.sum(AIUsage.completion_tokens).label("completion_tokens"),
+        func.sum(AIUsage.reasoning_tokens).label("reasoning_tokens"),
+        func.avg(AIUsage.latency_ms).label("avg_latency_ms"),
+        func.max(AIUsage.latency_ms).label("max_latency_ms"),
+    ).where(AIUsage.created_at >= datetime.now(timezone.utc) - timedelta(days=days))
+    if user_id is not None:
+        stmt = stmt.where(AIUsage.user_id == user_id)
+    if feature is not None:
+        stmt = stmt.where(AIUsage.feature == feature)
+    stmt = stmt.group_by(*columns).order_by(*columns)
+
+    result = await db.execute(stmt)
+    rows = []
+    for row in result.mappings():
+        item = dict(row)
+        if "day" in item and item["day"] is not None:
+            item["day"] = item["day"].date().isoformat()
+        item["avg_latency_ms"] = round(float(item["avg_latency_ms"] or 0), 1)
+        cost = estimate_cost(item["model"], item["prompt_tokens"] or 0, item["completion_tokens"] or 0)
+        item["cost_usd"] = round(cost, 6) if cost is not None else None
+        rows.append(item)
+    return rows
+
+
+@router.get("/me")
+async def get_my_usage(current_user: TokenPrincipal = Depends(get_current_principal)):
+    """Today's AI usage and quotas of the current user"""
+    try:
+        return await get_daily_usage(current_user.id)
+    except Exception:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Usage counters are temporarily unavailable",
+        )
@@ -4,11 +4,11 @@ Users management router
 
 from typing import List, Optional
 
-from database import get_db
+from database import get_db, get_read_db, mark_user_write
 from fastapi import APIRouter, Depends, HTTPException, status
-from models import NutritionLog, RiskAssessment, User
+from models import User, UserStatsAggregate
 from pydantic import BaseModel
-from sqlalchemy import func, select
+from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 router = APIRouter()
@@ -36,7 +36,7 @@ class UserStats(BaseModel):
 
 
 @router.get("/profile/{user_id}", response_model=UserProfile)
-async def get_user_profile(user_id: int, db: AsyncSession = Depends(get_db)):
+async def get_user_profile(user_id: int, db: AsyncSession = Depends(get_read_db)):
     """Get user profile"""
     from routers.auth_utils import get_user_by_id
 
@@ -82,60 +82,37 @@ async def get_user_profile(user_id: int, db: AsyncSession = Depends(get_db)):
 
 
 @router.get("/stats/{user_id}", response_model=UserStats)
-async def get_user_stats(user_id: int, db: AsyncSession = Depends(get_db)):
+async def get_user_stats(user_id: int, db: AsyncSession = Depends(get_read_db)):
     """Get user statistics"""
-    result = await db.execute(select(User).where(User.id == user_id))
-    user = result.scalar_one_or_none()
-    if not user:
+    # Один запрос по первичному ключу: агрегаты поддерживаются при вставке
+    # оценок и записей питания (см. routers/stats_utils.py)
+    result = await db.execute(
+        select(User.id, UserStatsAggregate)
+        .outerjoin(UserStatsAggregate, UserStatsAggregate.user_id == User.id)
+        .where(User.id == user_id)
+    )
+    row = result.one_or_none()
+    if row is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="User not found"
         )
 
-    # Get statistics
-    total_assessments_result = await db.execute(
-        select(func.count(RiskAssessment.id)).where(RiskAssessment.user_id == user_id)
-    )
-    total_assessments = total_assessments_result.scalar() or 0
-
-    total_nutrition_logs_result = await db.execute(
-        select(func.count(NutritionLog.id)).where(NutritionLog.user_id == user_id)
-    )
-    total_nutrition_logs = total_nutrition_logs_result.scalar() or 0
-
-    last_assessment_result = await db.execute(
-        select(RiskAssessment)
-        .where(RiskAssessment.user_id == user_id)
-        .order_by(RiskAssessment.created_at.desc())
-        .limit(1)
-    )
-    last_assessment = last_assessment_result.scalar_one_or_none()
-
-    # Вычисляем уровень риска на основе последней оценки
-    risk_level = None
-    if last_assessment and last_assessment.risk_scores:
-        risk_scores = last_assessment.risk_scores
-        # Вычисляем средний риск
-        avg_risk = (
-            risk_scores.get("cavity_risk", 0)
-            + risk_scores.get("gum_disease_risk", 0)
-            + risk_scores.get("sensitivity_risk", 0)
-            + risk_scores.get("enamel_erosion_risk", 0)
-        ) / 4
-
-        if avg_risk < 0.3:
-            risk_level = "low"
-        elif avg_risk < 0.6:
-            risk_level = "medium"
-        else:
-            risk_level = "high"
+    stats = row.UserStatsAggregate
+    if stats is None:
+        return UserStats(
+            total_assessments=0,
+            total_nutrition_logs=0,
+            last_assessment_date=None,
+            risk_level=None,
+        )
 
     return UserStats(
-        total_assessments=total_assessments,
-        total_nutrition_logs=total_nutrition_logs,
+        total_assessments=stats.total_assessments,
+        total_nutrition_logs=stats.total_nutrition_logs,
         last_assessment_date=(
-            last_assessment.created_at.isoformat() if last_assessment else None
+            stats.last_assessment_at.isoformat() if stats.last_assessment_at else None
         ),
-        risk_level=risk_level,  # None если нет оценок
+        risk_level=stats.risk_level,  # None если нет оценок
     )
 
 
@@ -177,6 +154,7 @@ async def link_telegram(
     # Link telegram_id to user
     user.telegram_id = telegram_data.telegram_id
     await db.commit()
+    await mark_user_write(user_id)
     await db.refresh(user)
 
     return TelegramLinkResponse(
@@ -187,7 +165,7 @@ async def link_telegram(
 
 
 @router.get("/check-telegram/{user_id}")
-async def check_telegram_registration(user_id: int, db: AsyncSession = Depends(get_db)):
+async def check_telegram_registration(user_id: int, db: AsyncSession = Depends(get_read_db)):
     """Check if user is registered in Telegram bot (has telegram_id and has started the bot)"""
     result = await db.execute(select(User).where(User.id == user_id))
     user = result.scalar_one_or_none()
@@ -216,7 +194,7 @@ async def check_telegram_registration(user_id: int, db: AsyncSession = Depends(g
 
 
 @router.get("/all-telegram-users")
-async def get_all_telegram_users(db: AsyncSession = Depends(get_db)):
+async def get_all_telegram_users(db: AsyncSession = Depends(get_read_db)):
     """Get all users with telegram_id (for reminder scheduler)"""
     result = await db.execute(select(User).where(User.telegram_id.isnot(None)))
     users = result.scalars().all()
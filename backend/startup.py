@@ -0,0 +1,108 @@
+"""
+Application startup pipeline
+
+Independent warmups run concurrently; only the steps that need the schema
+wait for migrations. Each phase is timed and the breakdown is logged and
+kept in STARTUP_TIMINGS (shown by /api/health).
+"""
+
+import asyncio
+import logging
+import os
+import time
+from typing import Awaitable, Dict
+
+logger = logging.getLogger(__name__)
+
+# Сколько соединений пула открыть заранее (0 - не прогревать)
+STARTUP_DB_CONNECTIONS = int(os.getenv("STARTUP_DB_CONNECTIONS", "2"))
+STARTUP_OPENAI_WARMUP = os.getenv("STARTUP_OPENAI_WARMUP", "true").lower() in ("1", "true", "yes")
+# Прогрев внешних сервисов не должен задерживать старт дольше этого
+STARTUP_WARMUP_TIMEOUT = float(os.getenv("STARTUP_WARMUP_TIMEOUT", "5"))
+# Выставляется gunicorn master (gunicorn.conf.py) после применения миграций
+MIGRATIONS_APPLIED = os.getenv("DB_MIGRATIONS_APPLIED", "").lower() in ("1", "true", "yes")
+
+# Фаза -> секунды (или ошибка) последнего запуска
+STARTUP_TIMINGS: Dict[str, object] = {}
+
+
+async def _timed(name: str, step: Awaitable, required: bool = False):
+    start = time.perf_counter()
+    try:
+        result = await step
+    except Exception as e:
+        STARTUP_TIMINGS[name] = f"error: {e}"
+        if required:
+            raise
+        logger.warning(f"Startup: {name} failed: {e}")
+        return None
+    STARTUP_TIMINGS[name] = round(time.perf_counter() - start, 3)
+    return result
+
+
+async def _open_connections(engine, count: int):
+    """Check out count connections at once so the pool keeps them open"""
+    connections = await asyncio.gather(*(engine.connect().start() for _ in range(count)))
+    for conn in connections:
+        await conn.close()
+
+
+async def _warm_db_pools():
+    from database import engine, read_engine
+
+    engines = {engine, read_engine}
+    count = min(STARTUP_DB_CONNECTIONS, engine.sync_engine.pool.size())
+    await asyncio.gather(*(_open_connections(e, count) for e in engines))
+
+
+async def _warm_redis():
+    from redis_client import get_redis
+
+    await asyncio.wait_for(get_redis().ping(), timeout=STARTUP_WARMUP_TIMEOUT)
+
+
+async def _database_chain():
+    """Migrations, then the pool and the caches that need the schema"""
+    from migrate_db import ensure_schema_current, migrate_database
+
+    # Под gunicorn миграции уже применил master до fork - воркеры только проверяют
+    if MIGRATIONS_APPLIED:
+        step = ensure_schema_current()
+    else:
+        step = migrate_database()
+    version = await _timed("migrations", step, required=True)
+    logger.info(f"Database schema version: {version}")
+
+    async def load_facts():
+        from database import ReadSessionLocal
+        from routers.facts import load_fact_pool
+
+        async with ReadSessionLocal() as session:
+            return await load_fact_pool(session)
+
+    steps = [_timed("fact_pool", load_facts())]
+    if STARTUP_DB_CONNECTIONS > 0:
+        steps.append(_timed("db_pool", _warm_db_pools()))
+    await asyncio.gather(*steps)
+
+
+async def run_startup(ml_manager):
+    """Run migrations and warmups; raises only if migrations fail"""
+    STARTUP_TIMINGS.clear()
+    start = time.perf_counter()
+
+    steps = [
+        _database_chain(),
+        _timed("redis", _warm_redis()),
+        _timed("ml_service", ml_manager.initialize_models()),
+    ]
+    if STARTUP_OPENAI_WARMUP and ml_manager.client:
+        steps.append(_timed("openai", ml_manager.warm_up(timeout=STARTUP_WARMUP_TIMEOUT)))
+    await asyncio.gather(*steps)
+
+    STARTUP_TIMINGS["total"] = round(time.perf_counter() - start, 3)
+    logger.info(
+        "Startup finished in %.2fs (%s)",
+        STARTUP_TIMINGS["total"],
+        ", ".join(f"{k}={v}" for k, v in STARTUP_TIMINGS.items() if k != "total"),
+    )
@@ -0,0 +1,21 @@
+"""
+Braces FAQ matching over a fixed FAQ list
+"""
+
+from types import SimpleNamespace
+
+import pytest
+from routers.faq_search import match_faqs
+
+
+@pytest.fixture(scope="module")
+def faqs(braces_faq):
+    # Те же атрибуты, что у строк BracesFAQ (keywords - JSON-текст, как в БД)
+    return [SimpleNamespace(**faq) for faq in braces_faq["faqs"]]
+
+
+def bench_match_faqs(benchmark, faqs, braces_faq):
+    queries = braces_faq["queries"]
+
+    results = benchmark(lambda: [match_faqs(faqs, query) for query in queries])
+    assert [len(matches) for matches in results] == [20, 20, 20, 20, 20, 0]
@@ -0,0 +1,54 @@
+"""
+Parsing of model output: JSON extraction and the Vision text fallback
+"""
+
+import json
+
+import pytest
+from ml_services import FOOD_KEYWORDS, extract_json_object, extract_numbers, find_keywords
+
+
+@pytest.mark.parametrize("kind", ["json_only", "json_in_prose", "json_large"])
+def bench_extract_json(benchmark, llm_responses, kind):
+    texts = llm_responses[kind]
+
+    def run():
+        return [extract_json_object(text) for text in texts]
+
+    results = benchmark(run)
+    assert all(isinstance(result, dict) for result in results)
+
+
+def bench_extract_json_missing(benchmark, llm_responses):
+    texts = llm_responses["no_json"]
+
+    results = benchmark(lambda: [extract_json_object(text) for text in texts])
+    assert results == [None] * len(texts)
+
+
+def bench_extract_json_invalid(benchmark, llm_responses):
+    texts = llm_responses["invalid_json"]
+
+    def run():
+        errors = 0
+        for text in texts:
+            try:
+                extract_json_object(text)
+            except json.JSONDecodeError:
+                errors += 1
+        return errors
+
+    assert benchmark(run) == len(texts)
+
+
+def bench_text_fallback(benchmark, llm_responses):
+    """Foods and numbers from a Vision answer without JSON"""
+    texts = llm_responses["no_json"]
+
+    def run():
+        return [(find_keywords(text, FOOD_KEYWORDS), extract_numbers(text)) for text in texts]
+
+    results = benchmark(run)
+    foods, numbers = results[0]
+    assert "омлет" in foods and "кофе" in foods
+    assert numbers[:3] == ["650", "12.5", "5.0"]
@@ -0,0 +1,17 @@
+"""
+Scheduler due checks over a fixed set of reminders
+"""
+
+from datetime import datetime
+
+from reminder_rules import filter_due_reminders
+
+
+def bench_filter_due_reminders(benchmark, reminders):
+    now = datetime.strptime(reminders["now"], "%Y-%m-%d %H:%M")
+    items = reminders["reminders"]
+
+    due = benchmark(filter_due_reminders, items, now)
+    assert due
+    assert all(r["is_active"] and r["time"] == "09:00" for r in due)
+    assert all(r["date"] in (None, "2026-03-14", "2026-3-14") for r in due)
@@ -0,0 +1,39 @@
+"""
+Rule-based paths: risk levels and the fallback chat responses
+"""
+
+from ml_services import (
+    FALLBACK_BRACES_DEFAULT,
+    FALLBACK_BRACES_RULES,
+    FALLBACK_PSYCHOLOGY_DEFAULT,
+    FALLBACK_PSYCHOLOGY_RULES,
+    build_risk_map,
+    match_fallback,
+)
+
+
+def bench_build_risk_map(benchmark, risk_scores):
+    risk_maps = benchmark(lambda: [build_risk_map(scores) for scores in risk_scores])
+    assert len(risk_maps) == len(risk_scores)
+    assert build_risk_map(
+        {"cavity_risk": 0.1, "gum_disease_risk": 0.3, "sensitivity_risk": 0.59, "enamel_erosion_risk": 0.6}
+    ) == {"cavity": "green", "gum_disease": "yellow", "sensitivity": "yellow", "enamel_erosion": "red"}
+
+
+def bench_fallback_psychology(benchmark, chat_messages):
+    responses = benchmark(
+        lambda: [
+            match_fallback(m, FALLBACK_PSYCHOLOGY_RULES, FALLBACK_PSYCHOLOGY_DEFAULT)
+            for m in chat_messages
+        ]
+    )
+    assert responses[0] == FALLBACK_PSYCHOLOGY_RULES[0][1]
+    assert responses[-1] == FALLBACK_PSYCHOLOGY_DEFAULT
+
+
+def bench_fallback_braces(benchmark, chat_messages):
+    responses = benchmark(
+        lambda: [match_fallback(m, FALLBACK_BRACES_RULES, FALLBACK_BRACES_DEFAULT) for m in chat_messages]
+    )
+    assert responses[5] == FALLBACK_BRACES_RULES[3][1]
+    assert responses[-1] == FALLBACK_BRACES_DEFAULT
@@ -0,0 +1,48 @@
+"""
+Fixtures for the microbenchmarks: module paths and the fixed input corpora
+"""
+
+import json
+import os
+import sys
+
+import pytest
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.dirname(BENCHMARKS_DIR)
+CORPORA_DIR = os.path.join(BENCHMARKS_DIR, "corpora")
+
+# Импортируются только модули без I/O (ml_services, routers.faq_search,
+# reminder_rules), поэтому backend и telegram_bot не конфликтуют по именам
+for path in ("shared", "backend", "telegram_bot"):
+    sys.path.insert(0, os.path.join(ROOT_DIR, path))
+
+
+def load_corpus(name: str):
+    with open(os.path.join(CORPORA_DIR, name), encoding="utf-8") as f:
+        return json.load(f)
+
+
+@pytest.fixture(scope="session")
+def llm_responses():
+    return load_corpus("llm_responses.json")
+
+
+@pytest.fixture(scope="session")
+def braces_faq():
+    return load_corpus("braces_faq.json")
+
+
+@pytest.fixture(scope="session")
+def chat_messages():
+    return load_corpus("messages.json")
+
+
+@pytest.fixture(scope="session")
+def risk_scores():
+    return load_corpus("risk_scores.json")
+
+
+@pytest.fixture(scope="session")
+def reminders():
+    return load_corpus("reminders.json")
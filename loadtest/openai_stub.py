@@ -0,0 +1,178 @@
+"""
+OpenAI-compatible stub server for load tests
+Answers chat completions with canned content after a simulated latency
+
+Usage:
+    python openai_stub.py --port 8100 --latency lognormal:800:0.5 --error-rate 0.02
+    # backend: OPENAI_BASE_URL=http://localhost:8100/v1 OPENAI_API_KEY=stub
+
+Latency (milliseconds):
+    fixed:MS                 always MS
+    uniform:MIN:MAX          uniformly distributed
+    lognormal:MEDIAN:SIGMA   long tail like the real API (default lognormal:800:0.5)
+
+The reply is chosen from the system prompt: risk assessment and nutrition
+prompts get valid JSON in the format the backend parses, everything else
+a short text. Token usage is estimated from the message length.
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import random
+import sys
+import time
+import uuid
+from typing import Callable
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+RISK_RESPONSE = {
+    "cavity_risk": 0.45,
+    "gum_disease_risk": 0.3,
+    "sensitivity_risk": 0.2,
+    "enamel_erosion_risk": 0.55,
+    "recommendations": [
+        "Используйте зубную пасту с фтором дважды в день",
+        "Полощите рот водой после кислых напитков",
+        "Используйте зубную нить ежедневно",
+    ],
+}
+
+NUTRITION_RESPONSE = {
+    "food_items": ["яблоко"],
+    "summary": "Яблоко - фрукт с природными сахарами и умеренной кислотностью.",
+    "sugar_content": 10.4,
+    "acidity_level": 3.8,
+    "acidity_category": "кислое",
+    "health_score": 7,
+    "recommendations": ["Подождите 30 минут перед чисткой зубов"],
+}
+
+TEXT_RESPONSE = (
+    "Понимаю ваше беспокойство. Давайте разберемся вместе: расскажите, "
+    "что именно вас тревожит перед визитом к стоматологу?"
+)
+
+
+def parse_latency(spec: str) -> Callable[[], float]:
+    """Latency sampler in seconds from a fixed/uniform/lognormal spec"""
+    kind, _, params = spec.partition(":")
+    values = [float(v) for v in params.split(":") if v]
+    if kind == "fixed" and len(values) == 1:
+        return lambda: values[0] / 1000
+    if kind == "uniform" and len(values) == 2:
+        return lambda: random.uniform(values[0], values[1]) / 1000
+    if kind == "lognormal" and len(values) == 2:
+        mu, sigma = math.log(values[0]), values[1]
+        return lambda: random.lognormvariate(mu, sigma) / 1000
+    raise ValueError(f"Invalid latency spec: {spec}")
+
+
+def choose_content(system_prompt: str) -> str:
+    if "cavity_risk" in system_prompt:
+        return json.dumps(RISK_RESPONSE, ensure_ascii=False)
+    if "food_items" in system_prompt:
+        return json.dumps(NUTRITION_RESPONSE, ensure_ascii=False)
+    return TEXT_RESPONSE
+
+
+def estimate_tokens(messages) -> int:
+    total = 0
+    for message in messages:
+        content = message.get("content")
+        if isinstance(content, list):
+            # Vision: текстовые части + фиксированная цена изображения
+            content = " ".join(p.get("text", "") for p in content if isinstance(p, dict))
+            total += 85
+        total += len(content or "") // 3 + 4
+    return total
+
+
+def create_app(latency: Callable[[], float], error_rate: float, rate_limit_share: float) -> FastAPI:
+    app = FastAPI(title="OpenAI stub")
+    app.state.requests = 0
+    app.state.errors = 0
+
+    async def chat_completions(request: Request):
+        body = await request.json()
+        app.state.requests += 1
+        await asyncio.sleep(latency())
+
+        if random.random() < error_rate:
+            app.state.errors += 1
+            if random.random() < rate_limit_share:
+                return JSONResponse(
+                    status_code=429,
+                    headers={"retry-after": "1"},
+                    content={"error": {"message": "Rate limit reached (stub)", "type": "rate_limit_error"}},
+                )
+            return JSONResponse(
+                status_code=500,
+                content={"error": {"message": "Internal error (stub)", "type": "server_error"}},
+            )
+
+        messages = body.get("messages", [])
+        system_prompt = next(
+            (m.get("content") or "" for m in messages if m.get("role") == "system"), ""
+        )
+        content = choose_content(system_prompt if isinstance(system_prompt, str) else "")
+        prompt_tokens = estimate_tokens(messages)
+        completion_tokens = len(content) // 3 + 1
+        return {
+            "id": f"chatcmpl-{uuid.uuid4().hex[:24]}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "stub"),
+            "choices": [
+                {
+                    "index": 0,
+                    "message": {"role": "assistant", "content": content},
+                    "finish_reason": "stop",
+                }
+            ],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens,
+            },
+        }
+
+    async def retrieve_model(model: str):
+        return {"id": model, "object": "model", "created": 0, "owned_by": "stub"}
+
+    async def stats():
+        return {"requests": app.state.requests, "errors": app.state.errors}
+
+    # Клиент OpenAI обращается к {base_url}/chat/completions; base_url с /v1 и без
+    for prefix in ("/v1", ""):
+        app.add_api_route(f"{prefix}/chat/completions", chat_completions, methods=["POST"])
+        app.add_api_route(f"{prefix}/models/{{model}}", retrieve_model, methods=["GET"])
+    app.add_api_route("/stats", stats, methods=["GET"])
+    return app
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="OpenAI-compatible stub server")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--latency", default="lognormal:800:0.5", help="fixed:MS | uniform:MIN:MAX | lognormal:MEDIAN:SIGMA")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of requests that fail")
+    parser.add_argument("--rate-limit-share", type=float, default=0.5, help="Share of failures returned as 429 (rest are 500)")
+    args = parser.parse_args()
+
+    app = create_app(parse_latency(args.latency), args.error_rate, args.rate_limit_share)
+    print(f"✓ OpenAI stub on http://{args.host}:{args.port}/v1 (latency {args.latency}, errors {args.error_rate:.0%})")
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+    return 0
+
+
+if __name__ == "__main__":
+    try:
+        sys.exit(main())
+    except Exception as e:
+        print(f"✗ Stub failed: {e}")
+        sys.exit(1)
@@ -0,0 +1,315 @@
+"""
+Load test driver for the backend API
+Open-loop asyncio driver: requests start at the target rate whether or not
+earlier ones have finished, so a slow backend shows up as growing latency
+instead of a silently lower request rate.
+
+Usage:
+    python run_load.py --base-url http://localhost:8000 --rps 20 --duration 60
+    python run_load.py --mix facts=5,psychology=1 --rps 100 --json report.json
+
+Scenarios (--mix name=weight,...):
+    risk        POST /api/risks/assess
+    nutrition   POST /api/nutrition/analyze
+    psychology  POST /api/psychology/chat
+    facts       GET  /api/facts/random
+    reminders   one reminder scheduler pass over HTTP (the bot's path without
+                BOT_DB_QUERIES): all telegram users, then reminders per user
+
+Run the backend against openai_stub.py (OPENAI_BASE_URL) so AI routes cost no
+tokens, with AI_DAILY_*_QUOTA unset.
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import random
+import sys
+import time
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Dict, List, Optional
+
+import httpx
+
+DEFAULT_MIX = "risk=1,nutrition=1,psychology=2,facts=4,reminders=0.1"
+
+QUESTIONNAIRE = {
+    "age": 32,
+    "brushing_frequency": "2 раза в день",
+    "flossing": "иногда",
+    "sweets_frequency": "ежедневно",
+    "acidic_drinks": "несколько раз в неделю",
+    "bleeding_gums": True,
+    "sensitivity": False,
+    "family_history": "кариес у родителей",
+}
+
+FOODS = ["яблоко", "кофе с сахаром", "апельсиновый сок", "сыр", "шоколадный батончик"]
+
+PSYCHOLOGY_MESSAGES = [
+    "Я очень боюсь идти к стоматологу",
+    "Как перестать переживать перед лечением?",
+    "Мне стыдно за состояние зубов",
+]
+
+
+@dataclass
+class LoadUser:
+    id: int
+    token: str
+
+    @property
+    def headers(self) -> Dict[str, str]:
+        return {"Authorization": f"Bearer {self.token}"}
+
+
+@dataclass
+class ScenarioStats:
+    latencies: List[float] = field(default_factory=list)
+    errors: int = 0
+    statuses: Dict[str, int] = field(default_factory=dict)
+
+
+def percentile(sorted_values: List[float], p: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(math.ceil(p / 100 * len(sorted_values)) - 1, 0)
+    return sorted_values[min(rank, len(sorted_values) - 1)]
+
+
+def parse_mix(spec: str) -> Dict[str, float]:
+    mix = {}
+    for item in spec.split(","):
+        name, _, weight = item.strip().partition("=")
+        if name not in SCENARIOS:
+            raise ValueError(f"Unknown scenario: {name}. Available: {', '.join(SCENARIOS)}")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+# ===== scenarios =====
+
+
+async def scenario_risk(client: httpx.AsyncClient, user: LoadUser) -> httpx.Response:
+    return await client.post(
+        "/api/risks/assess",
+        json={"user_id": user.id, "questionnaire_data": QUESTIONNAIRE},
+        headers=user.headers,
+    )
+
+
+async def scenario_nutrition(client: httpx.AsyncClient, user: LoadUser) -> httpx.Response:
+    return await client.post(
+        "/api/nutrition/analyze",
+        json={"user_id": user.id, "food_description": random.choice(FOODS), "weight_grams": 150},
+        headers=user.headers,
+    )
+
+
+async def scenario_psychology(client: httpx.AsyncClient, user: LoadUser) -> httpx.Response:
+    return await client.post(
+        "/api/psychology/chat",
+        json={"message": random.choice(PSYCHOLOGY_MESSAGES)},
+        headers=user.headers,
+    )
+
+
+async def scenario_facts(client: httpx.AsyncClient, user: LoadUser) -> httpx.Response:
+    return await client.get("/api/facts/random")
+
+
+async def scenario_reminders(client: httpx.AsyncClient, user: LoadUser) -> httpx.Response:
+    # Как telegram_bot/scheduler.py: fetch_due_reminders_http
+    response = await client.get("/api/users/all-telegram-users")
+    if response.status_code != 200:
+        return response
+    for telegram_user in response.json():
+        reminders = await client.get(f"/api/reminders/user/{telegram_user['id']}")
+        if reminders.status_code != 200:
+            return reminders
+    return response
+
+
+SCENARIOS: Dict[str, Callable[[httpx.AsyncClient, LoadUser], Awaitable[httpx.Response]]] = {
+    "risk": scenario_risk,
+    "nutrition": scenario_nutrition,
+    "psychology": scenario_psychology,
+    "facts": scenario_facts,
+    "reminders": scenario_reminders,
+}
+
+
+# ===== setup =====
+
+
+async def prepare_user(client: httpx.AsyncClient, index: int, password: str) -> LoadUser:
+    """Register (or reuse) a load test user and log in"""
+    email = f"loadtest-{index}@example.com"
+    response = await client.post(
+        "/api/auth/register",
+        json={"email": email, "password": password, "first_name": "Load", "last_name": f"Test{index}"},
+    )
+    if response.status_code not in (200, 400):  # 400 - уже зарегистрирован
+        response.raise_for_status()
+
+    response = await client.post("/api/auth/token", data={"username": email, "password": password})
+    response.raise_for_status()
+    token = response.json()["access_token"]
+
+    response = await client.get("/api/auth/me", headers={"Authorization": f"Bearer {token}"})
+    response.raise_for_status()
+    return LoadUser(id=response.json()["id"], token=token)
+
+
+# ===== driver =====
+
+
+async def run_load(
+    base_url: str,
+    rps: float,
+    duration: float,
+    mix: Dict[str, float],
+    users: int,
+    password: str,
+    max_in_flight: int,
+    timeout: float,
+    poisson: bool,
+) -> Dict:
+    limits = httpx.Limits(max_connections=max_in_flight, max_keepalive_connections=max_in_flight)
+    async with httpx.AsyncClient(base_url=base_url, timeout=timeout, limits=limits) as client:
+        print(f"Preparing {users} users...")
+        load_users = await asyncio.gather(*(prepare_user(client, i, password) for i in range(users)))
+
+        stats = {name: ScenarioStats() for name in mix}
+        names, weights = list(mix), list(mix.values())
+        in_flight = 0
+        dropped = 0
+        tasks = set()
+
+        async def execute(name: str):
+            nonlocal in_flight
+            start = time.perf_counter()
+            try:
+                response = await SCENARIOS[name](client, random.choice(load_users))
+                status = str(response.status_code)
+                ok = response.status_code < 400
+            except Exception as e:
+                status, ok = type(e).__name__, False
+            finally:
+                in_flight -= 1
+            scenario = stats[name]
+            scenario.latencies.append(time.perf_counter() - start)
+            scenario.statuses[status] = scenario.statuses.get(status, 0) + 1
+            if not ok:
+                scenario.errors += 1
+
+        print(f"Running {rps} req/s for {duration:.0f}s ({', '.join(f'{k}={v:g}' for k, v in mix.items())})...")
+        started = time.perf_counter()
+        next_at = started
+        while next_at - started < duration:
+            delay = next_at - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            if in_flight >= max_in_flight:
+                # Клиент сам стал узким местом - не копим бесконечную очередь
+                dropped += 1
+            else:
+                in_flight += 1
+                task = asyncio.create_task(execute(random.choices(names, weights)[0]))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+            next_at += random.expovariate(rps) if poisson else 1 / rps
+
+        if tasks:
+            await asyncio.gather(*tasks)
+        elapsed = time.perf_counter() - started
+
+    return build_report(stats, elapsed, dropped)
+
+
+def build_report(stats: Dict[str, ScenarioStats], elapsed: float, dropped: int) -> Dict:
+    report = {"elapsed_seconds": round(elapsed, 2), "dropped": dropped, "scenarios": {}}
+    all_latencies: List[float] = []
+    total_errors = 0
+    for name, scenario in stats.items():
+        latencies = sorted(scenario.latencies)
+        all_latencies.extend(latencies)
+        total_errors += scenario.errors
+        report["scenarios"][name] = summarize(latencies, scenario.errors, elapsed, scenario.statuses)
+    report["total"] = summarize(sorted(all_latencies), total_errors, elapsed)
+    return report
+
+
+def summarize(latencies: List[float], errors: int, elapsed: float, statuses: Optional[Dict[str, int]] = None) -> Dict:
+    summary = {
+        "requests": len(latencies),
+        "errors": errors,
+        "throughput_rps": round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 1),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 1),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 1),
+        "max_ms": round((latencies[-1] if latencies else 0.0) * 1000, 1),
+    }
+    if statuses is not None:
+        summary["statuses"] = statuses
+    return summary
+
+
+def print_report(report: Dict):
+    header = f"{'scenario':<12} {'requests':>8} {'errors':>6} {'rps':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'max ms':>9}"
+    print()
+    print(header)
+    print("-" * len(header))
+    rows = list(report["scenarios"].items()) + [("total", report["total"])]
+    for name, s in rows:
+        print(
+            f"{name:<12} {s['requests']:>8} {s['errors']:>6} {s['throughput_rps']:>8} "
+            f"{s['p50_ms']:>9} {s['p95_ms']:>9} {s['p99_ms']:>9} {s['max_ms']:>9}"
+        )
+    if report["dropped"]:
+        print(f"⚠ {report['dropped']} requests not sent: --max-in-flight reached")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="ProDentAI backend load test")
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--rps", type=float, default=10.0, help="Target request rate")
+    parser.add_argument("--duration", type=float, default=30.0, help="Seconds")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="Scenario weights: name=weight,...")
+    parser.add_argument("--users", type=int, default=10, help="Load test users to spread requests over")
+    parser.add_argument("--password", default="loadtest-password")
+    parser.add_argument("--max-in-flight", type=int, default=500)
+    parser.add_argument("--timeout", type=float, default=120.0, help="Per-request timeout, seconds")
+    parser.add_argument("--poisson", action="store_true", help="Exponential inter-arrival times instead of a fixed interval")
+    parser.add_argument("--json", dest="json_path", help="Also write the report to this file")
+    args = parser.parse_args()
+
+    report = asyncio.run(
+        run_load(
+            args.base_url,
+            args.rps,
+            args.duration,
+            parse_mix(args.mix),
+            args.users,
+            args.password,
+            args.max_in_flight,
+            args.timeout,
+            args.poisson,
+        )
+    )
+    print_report(report)
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"✓ Report written to {args.json_path}")
+    return 0
+
+
+if __name__ == "__main__":
+    try:
+        sys.exit(main())
+    except Exception as e:
+        print(f"✗ Load test failed: {e}")
+        sys.exit(1)
@@ -4,13 +4,36 @@ Database utilities for ProDentAI
 
 import asyncio
 import logging
-from typing import Any, Dict, List
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
 
 from sqlalchemy import text
 from sqlalchemy.ext.asyncio import AsyncSession
 
 logger = logging.getLogger(__name__)
 
+DEFAULT_HISTORY_LIMIT = 50
+MAX_HISTORY_LIMIT = 200
+
+
+def _history_page_params(
+    user_id: int, limit: int, before: Optional[Tuple[datetime, int]]
+) -> Tuple[str, Dict[str, Any]]:
+    """
+    Keyset condition and parameters for history queries.
+
+    `before` is the (created_at, id) of the last row of the previous page;
+    the next page continues strictly after it in (created_at, id) DESC order.
+    """
+    params: Dict[str, Any] = {
+        "user_id": user_id,
+        "limit": max(1, min(limit, MAX_HISTORY_LIMIT)),
+    }
+    if before is None:
+        return "", params
+    params["before_created_at"], params["before_id"] = before
+    return "AND (created_at, id) < (:before_created_at, :before_id)", params
+
 
 class DatabaseUtils:
     """Utility functions for database operations"""
@@ -19,41 +42,36 @@ class DatabaseUtils:
     async def get_user_stats(session: AsyncSession, user_id: int) -> Dict[str, Any]:
         """Get user statistics"""
         try:
-            # Get total assessments
-            result = await session.execute(
-                text("SELECT COUNT(*) FROM risk_assessments WHERE user_id = :user_id"),
-                {"user_id": user_id},
-            )
-            total_assessments = result.scalar() or 0
-
-            # Get total nutrition logs
-            result = await session.execute(
-                text("SELECT COUNT(*) FROM nutrition_logs WHERE user_id = :user_id"),
-                {"user_id": user_id},
-            )
-            total_nutrition_logs = result.scalar() or 0
-
-            # Get last assessment date
+            # Агрегаты хранятся в user_stats и обновляются при вставке
             result = await session.execute(
                 text(
                     """
-                    SELECT created_at FROM risk_assessments 
-                    WHERE user_id = :user_id 
-                    ORDER BY created_at DESC 
-                    LIMIT 1
+                    SELECT total_assessments, total_nutrition_logs,
+                           last_assessment_at, risk_level
+                    FROM user_stats
+                    WHERE user_id = :user_id
                 """
                 ),
                 {"user_id": user_id},
             )
-            last_assessment = result.scalar()
+            row = result.first()
+            if row is None:
+                return {
+                    "total_assessments": 0,
+                    "total_nutrition_logs": 0,
+                    "last_assessment_date": None,
+                    "risk_level": None,
+                }
 
             return {
-                "total_assessments": total_assessments,
-                "total_nutrition_logs": total_nutrition_logs,
+                "total_assessments": row.total_assessments,
+                "total_nutrition_logs": row.total_nutrition_logs,
                 "last_assessment_date": (
-                    last_assessment.isoformat() if last_assessment else None
+                    row.last_assessment_at.isoformat()
+                    if row.last_assessment_at
+                    else None
                 ),
-                "risk_level": "medium",  # TODO: Calculate based on latest assessment
+                "risk_level": row.risk_level,
             }
 
         except Exception as e:
@@ -67,20 +85,25 @@ class DatabaseUtils:
 
     @staticmethod
     async def get_user_reminders(
-        session: AsyncSession, user_id: int
+        session: AsyncSession,
+        user_id: int,
+        limit: int = DEFAULT_HISTORY_LIMIT,
+        before: Optional[Tuple[datetime, int]] = None,
     ) -> List[Dict[str, Any]]:
         """Get user reminders"""
         try:
+            keyset, params = _history_page_params(user_id, limit, before)
             result = await session.execute(
                 text(
-                    """
+                    f"""
                     SELECT id, reminder_type, time, is_active, message, created_at
                     FROM reminders 
-                    WHERE user_id = :user_id 
-                    ORDER BY created_at DESC
+                    WHERE user_id = :user_id {keyset}
+                    ORDER BY created_at DESC, id DESC
+                    LIMIT :limit
                 """
                 ),
-                {"user_id": user_id},
+                params,
             )
 
             reminders = []
@@ -104,20 +127,25 @@ class DatabaseUtils:
 
     @staticmethod
     async def get_psychology_history(
-        session: AsyncSession, user_id: int
+        session: AsyncSession,
+        user_id: int,
+        limit: int = DEFAULT_HISTORY_LIMIT,
+        before: Optional[Tuple[datetime, int]] = None,
     ) -> List[Dict[str, Any]]:
         """Get user psychology session history"""
         try:
+            keyset, params = _history_page_params(user_id, limit, before)
             result = await session.execute(
                 text(
-                    """
+                    f"""
                     SELECT id, session_type, user_message, ai_response, sentiment_score, created_at
                     FROM psychology_sessions 
-                    WHERE user_id = :user_id 
-                    ORDER BY created_at DESC
+                    WHERE user_id = :user_id {keyset}
+                    ORDER BY created_at DESC, id DESC
+                    LIMIT :limit
                 """
                 ),
-                {"user_id": user_id},
+                params,
             )
 
             sessions = []
@@ -141,21 +169,26 @@ class DatabaseUtils:
 
     @staticmethod
     async def get_nutrition_history(
-        session: AsyncSession, user_id: int
+        session: AsyncSession,
+        user_id: int,
+        limit: int = DEFAULT_HISTORY_LIMIT,
+        before: Optional[Tuple[datetime, int]] = None,
     ) -> List[Dict[str, Any]]:
         """Get user nutrition analysis history"""
         try:
+            keyset, params = _history_page_params(user_id, limit, before)
             result = await session.execute(
                 text(
-                    """
+                    f"""
                     SELECT id, food_description, calories, sugar_content, acidity_level, 
                            recommendations, created_at
                     FROM nutrition_logs 
-                    WHERE user_id = :user_id 
-                    ORDER BY created_at DESC
+                    WHERE user_id = :user_id {keyset}
+                    ORDER BY created_at DESC, id DESC
+                    LIMIT :limit
                 """
                 ),
-                {"user_id": user_id},
+                params,
             )
 
             logs = []
@@ -180,20 +213,25 @@ class DatabaseUtils:
 
     @staticmethod
     async def get_risk_assessment_history(
-        session: AsyncSession, user_id: int
+        session: AsyncSession,
+        user_id: int,
+        limit: int = DEFAULT_HISTORY_LIMIT,
+        before: Optional[Tuple[datetime, int]] = None,
     ) -> List[Dict[str, Any]]:
         """Get user risk assessment history"""
         try:
+            keyset, params = _history_page_params(user_id, limit, before)
             result = await session.execute(
                 text(
-                    """
+                    f"""
                     SELECT id, risk_scores, recommendations, created_at
                     FROM risk_assessments 
-                    WHERE user_id = :user_id 
-                    ORDER BY created_at DESC
+                    WHERE user_id = :user_id {keyset}
+                    ORDER BY created_at DESC, id DESC
+                    LIMIT :limit
                 """
                 ),
-                {"user_id": user_id},
+                params,
             )
 
             assessments = []
@@ -0,0 +1,227 @@
+"""
+Shared SQLAlchemy engine factory for ProDentAI services
+
+All services build their async engines here so pool sizing, connection
+recycling and asyncpg statement caching are configured in one place
+(DB_* environment variables), and every pool reports checkout latency and
+usage through pool_stats().
+"""
+
+import logging
+import os
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+logger = logging.getLogger(__name__)
+
+# Границы гистограммы ожидания соединения из пула (секунды)
+CHECKOUT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+
+def _env_bool(name: str, default: bool) -> bool:
+    value = os.getenv(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+@dataclass(frozen=True)
+class PoolSettings:
+    """Connection pool and driver settings"""
+
+    pool_size: int = 5
+    max_overflow: int = 10
+    pool_timeout: float = 30.0
+    pool_recycle: int = 1800
+    pool_pre_ping: bool = True
+    # Кэш подготовленных выражений asyncpg на соединение
+    statement_cache_size: int = 100
+    # False - без серверных prepared statements (нужно за pgbouncer в transaction mode)
+    prepared_statements: bool = True
+
+    @classmethod
+    def from_env(cls, prefix: str = "DB_") -> "PoolSettings":
+        defaults = cls()
+        return cls(
+            pool_size=int(os.getenv(f"{prefix}POOL_SIZE", defaults.pool_size)),
+            max_overflow=int(os.getenv(f"{prefix}MAX_OVERFLOW", defaults.max_overflow)),
+            pool_timeout=float(os.getenv(f"{prefix}POOL_TIMEOUT", defaults.pool_timeout)),
+            pool_recycle=int(os.getenv(f"{prefix}POOL_RECYCLE", defaults.pool_recycle)),
+            pool_pre_ping=_env_bool(f"{prefix}POOL_PRE_PING", defaults.pool_pre_ping),
+            statement_cache_size=int(
+                os.getenv(f"{prefix}STATEMENT_CACHE_SIZE", defaults.statement_cache_size)
+            ),
+            prepared_statements=_env_bool(
+                f"{prefix}PREPARED_STATEMENTS", defaults.prepared_statements
+            ),
+        )
+
+
+class PoolMetrics:
+    """Checkout latency histogram and counters for one connection pool"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        # Ошибки открытия соединения (не таймауты пула)
+        self.errors = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+        self.bucket_counts = [0] * (len(CHECKOUT_BUCKETS) + 1)
+
+    def observe_checkout(self, seconds: float):
+        with self._lock:
+            self.checkouts += 1
+            self.wait_seconds_total += seconds
+            self.wait_seconds_max = max(self.wait_seconds_max, seconds)
+            for index, bound in enumerate(CHECKOUT_BUCKETS):
+                if seconds <= bound:
+                    self.bucket_counts[index] += 1
+                    break
+            else:
+                self.bucket_counts[-1] += 1
+
+    def observe_timeout(self):
+        with self._lock:
+            self.timeouts += 1
+
+    def observe_error(self):
+        with self._lock:
+            self.errors += 1
+
+
+class InstrumentedAsyncQueuePool(AsyncAdaptedQueuePool):
+    """AsyncAdaptedQueuePool that times every connection checkout"""
+
+    metrics: Optional[PoolMetrics] = None
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except PoolTimeoutError:
+            if self.metrics is not None:
+                self.metrics.observe_timeout()
+            raise
+        except Exception:
+            if self.metrics is not None:
+                self.metrics.observe_error()
+            raise
+        # Время ожидания и число checkout - только по успешным
+        if self.metrics is not None:
+            self.metrics.observe_checkout(time.perf_counter() - start)
+        return connection
+
+    def recreate(self):
+        # engine.dispose() пересоздает пул - метрики переносим в новый
+        pool = super().recreate()
+        pool.metrics = self.metrics
+        return pool
+
+
+_engines: Dict[str, AsyncEngine] = {}
+
+
+def to_asyncpg_url(url: str) -> str:
+    if url.startswith("postgresql://"):
+        return url.replace("postgresql://", "postgresql+asyncpg://", 1)
+    return url
+
+
+def create_engine(
+    url: str,
+    name: str = "primary",
+    settings: Optional[PoolSettings] = None,
+    **engine_kwargs: Any,
+) -> AsyncEngine:
+    """Create an instrumented asyncpg engine and register it for pool_stats()"""
+    settings = settings or PoolSettings.from_env()
+
+    connect_args: Dict[str, Any] = {}
+    if settings.prepared_statements:
+        connect_args["statement_cache_size"] = settings.statement_cache_size
+        connect_args["prepared_statement_cache_size"] = settings.statement_cache_size
+    else:
+        connect_args["statement_cache_size"] = 0
+        connect_args["prepared_statement_cache_size"] = 0
+        # Уникальные имена, чтобы не пересекаться с чужими выражениями за pgbouncer
+        connect_args["prepared_statement_name_func"] = lambda: f"__asyncpg_{uuid.uuid4()}__"
+
+    engine = create_async_engine(
+        to_asyncpg_url(url),
+        poolclass=InstrumentedAsyncQueuePool,
+        pool_size=settings.pool_size,
+        max_overflow=settings.max_overflow,
+        pool_timeout=settings.pool_timeout,
+        pool_recycle=settings.pool_recycle,
+        pool_pre_ping=settings.pool_pre_ping,
+        connect_args=connect_args,
+        **engine_kwargs,
+    )
+    engine.sync_engine.pool.metrics = PoolMetrics(name)
+    _engines[name] = engine
+
+    logger.info(
+        "Database engine '%s': pool_size=%d max_overflow=%d recycle=%ds "
+        "statement_cache=%s",
+        name,
+        settings.pool_size,
+        settings.max_overflow,
+        settings.pool_recycle,
+        settings.statement_cache_size if settings.prepared_statements else "off",
+    )
+    return engine
+
+
+def pool_stats() -> List[Dict[str, Any]]:
+    """Current pool gauges and checkout latency for every registered engine"""
+    stats = []
+    for name, engine in _engines.items():
+        pool = engine.sync_engine.pool
+        metrics: Optional[PoolMetrics] = getattr(pool, "metrics", None)
+        item: Dict[str, Any] = {
+            "name": name,
+            "pool_size": pool.size(),
+            "in_use": pool.checkedout(),
+            "idle": pool.checkedin(),
+            "overflow": max(pool.overflow(), 0),
+        }
+        if metrics is not None:
+            with metrics._lock:
+                item.update(
+                    {
+                        "checkouts": metrics.checkouts,
+                        "checkout_timeouts": metrics.timeouts,
+                        "checkout_errors": metrics.errors,
+                        "checkout_wait_avg_ms": (
+                            round(metrics.wait_seconds_total / metrics.checkouts * 1000, 3)
+                            if metrics.checkouts
+                            else 0.0
+                        ),
+                        "checkout_wait_max_ms": round(metrics.wait_seconds_max * 1000, 3),
+                        "checkout_wait_buckets": _cumulative_buckets(
+                            metrics.bucket_counts
+                        ),
+                    }
+                )
+        stats.append(item)
+    return stats
+
+
+def _cumulative_buckets(bucket_counts: List[int]) -> Dict[str, int]:
+    """Per-bucket counts as cumulative le_* counters (Prometheus convention)"""
+    cumulative: Dict[str, int] = {}
+    running = 0
+    for bound, count in zip((*CHECKOUT_BUCKETS, "inf"), bucket_counts):
+        running += count
+        cumulative[f"le_{bound}"] = running
+    return cumulative
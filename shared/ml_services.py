@@ -6,18 +6,216 @@ ML Services for ProDentAI
 import json
 import logging
 import os
-from typing import Any, Dict, List, Optional
+import re
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional
 
 import httpx
-from openai import AsyncOpenAI
+
+try:
+    from opentelemetry import trace
+
+    _tracer = trace.get_tracer(__name__)
+except ImportError:  # трассировка не установлена
+    _tracer = None
 
 logger = logging.getLogger(__name__)
 
+# HTTP-клиент OpenAI: общий пул соединений с keep-alive и HTTP/2
+# (один TLS-handshake на много запросов)
+OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL") or None  # локальный прокси или заглушка
+OPENAI_PROXY = os.getenv("OPENAI_PROXY") or None
+OPENAI_HTTP2 = os.getenv("OPENAI_HTTP2", "true").lower() in ("1", "true", "yes")
+OPENAI_MAX_CONNECTIONS = int(os.getenv("OPENAI_MAX_CONNECTIONS", "100"))
+OPENAI_MAX_KEEPALIVE = int(os.getenv("OPENAI_MAX_KEEPALIVE", "20"))
+OPENAI_KEEPALIVE_EXPIRY = float(os.getenv("OPENAI_KEEPALIVE_EXPIRY", "60"))
+OPENAI_CONNECT_TIMEOUT = float(os.getenv("OPENAI_CONNECT_TIMEOUT", "5"))
+OPENAI_MAX_RETRIES = int(os.getenv("OPENAI_MAX_RETRIES", "2"))
+
+# Таймаут ответа (секунды) по функциям; переопределяется OPENAI_TIMEOUTS_JSON
+FEATURE_TIMEOUTS: Dict[str, float] = {
+    "risk": 60.0,
+    "nutrition": 60.0,
+    "nutrition_image": 120.0,
+    "psychology": 90.0,
+    "psychology_summary": 60.0,
+    "braces": 60.0,
+    "other": 60.0,
+    **json.loads(os.getenv("OPENAI_TIMEOUTS_JSON", "{}")),
+}
+
+
+def feature_timeout(feature: str) -> httpx.Timeout:
+    """Per-request timeout: the feature's read timeout, short connect timeout"""
+    read = FEATURE_TIMEOUTS.get(feature, FEATURE_TIMEOUTS["other"])
+    # Загрузка base64-изображения может идти дольше обычного запроса
+    return httpx.Timeout(read, connect=OPENAI_CONNECT_TIMEOUT, write=read, pool=OPENAI_CONNECT_TIMEOUT)
+
+
+def build_http_client() -> httpx.AsyncClient:
+    """httpx client for the OpenAI API with tuned pool limits, keep-alive and HTTP/2"""
+    http2 = OPENAI_HTTP2
+    if http2:
+        try:
+            import h2  # noqa: F401
+        except ImportError:
+            logger.warning("OPENAI_HTTP2 is on but the h2 package is not installed, using HTTP/1.1")
+            http2 = False
+
+    limits = httpx.Limits(
+        max_connections=OPENAI_MAX_CONNECTIONS,
+        max_keepalive_connections=OPENAI_MAX_KEEPALIVE,
+        keepalive_expiry=OPENAI_KEEPALIVE_EXPIRY,
+    )
+    transport = httpx.AsyncHTTPTransport(
+        http2=http2,
+        limits=limits,
+        proxy=httpx.Proxy(OPENAI_PROXY) if OPENAI_PROXY else None,
+        retries=0,  # повторы делает клиент OpenAI
+    )
+    return httpx.AsyncClient(
+        transport=transport,
+        timeout=feature_timeout("other"),
+        follow_redirects=True,
+    )
+
+
+# ===== Разбор ответов модели и правила без обращения к API =====
+# (чистые функции на горячем пути; скорость - см. benchmarks/)
+
+NUMBER_PATTERN = re.compile(r"\d+\.?\d*")
+
+# Продукты, которые ищем в текстовом ответе Vision API без JSON
+FOOD_KEYWORDS = (
+    "яйцо",
+    "яйца",
+    "бекон",
+    "омлет",
+    "яблоко",
+    "кофе",
+    "чай",
+    "мясо",
+    "хлеб",
+    "сыр",
+    "молоко",
+    "сахар",
+    "соль",
+    "масло",
+    "макароны",
+    "паста",
+    "рис",
+    "картофель",
+    "овощи",
+    "фрукты",
+)
+
+# (ключевые слова, ответ) - первое совпадение выигрывает
+FALLBACK_PSYCHOLOGY_RULES = (
+    (
+        ("страх", "боюсь", "страшно", "тревога"),
+        "Понимаю, что вы чувствуете тревогу перед визитом к стоматологу. Это совершенно нормально! Современная стоматология использует эффективные методы обезболивания, и большинство процедур проходят безболезненно.",
+    ),
+    (
+        ("боль", "болит", "болезненно"),
+        "Я понимаю ваше беспокойство о боли. Современные анестетики делают лечение практически безболезненным. Если у вас есть вопросы о процедуре, не стесняйтесь задавать их стоматологу.",
+    ),
+)
+FALLBACK_PSYCHOLOGY_DEFAULT = "Я здесь, чтобы поддержать вас. Если у вас есть какие-либо опасения по поводу стоматологического лечения, я готов помочь."
+
+FALLBACK_BRACES_RULES = (
+    (
+        ("боль", "болит", "болезненно", "дискомфорт"),
+        "При боли от брекетов попробуйте: 1) Принять обезболивающее по назначению врача, 2) Приложить холод к щеке, 3) Есть мягкую пищу. Боль обычно проходит через 3-5 дней.",
+    ),
+    (
+        ("еда", "питание", "кушать", "можно ли"),
+        "С брекетами можно есть мягкую пищу: йогурты, супы, каши. Избегайте твердых, липких продуктов. Нарежьте твердые овощи и фрукты на мелкие кусочки.",
+    ),
+    (
+        ("чистка", "гигиена", "зубная щетка", "нить"),
+        "Чистите брекеты мягкой щеткой и специальной щеткой для брекетов. Чистите каждый зуб и брекет отдельно. Используйте зубную нить и ирригатор.",
+    ),
+    (
+        ("отклеился", "отвалился", "сломался", "оторвался"),
+        "Если отклеился брекет, немедленно обратитесь к ортодонту. Не пытайтесь приклеить его самостоятельно. Сохраните брекет и принесите на прием.",
+    ),
+)
+FALLBACK_BRACES_DEFAULT = "Я помогу вам с вопросами о брекетах. Опишите вашу проблему более подробно, и я дам конкретные советы."
+
+# Границы уровней риска: < 0.3 - green, < 0.6 - yellow, иначе red
+RISK_LEVEL_THRESHOLDS = ((0.3, "green"), (0.6, "yellow"))
+RISK_MAP_KEYS = {
+    "cavity": "cavity_risk",
+    "gum_disease": "gum_disease_risk",
+    "sensitivity": "sensitivity_risk",
+    "enamel_erosion": "enamel_erosion_risk",
+}
+
+
+def extract_json_object(text: str) -> Optional[Dict[str, Any]]:
+    """
+    The JSON object embedded in model output (text around it is ignored).
+
+    Returns None when there is no {...} span; raises json.JSONDecodeError
+    when the span is not valid JSON.
+    """
+    json_start = text.find("{")
+    json_end = text.rfind("}") + 1
+    if json_start < 0 or json_end <= json_start:
+        return None
+    return json.loads(text[json_start:json_end])
+
+
+def extract_numbers(text: str) -> List[str]:
+    return NUMBER_PATTERN.findall(text)
+
+
+def find_keywords(text: str, keywords) -> List[str]:
+    """Keywords contained in text (case-insensitive), in keyword order"""
+    text_lower = text.lower()
+    return [keyword for keyword in keywords if keyword in text_lower]
+
+
+def match_fallback(message: str, rules, default: str) -> str:
+    """Response of the first rule with a keyword contained in message"""
+    message_lower = message.lower()
+    for keywords, response in rules:
+        if any(word in message_lower for word in keywords):
+            return response
+    return default
+
+
+def risk_level(score: float) -> str:
+    for threshold, level in RISK_LEVEL_THRESHOLDS:
+        if score < threshold:
+            return level
+    return "red"
+
+
+def build_risk_map(risk_scores: Dict[str, float]) -> Dict[str, str]:
+    """Traffic-light level per risk (cavity, gum_disease, ...) from *_risk scores"""
+    return {name: risk_level(risk_scores[key]) for name, key in RISK_MAP_KEYS.items()}
+
+
+@dataclass
+class AICallRecord:
+    """Latency and token usage of one chat completion call"""
+
+    feature: str
+    model: str
+    latency_seconds: float
+    success: bool
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    reasoning_tokens: int = 0
+
 
 class MLServiceManager:
     """Manager for all ML services using API"""
 
-    def __init__(self):
+    def __init__(self, http_client: Optional[httpx.AsyncClient] = None):
+        """http_client: custom httpx client for the API (default: build_http_client())"""
         # Настройка OpenAI API клиента
         # В Docker переменные окружения уже загружены через env_file
         # Но на всякий случай попробуем загрузить .env если он есть
@@ -28,11 +226,23 @@ class MLServiceManager:
         self.api_key = os.getenv("OPENAI_API_KEY")
         self.model_name = os.getenv("AI_MODEL", "gpt-3.5-turbo")
 
+        # Наблюдатели за вызовами API (метрики, учет токенов)
+        self._call_observers: List[Callable[[AICallRecord], None]] = []
+
         # Инициализация OpenAI клиента
         if self.api_key:
-            self.client = AsyncOpenAI(api_key=self.api_key)
+            # openai импортируется только при наличии ключа (долгий импорт)
+            from openai import AsyncOpenAI
+
+            self.client = AsyncOpenAI(
+                api_key=self.api_key,
+                base_url=OPENAI_BASE_URL,
+                http_client=http_client or build_http_client(),
+                max_retries=OPENAI_MAX_RETRIES,
+            )
             logger.info(
-                f"Initialized ML Service with OpenAI API (model: {self.model_name})"
+                f"Initialized ML Service with OpenAI API (model: {self.model_name}"
+                f"{', base URL: ' + OPENAI_BASE_URL if OPENAI_BASE_URL else ''})"
             )
         else:
             self.client = None
@@ -50,14 +260,85 @@ class MLServiceManager:
         except Exception as e:
             logger.error(f"Error initializing AI API: {e}")
 
+    async def aclose(self):
+        """Close the API client's connection pool"""
+        if self.client:
+            await self.client.close()
+
+    async def warm_up(self, timeout: float = 5.0) -> bool:
+        """Open the HTTPS connection to the API ahead of the first request"""
+        if not self.client:
+            return False
+        await self.client.with_options(timeout=timeout, max_retries=0).models.retrieve(
+            self.model_name
+        )
+        return True
+
+    def add_call_observer(self, observer: Callable[[AICallRecord], None]):
+        """Register a callback invoked after every chat completion call"""
+        self._call_observers.append(observer)
+
+    async def _create_completion(self, feature: str, create_params: Dict[str, Any]):
+        """chat.completions.create with latency and token usage reported to observers"""
+        start = time.perf_counter()
+        response = None
+        try:
+            if _tracer is None:
+                response = await self.client.chat.completions.create(
+                    **create_params, timeout=feature_timeout(feature)
+                )
+                return response
+            # Без настроенного провайдера (tracing.setup_tracing) спан ничего не стоит
+            with _tracer.start_as_current_span(
+                "openai.chat.completions",
+                kind=trace.SpanKind.CLIENT,
+                attributes={"ai.feature": feature, "gen_ai.request.model": create_params["model"]},
+            ) as span:
+                response = await self.client.chat.completions.create(
+                    **create_params, timeout=feature_timeout(feature)
+                )
+                usage = getattr(response, "usage", None)
+                if usage is not None and span.is_recording():
+                    span.set_attribute("gen_ai.usage.input_tokens", usage.prompt_tokens or 0)
+                    span.set_attribute("gen_ai.usage.output_tokens", usage.completion_tokens or 0)
+            return response
+        finally:
+            if self._call_observers:
+                self._notify_observers(
+                    feature,
+                    create_params["model"],
+                    time.perf_counter() - start,
+                    response,
+                )
+
+    def _notify_observers(self, feature: str, model: str, latency: float, response):
+        usage = getattr(response, "usage", None)
+        details = getattr(usage, "completion_tokens_details", None)
+        record = AICallRecord(
+            feature=feature,
+            model=model,
+            latency_seconds=latency,
+            success=response is not None,
+            prompt_tokens=getattr(usage, "prompt_tokens", 0) or 0,
+            completion_tokens=getattr(usage, "completion_tokens", 0) or 0,
+            reasoning_tokens=getattr(details, "reasoning_tokens", 0) or 0,
+        )
+        for observer in self._call_observers:
+            try:
+                observer(record)
+            except Exception as e:
+                logger.warning(f"AI call observer failed: {e}")
+
     async def _call_ai_api(
         self,
         system_prompt: str,
         user_prompt: str,
         response_format: Optional[str] = None,
         model_override: Optional[str] = None,
+        history: Optional[List[Dict[str, str]]] = None,
+        feature: str = "other",
     ) -> str:
-        """Вызов OpenAI API"""
+        """Вызов OpenAI API (history - предыдущие реплики диалога, по порядку)"""
         if not self.client:
             logger.warning("AI API not configured, returning empty response")
             return ""
@@ -69,6 +350,7 @@ class MLServiceManager:
         try:
             messages = [
                 {"role": "system", "content": system_prompt},
+                *(history or []),
                 {"role": "user", "content": user_prompt},
             ]
 
@@ -100,7 +382,7 @@ class MLServiceManager:
                 create_params["max_tokens"] = 1000
                 create_params["temperature"] = 0.7
 
-            response = await self.client.chat.completions.create(**create_params)
+            response = await self._create_completion(feature, create_params)
 
             # Детальное логирование для отладки
             logger.info(
@@ -226,15 +508,13 @@ class MLServiceManager:
 
             if self.client:
                 response = await self._call_ai_api(
-                    system_prompt, user_prompt, model_override=risk_model
+                    system_prompt, user_prompt, model_override=risk_model, feature="risk"
                 )
                 if response:
                     try:
                         # Пытаемся извлечь JSON из ответа
-                        json_start = response.find("{")
-                        json_end = response.rfind("}") + 1
-                        if json_start >= 0 and json_end > json_start:
-                            result = json.loads(response[json_start:json_end])
+                        result = extract_json_object(response)
+                        if result is not None:
                             logger.info(
                                 f"Risk assessment completed: {len(result.get('recommendations', []))} recommendations"
                             )
@@ -369,17 +649,18 @@ class MLServiceManager:
                 )
                 # Используем специальную модель для nutrition analysis
                 response = await self._call_ai_api(
-                    system_prompt, user_prompt, model_override=nutrition_model
+                    system_prompt,
+                    user_prompt,
+                    model_override=nutrition_model,
+                    feature="nutrition",
                 )
 
                 if response:
                     logger.debug(f"AI Response (first 500 chars): {response[:500]}...")
                     try:
                         # Извлекаем JSON из ответа
-                        json_start = response.find("{")
-                        json_end = response.rfind("}") + 1
-                        if json_start >= 0 and json_end > json_start:
-                            analysis = json.loads(response[json_start:json_end])
+                        analysis = extract_json_object(response)
+                        if analysis is not None:
                             logger.info(
                                 f"Nutrition analysis completed: {len(analysis.get('food_items', []))} items found"
                             )
@@ -518,7 +799,7 @@ class MLServiceManager:
                 create_params["max_tokens"] = 2000
                 create_params["temperature"] = 0.7
 
-            response = await self.client.chat.completions.create(**create_params)
+            response = await self._create_completion("nutrition_image", create_params)
 
             if response and response.choices and len(response.choices) > 0:
                 content = response.choices[0].message.content
@@ -531,16 +812,8 @@ class MLServiceManager:
                     logger.info(f"Vision API full response: {content}")
 
                     try:
-                        json_start = content.find("{")
-                        json_end = content.rfind("}") + 1
-                        if json_start >= 0 and json_end > json_start:
-                            json_str = content[json_start:json_end]
-                            logger.debug(
-                                f"Extracted JSON (first 300 chars): {json_str[:300]}"
-                            )
-
-                            analysis = json.loads(json_str)
-
+                        analysis = extract_json_object(content)
+                        if analysis is not None:
                             # Убеждаемся, что summary присутствует
                             if "summary" not in analysis or not analysis.get("summary"):
                                 logger.warning(
@@ -574,9 +847,7 @@ class MLServiceManager:
                             )
                             return analysis
                         else:
-                            logger.warning(
-                                f"Could not find JSON in response. json_start={json_start}, json_end={json_end}"
-                            )
+                            logger.warning("Could not find JSON in response")
                             logger.warning(f"Full content: {content}")
 
                             # Проверяем, не отказался ли API анализировать изображение
@@ -603,38 +874,9 @@ class MLServiceManager:
                             logger.info(
                                 "Attempting to extract information from text response"
                             )
-                            import re
-
-                            # Пытаемся найти упоминания продуктов и чисел
-                            food_keywords = [
-                                "яйцо",
-                                "яйца",
-                                "бекон",
-                                "омлет",
-                                "яблоко",
-                                "кофе",
-                                "чай",
-                                "мясо",
-                                "хлеб",
-                                "сыр",
-                                "молоко",
-                                "сахар",
-                                "соль",
-                                "масло",
-                                "макароны",
-                                "паста",
-                                "рис",
-                                "картофель",
-                                "овощи",
-                                "фрукты",
-                            ]
-                            found_foods = []
-                            for keyword in food_keywords:
-                                if keyword.lower() in content.lower():
-                                    found_foods.append(keyword)
-
-                            # Пытаемся найти числа (калории, сахар)
-                            numbers = re.findall(r"\d+\.?\d*", content)
+                            # Пытаемся найти упоминания продуктов и чисел (калории, сахар)
+                            found_foods = find_keywords(content, FOOD_KEYWORDS)
+                            numbers = extract_numbers(content)
 
                             # Создаем анализ из текста
                             summary_text = (
@@ -680,24 +922,7 @@ class MLServiceManager:
                         logger.warning(f"Response was: {content}")
 
                         # Создаем анализ из текста даже при ошибке парсинга
-                        import re
-
-                        food_keywords = [
-                            "яйцо",
-                            "яйца",
-                            "бекон",
-                            "омлет",
-                            "яблоко",
-                            "кофе",
-                            "чай",
-                            "мясо",
-                            "хлеб",
-                            "сыр",
-                            "молоко",
-                        ]
-                        found_foods = [
-                            kw for kw in food_keywords if kw.lower() in content.lower()
-                        ]
+                        found_foods = find_keywords(content, FOOD_KEYWORDS)
 
                         fallback_analysis = {
                             "food_items": (
@@ -738,8 +963,18 @@ class MLServiceManager:
                 food_description or "еда на изображении"
             )
 
-    async def get_psychology_response(self, user_message: str) -> str:
-        """Get psychology support response using AI"""
+    async def get_psychology_response(
+        self,
+        user_message: str,
+        history: Optional[List[Dict[str, str]]] = None,
+        summary: Optional[str] = None,
+    ) -> str:
+        """
+        Get psychology support response using AI.
+
+        history holds the previous turns that fit the prompt budget, summary
+        a short recap of older turns of the same conversation.
+        """
         try:
             # Проверяем что клиент инициализирован
             if not self.client:
@@ -775,6 +1010,12 @@ class MLServiceManager:
 - Не заменяй консультацию стоматолога
 - Поддерживай и мотивируй"""
 
+            if summary:
+                system_prompt += f"""
+
+Краткое содержание предыдущей части разговора (учитывай его, но не пересказывай):
+{summary}"""
+
             user_prompt = f"""Пользователь написал: "{user_message}"
 
 ОБЯЗАТЕЛЬНО: Проанализируй это сообщение и дай персонализированный ответ, который напрямую относится к тому, что написал пользователь. Если это вопрос - ответь на вопрос. Если это описание ситуации - дай совет по этой ситуации. НЕ используй общие шаблонные фразы."""
@@ -782,7 +1023,11 @@ class MLServiceManager:
             logger.info(f"Calling AI API with message: {user_message[:100]}...")
             # Use gpt-4o for psychology chat (gpt-5-nano is not available in all regions)
             response = await self._call_ai_api(
-                system_prompt, user_prompt, model_override="gpt-4o"
+                system_prompt,
+                user_prompt,
+                model_override="gpt-4o",
+                history=history,
+                feature="psychology",
             )
 
             if response and response.strip():
@@ -796,6 +1041,36 @@ class MLServiceManager:
             logger.error(f"Error in psychology response: {e}", exc_info=True)
             return self._get_fallback_psychology_response(user_message)
 
+    async def summarize_conversation(
+        self, previous_summary: Optional[str], turns: List[Dict[str, str]]
+    ) -> Optional[str]:
+        """Fold older turns into the rolling conversation summary"""
+        if not self.client or not turns:
+            return None
+
+        system_prompt = """Ты ведешь краткий конспект разговора психологического помощника с пользователем, который боится стоматолога.
+Обнови конспект с учетом новых реплик. Сохрани: страхи и ситуацию пользователя, важные факты о нем, что уже советовали и что помогло.
+Пиши по-русски, в третьем лице, не более 120 слов. Верни только текст конспекта."""
+
+        transcript = "\n".join(
+            f"{'Пользователь' if t['role'] == 'user' else 'Помощник'}: {t['content']}"
+            for t in turns
+        )
+        user_prompt = f"""Текущий конспект:
+{previous_summary or "(пока пусто)"}
+
+Новые реплики:
+{transcript}"""
+
+        try:
+            summary = await self._call_ai_api(
+                system_prompt, user_prompt, feature="psychology_summary"
+            )
+            return summary.strip() or None
+        except Exception as e:
+            logger.error(f"Error summarizing conversation: {e}")
+            return None
+
     def _get_default_risks(self) -> Dict[str, float]:
         """Get default risk values"""
         return {
@@ -841,17 +1116,9 @@ class MLServiceManager:
 
     def _get_fallback_psychology_response(self, message: str) -> str:
         """Fallback psychology response"""
-        message_lower = message.lower()
-
-        if any(
-            word in message_lower for word in ["страх", "боюсь", "страшно", "тревога"]
-        ):
-            return "Понимаю, что вы чувствуете тревогу перед визитом к стоматологу. Это совершенно нормально! Современная стоматология использует эффективные методы обезболивания, и большинство процедур проходят безболезненно."
-
-        if any(word in message_lower for word in ["боль", "болит", "болезненно"]):
-            return "Я понимаю ваше беспокойство о боли. Современные анестетики делают лечение практически безболезненным. Если у вас есть вопросы о процедуре, не стесняйтесь задавать их стоматологу."
-
-        return "Я здесь, чтобы поддержать вас. Если у вас есть какие-либо опасения по поводу стоматологического лечения, я готов помочь."
+        return match_fallback(
+            message, FALLBACK_PSYCHOLOGY_RULES, FALLBACK_PSYCHOLOGY_DEFAULT
+        )
 
     async def get_braces_response(self, user_message: str) -> str:
         """Get AI response for braces-related questions"""
@@ -876,7 +1143,7 @@ class MLServiceManager:
 ОБЯЗАТЕЛЬНО: Проанализируй это сообщение и дай персонализированный ответ, который напрямую относится к тому, что написал пользователь. Если это вопрос - ответь на вопрос. Если это описание ситуации - дай совет по этой ситуации. НЕ используй общие шаблонные фразы."""
 
             logger.info(f"Calling AI API for braces question: {user_message[:100]}...")
-            response = await self._call_ai_api(system_prompt, user_prompt)
+            response = await self._call_ai_api(system_prompt, user_prompt, feature="braces")
 
             if response and response.strip():
                 logger.info(f"AI API returned braces response: {response[:100]}...")
@@ -891,29 +1158,4 @@ class MLServiceManager:
 
     def _get_fallback_braces_response(self, message: str) -> str:
         """Fallback braces response"""
-        message_lower = message.lower()
-
-        if any(
-            word in message_lower
-            for word in ["боль", "болит", "болезненно", "дискомфорт"]
-        ):
-            return "При боли от брекетов попробуйте: 1) Принять обезболивающее по назначению врача, 2) Приложить холод к щеке, 3) Есть мягкую пищу. Боль обычно проходит через 3-5 дней."
-
-        if any(
-            word in message_lower for word in ["еда", "питание", "кушать", "можно ли"]
-        ):
-            return "С брекетами можно есть мягкую пищу: йогурты, супы, каши. Избегайте твердых, липких продуктов. Нарежьте твердые овощи и фрукты на мелкие кусочки."
-
-        if any(
-            word in message_lower
-            for word in ["чистка", "гигиена", "зубная щетка", "нить"]
-        ):
-            return "Чистите брекеты мягкой щеткой и специальной щеткой для брекетов. Чистите каждый зуб и брекет отдельно. Используйте зубную нить и ирригатор."
-
-        if any(
-            word in message_lower
-            for word in ["отклеился", "отвалился", "сломался", "оторвался"]
-        ):
-            return "Если отклеился брекет, немедленно обратитесь к ортодонту. Не пытайтесь приклеить его самостоятельно. Сохраните брекет и принесите на прием."
-
-        return "Я помогу вам с вопросами о брекетах. Опишите вашу проблему более подробно, и я дам конкретные советы."
+        return match_fallback(message, FALLBACK_BRACES_RULES, FALLBACK_BRACES_DEFAULT)
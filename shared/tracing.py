@@ -0,0 +1,149 @@
+"""
+OpenTelemetry tracing for the backend and the Telegram bot
+
+Tracing is optional: without the opentelemetry packages, or with
+OTEL_TRACES_EXPORTER=none (the default), every helper here is a no-op.
+
+- otlp: spans go to an OTLP/HTTP collector (OTEL_EXPORTER_OTLP_ENDPOINT,
+  default http://localhost:4318)
+- file: one JSON span per line in TRACING_FILE (for tests and local runs)
+- console: spans printed to stdout
+
+Outgoing httpx requests carry the W3C traceparent header and FastAPI
+continues the trace, so a bot update, the backend route it calls, the
+SQL queries and the OpenAI call end up in one trace.
+"""
+
+import functools
+import logging
+import os
+from contextlib import contextmanager
+from typing import Any, Dict, Iterable, Iterator, Optional
+
+logger = logging.getLogger(__name__)
+
+TRACES_EXPORTER = os.getenv("OTEL_TRACES_EXPORTER", "none").lower()
+TRACING_FILE = os.getenv("TRACING_FILE", "traces.jsonl")
+# Доля трассируемых корневых запросов (дочерние спаны следуют решению родителя)
+TRACING_SAMPLE_RATIO = float(os.getenv("TRACING_SAMPLE_RATIO", "1.0"))
+# Эти пути не трассируем (сбор метрик, проверки живости)
+TRACING_EXCLUDED_URLS = os.getenv("TRACING_EXCLUDED_URLS", "metrics,api/health")
+
+try:
+    from opentelemetry import trace
+except ImportError:  # трассировка не установлена
+    trace = None
+
+_provider = None
+
+
+def tracing_enabled() -> bool:
+    return _provider is not None
+
+
+def _make_exporter():
+    if TRACES_EXPORTER == "otlp":
+        from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+
+        return OTLPSpanExporter()
+
+    from opentelemetry.sdk.trace.export import ConsoleSpanExporter
+
+    if TRACES_EXPORTER == "file":
+        out = open(TRACING_FILE, "a", encoding="utf-8", buffering=1)
+        return ConsoleSpanExporter(
+            out=out, formatter=lambda span: span.to_json(indent=None) + "\n"
+        )
+    return ConsoleSpanExporter()
+
+
+def setup_tracing(
+    service_name: str,
+    app: Any = None,
+    engines: Iterable[Any] = (),
+    instrument_httpx: bool = True,
+) -> bool:
+    """
+    Configure the tracer provider and instrument the given libraries.
+
+    app is a FastAPI application, engines are SQLAlchemy AsyncEngines.
+    Returns False (and changes nothing) when tracing is off or unavailable.
+    """
+    global _provider
+    if TRACES_EXPORTER == "none" or _provider is not None:
+        return _provider is not None
+    if trace is None:
+        logger.warning("OTEL_TRACES_EXPORTER is set but opentelemetry is not installed")
+        return False
+
+    try:
+        from opentelemetry.sdk.resources import Resource
+        from opentelemetry.sdk.trace import TracerProvider
+        from opentelemetry.sdk.trace.export import BatchSpanProcessor
+        from opentelemetry.sdk.trace.sampling import ParentBased, TraceIdRatioBased
+
+        provider = TracerProvider(
+            resource=Resource.create(
+                {"service.name": os.getenv("OTEL_SERVICE_NAME", service_name)}
+            ),
+            sampler=ParentBased(TraceIdRatioBased(TRACING_SAMPLE_RATIO)),
+        )
+        provider.add_span_processor(BatchSpanProcessor(_make_exporter()))
+        trace.set_tracer_provider(provider)
+        _provider = provider
+
+        if app is not None:
+            from opentelemetry.instrumentation.fastapi import FastAPIInstrumentor
+
+            FastAPIInstrumentor.instrument_app(app, excluded_urls=TRACING_EXCLUDED_URLS)
+
+        if instrument_httpx:
+            from opentelemetry.instrumentation.httpx import HTTPXClientInstrumentor
+
+            HTTPXClientInstrumentor().instrument()
+
+        engines = list(engines)
+        if engines:
+            from opentelemetry.instrumentation.sqlalchemy import SQLAlchemyInstrumentor
+
+            SQLAlchemyInstrumentor().instrument(
+                engines=[engine.sync_engine for engine in engines],
+                enable_commenter=False,
+            )
+    except Exception as e:
+        logger.error(f"Tracing setup failed: {e}")
+        return _provider is not None
+
+    logger.info(f"Tracing enabled for {service_name} (exporter: {TRACES_EXPORTER})")
+    return True
+
+
+def shutdown_tracing():
+    """Export spans still buffered in the batch processor"""
+    if _provider is not None:
+        _provider.shutdown()
+
+
+@contextmanager
+def span(name: str, attributes: Optional[Dict[str, Any]] = None) -> Iterator[Optional[Any]]:
+    """Child span of the current one; yields None when tracing is off"""
+    if _provider is None:
+        yield None
+        return
+    tracer = trace.get_tracer("prodentai")
+    with tracer.start_as_current_span(name, attributes=attributes) as current:
+        yield current
+
+
+def traced(name: str):
+    """Decorator wrapping a coroutine function in a span"""
+
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            with span(name):
+                return await func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,102 @@
+"""
+Direct read-only data access for the bot's most frequent queries
+
+User lookup by telegram_id, random facts and due reminders are read straight
+from PostgreSQL through the bot's own connection pool instead of going
+through the backend API. Each query is enabled separately via
+BOT_DB_QUERIES; callers fall back to HTTP when a query is disabled, the
+database is unavailable or the query fails.
+"""
+
+import logging
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import List, Optional, Tuple
+
+import database
+from config import Config
+from reminder_rules import filter_due_reminders
+from sqlalchemy import text
+
+logger = logging.getLogger(__name__)
+
+USER_LOOKUP = "user_lookup"
+RANDOM_FACT = "random_fact"
+DUE_REMINDERS = "due_reminders"
+
+# telegram_id -> (user_id, время истечения). Telegram-аккаунт можно отвязать
+# и привязать к другому пользователю, поэтому запись живет USER_ID_CACHE_TTL
+_user_ids: "OrderedDict[int, Tuple[int, float]]" = OrderedDict()
+
+
+def use_db(query: str) -> bool:
+    """Whether the query should be served from the database"""
+    return database.db_available and query in Config.BOT_DB_QUERIES
+
+
+async def get_user_id(telegram_id: int) -> Optional[int]:
+    """Backend user id for a Telegram user (None if not registered yet)"""
+    cached = _user_ids.get(telegram_id)
+    if cached is not None:
+        user_id, expires_at = cached
+        if time.monotonic() < expires_at:
+            _user_ids.move_to_end(telegram_id)
+            return user_id
+        del _user_ids[telegram_id]
+
+    async with database.AsyncSessionLocal() as session:
+        result = await session.execute(
+            text("SELECT id FROM users WHERE telegram_id = :telegram_id"),
+            {"telegram_id": telegram_id},
+        )
+        user_id = result.scalar_one_or_none()
+
+    if user_id is not None:
+        remember_user_id(telegram_id, user_id)
+    return user_id
+
+
+def remember_user_id(telegram_id: int, user_id: int):
+    """Cache a mapping (from the database or the backend API) for USER_ID_CACHE_TTL"""
+    if telegram_id and user_id:
+        _user_ids[telegram_id] = (user_id, time.monotonic() + Config.USER_ID_CACHE_TTL)
+        _user_ids.move_to_end(telegram_id)
+        while len(_user_ids) > Config.USER_ID_CACHE_SIZE:
+            _user_ids.popitem(last=False)
+
+
+async def get_random_fact() -> Optional[dict]:
+    """Random active fact (None if the table is empty)"""
+    async with database.AsyncSessionLocal() as session:
+        result = await session.execute(
+            text("""
+                SELECT id, title, content, category
+                FROM facts
+                WHERE is_active
+                ORDER BY random()
+                LIMIT 1
+            """)
+        )
+        row = result.mappings().first()
+    return dict(row) if row else None
+
+
+async def get_due_reminders(now: datetime) -> List[dict]:
+    """Active reminders due at this minute, joined with the user's telegram_id"""
+    async with database.AsyncSessionLocal() as session:
+        result = await session.execute(
+            text("""
+                SELECT r.id AS reminder_id, r.user_id, u.telegram_id, r.message,
+                       r.is_active, r.time, r.date
+                FROM reminders r
+                JOIN users u ON u.id = r.user_id
+                WHERE r.is_active
+                  AND r.time = :time
+                  AND u.telegram_id IS NOT NULL
+            """),
+            {"time": now.strftime("%H:%M")},
+        )
+        rows = [dict(row) for row in result.mappings().all()]
+    # Дату проверяем тем же правилом, что и HTTP-путь (в том числе 2026-3-14)
+    return filter_due_reminders(rows, now)
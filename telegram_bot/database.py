@@ -2,18 +2,32 @@
 Database configuration for Telegram Bot
 """
 
+import os
+import sys
+
 from config import Config
 from sqlalchemy import text
-from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
 
-# Create async engine
-engine = create_async_engine(
-    Config.DATABASE_URL.replace("postgresql://", "postgresql+asyncpg://")
+# shared/ монтируется в /shared в Docker и лежит рядом с telegram_bot/ локально
+SHARED_DIR = (
+    "/shared"
+    if os.path.exists("/shared")
+    else os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "shared")
 )
+if SHARED_DIR not in sys.path:
+    sys.path.insert(0, SHARED_DIR)
+
+from db_engine import create_engine  # noqa: E402
+
+# Create async engine; pool settings come from DB_* variables
+engine = create_engine(Config.DATABASE_URL, name="telegram_bot")
 
 # Create session factory
-AsyncSessionLocal = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+AsyncSessionLocal = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+# Выставляется в init_db; без соединения все запросы идут через backend API
+db_available = False
 
 
 async def get_db():
@@ -27,12 +41,15 @@ async def get_db():
 
 async def init_db():
     """Initialize database connection"""
+    global db_available
     try:
         async with engine.begin() as conn:
             # Test connection
             await conn.execute(text("SELECT 1"))
+        db_available = True
         print("Database connection established")
     except Exception as e:
+        db_available = False
         print(f"Database connection failed: {e}")
         # Don't raise - allow bot to start even if DB is not available
         print("Warning: Bot will continue without database connection")
@@ -4,11 +4,13 @@ Main handlers for Telegram Bot
 
 from typing import Optional
 
+import data_access
 import httpx
 from config import Config
 from telegram import InlineKeyboardButton, InlineKeyboardMarkup, Update
 from telegram.constants import ChatAction
 from telegram.ext import ContextTypes
+from tracing import traced
 
 
 async def start_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -214,12 +216,20 @@ async def facts_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
         "myths": "Мифы",
     }
 
+    fact_data = None
+    if data_access.use_db(data_access.RANDOM_FACT):
+        try:
+            fact_data = await data_access.get_random_fact()
+        except Exception as e:
+            print(f"Error fetching fact from database: {e}")
+
     # Get random fact from backend
     async with httpx.AsyncClient() as client:
         try:
-            api_endpoints = Config.get_api_endpoints()
-            response = await client.get(f"{api_endpoints['facts']}/random")
-            fact_data = response.json()
+            if fact_data is None:
+                api_endpoints = Config.get_api_endpoints()
+                response = await client.get(f"{api_endpoints['facts']}/random")
+                fact_data = response.json()
 
             category = fact_data.get("category", "")
             category_ru = category_translations.get(category, category)
@@ -254,6 +264,7 @@ async def facts_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
         await update.callback_query.edit_message_text(text, reply_markup=reply_markup)
 
 
+@traced("get_user_id_from_telegram")
 async def get_user_id_from_telegram(
     update: Update, context: ContextTypes.DEFAULT_TYPE
 ) -> Optional[int]:
@@ -262,6 +273,15 @@ async def get_user_id_from_telegram(
     if not user:
         return None
 
+    if data_access.use_db(data_access.USER_LOOKUP):
+        try:
+            user_id = await data_access.get_user_id(user.id)
+            if user_id is not None:
+                return user_id
+        except Exception as e:
+            print(f"Error looking up user in database: {e}")
+
+    # Not registered yet (or no DB access) - register through backend
     async with httpx.AsyncClient() as client:
         try:
             api_endpoints = Config.get_api_endpoints()
@@ -277,6 +297,7 @@ async def get_user_id_from_telegram(
             )
             if response.status_code == 200:
                 user_data = response.json()
+                data_access.remember_user_id(user.id, user_data.get("id"))
                 return user_data.get("id")
         except Exception as e:
             print(f"Error getting user ID: {e}")
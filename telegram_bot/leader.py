@@ -0,0 +1,127 @@
+"""
+Redis-based leader election for singleton background jobs
+
+Several bot replicas run behind the webhook, but jobs such as the reminder
+scheduler must run on exactly one of them. Each replica tries to take a
+Redis lock (SET NX PX); the holder runs the job and keeps renewing the lock.
+If the holder dies, the lock expires and another replica takes over.
+"""
+
+import asyncio
+import logging
+import uuid
+from typing import Awaitable, Callable, Optional
+
+import redis.asyncio as aioredis
+
+logger = logging.getLogger(__name__)
+
+# Продлеваем/снимаем блокировку только если она все еще наша
+_RENEW_SCRIPT = """
+if redis.call("GET", KEYS[1]) == ARGV[1] then
+    return redis.call("PEXPIRE", KEYS[1], ARGV[2])
+end
+return 0
+"""
+
+_RELEASE_SCRIPT = """
+if redis.call("GET", KEYS[1]) == ARGV[1] then
+    return redis.call("DEL", KEYS[1])
+end
+return 0
+"""
+
+
+class LeaderLock:
+    """A single named lock held by at most one process at a time"""
+
+    def __init__(self, redis: aioredis.Redis, name: str, ttl_seconds: float):
+        self.redis = redis
+        self.key = f"bot:leader:{name}"
+        self.ttl_ms = int(ttl_seconds * 1000)
+        self.token = uuid.uuid4().hex
+
+    async def acquire(self) -> bool:
+        return bool(await self.redis.set(self.key, self.token, nx=True, px=self.ttl_ms))
+
+    async def renew(self) -> bool:
+        return bool(
+            await self.redis.eval(_RENEW_SCRIPT, 1, self.key, self.token, self.ttl_ms)
+        )
+
+    async def release(self):
+        await self.redis.eval(_RELEASE_SCRIPT, 1, self.key, self.token)
+
+
+async def _stop_job(name: str, job_task: asyncio.Task):
+    """Cancel the job and wait until it has actually stopped"""
+    job_task.cancel()
+    try:
+        await job_task
+    except asyncio.CancelledError:
+        pass
+    except Exception as e:
+        logger.error(f"Leader job '{name}' failed while stopping: {e}", exc_info=e)
+
+
+async def run_as_leader(
+    redis: aioredis.Redis,
+    name: str,
+    job: Callable[[], Awaitable[None]],
+    ttl_seconds: float = 30.0,
+):
+    """
+    Run job() only while this process holds the named lock.
+
+    The lock is renewed every ttl/3 seconds. If renewal fails (lock lost or
+    Redis unreachable for longer than the TTL), the job is cancelled and
+    awaited, and the process goes back to waiting for the lock. A handover
+    can still overlap by up to the TTL, so the job must tolerate a second
+    instance briefly (the reminder scheduler deduplicates sends).
+    """
+    lock = LeaderLock(redis, name, ttl_seconds)
+    interval = ttl_seconds / 3
+    loop = asyncio.get_running_loop()
+    job_task: Optional[asyncio.Task] = None
+    renewed_at = 0.0
+
+    try:
+        while True:
+            try:
+                if job_task is None:
+                    if await lock.acquire():
+                        logger.info(f"Acquired leadership for '{name}'")
+                        renewed_at = loop.time()
+                        job_task = asyncio.create_task(job())
+                elif job_task.done():
+                    # Задача завершилась сама (ошибка) - отдаем лидерство
+                    error = None if job_task.cancelled() else job_task.exception()
+                    logger.error(
+                        f"Leader job '{name}' stopped ({error!r}), releasing lock",
+                        exc_info=error,
+                    )
+                    job_task = None
+                    await lock.release()
+                elif await lock.renew():
+                    renewed_at = loop.time()
+                else:
+                    logger.warning(f"Lost leadership for '{name}', stopping job")
+                    task, job_task = job_task, None
+                    await _stop_job(name, task)
+            except Exception as e:
+                logger.error(f"Leader election error for '{name}': {e}")
+
+            # Redis недоступен дольше TTL - блокировку мог взять другой экземпляр
+            if job_task is not None and loop.time() - renewed_at > ttl_seconds:
+                logger.warning(f"Could not renew leadership for '{name}', stopping job")
+                task, job_task = job_task, None
+                await _stop_job(name, task)
+
+            await asyncio.sleep(interval)
+    finally:
+        if job_task is not None:
+            await _stop_job(name, job_task)
+            try:
+                await lock.release()
+            except Exception:
+                pass
@@ -7,8 +7,9 @@ import asyncio
 import logging
 import os
 
+import redis.asyncio as aioredis
 from config import Config
-from database import init_db
+from database import engine, init_db
 from dotenv import load_dotenv
 from handlers import (  # nutrition_handler,  # Закомментировано - анализ питания отключен
     button_callback_handler,
@@ -19,7 +20,11 @@ from handlers import (  # nutrition_handler,  # Закомментировано
     reminders_handler,
     start_handler,
 )
+from leader import run_as_leader
+from persistence import RedisPersistence
 from scheduler import reminder_scheduler
+from tracing import setup_tracing, shutdown_tracing
+from update_processor import PerChatUpdateProcessor
 from telegram import Update
 from telegram.ext import (
     Application,
@@ -46,13 +51,38 @@ def main():
         logger.error("TELEGRAM_BOT_TOKEN is not set in environment variables!")
         raise ValueError("TELEGRAM_BOT_TOKEN is required")
 
+    # Трассировка: обработка обновлений, запросы к backend (traceparent) и к БД
+    setup_tracing("prodentai-telegram-bot", engines=[engine])
+
+    # Redis нужен для состояния диалогов и выбора лидера планировщика
+    redis = None
+    if Config.BOT_PERSISTENCE == "redis" or Config.BOT_MODE == "webhook":
+        redis = aioredis.from_url(Config.REDIS_URL, decode_responses=True)
+
     # Create application
+    builder = Application.builder().token(Config.TELEGRAM_BOT_TOKEN)
+    if Config.BOT_PERSISTENCE == "redis":
+        builder = builder.persistence(
+            RedisPersistence(
+                redis,
+                update_interval=Config.PERSISTENCE_FLUSH_INTERVAL,
+                ttl_seconds=Config.STATE_TTL_SECONDS,
+            )
+        )
     application = (
-        Application.builder()
-        .token(Config.TELEGRAM_BOT_TOKEN)
+        builder
+        .concurrent_updates(
+            PerChatUpdateProcessor(
+                max_in_flight=Config.CONCURRENT_UPDATES,
+                max_pending=Config.MAX_PENDING_UPDATES,
+                stats_interval=Config.UPDATE_STATS_INTERVAL,
+            )
+        )
         .post_init(post_init)
+        .post_shutdown(post_shutdown)
         .build()
     )
+    application.bot_data["redis"] = redis
 
     # Add handlers
     application.add_handler(CommandHandler("start", start_handler))
@@ -77,8 +107,24 @@ def main():
     # application.add_handler(MessageHandler(filters.PHOTO, photo_handler))
 
     # Start bot
-    logger.info("Starting ProDentAI Telegram Bot...")
-    application.run_polling(drop_pending_updates=True)
+    if Config.BOT_MODE == "webhook":
+        if not Config.WEBHOOK_URL:
+            raise ValueError("WEBHOOK_URL is required when BOT_MODE=webhook")
+        logger.info(
+            f"Starting ProDentAI Telegram Bot (webhook on port {Config.WEBHOOK_PORT})..."
+        )
+        # Несколько реплик регистрируют один и тот же URL - setWebhook идемпотентен.
+        # Очередь обновлений не сбрасываем: ее обработают остальные реплики
+        application.run_webhook(
+            listen=Config.WEBHOOK_LISTEN,
+            port=Config.WEBHOOK_PORT,
+            url_path=Config.WEBHOOK_PATH.lstrip("/"),
+            webhook_url=Config.WEBHOOK_URL.rstrip("/") + Config.WEBHOOK_PATH,
+            secret_token=Config.WEBHOOK_SECRET_TOKEN,
+        )
+    else:
+        logger.info("Starting ProDentAI Telegram Bot (polling)...")
+        application.run_polling(drop_pending_updates=True)
 
 
 async def post_init(application: Application) -> None:
@@ -93,8 +139,39 @@ async def post_init(application: Application) -> None:
 
     # Start reminder scheduler in background
     bot = application.bot
-    logger.info("Starting reminder scheduler...")
-    asyncio.create_task(reminder_scheduler(bot))
+    if Config.BOT_MODE == "webhook":
+        # Реплик несколько - напоминания отправляет только держатель блокировки
+        redis = application.bot_data["redis"]
+        logger.info("Starting reminder scheduler (leader election)...")
+        task = asyncio.create_task(
+            run_as_leader(
+                redis,
+                "reminder_scheduler",
+                lambda: reminder_scheduler(bot, redis),
+                ttl_seconds=Config.SCHEDULER_LOCK_TTL,
+            )
+        )
+    else:
+        logger.info("Starting reminder scheduler...")
+        task = asyncio.create_task(reminder_scheduler(bot, application.bot_data["redis"]))
+    application.bot_data["scheduler_task"] = task
+
+
+async def post_shutdown(application: Application) -> None:
+    """Stop the scheduler and release the leader lock"""
+    task = application.bot_data.pop("scheduler_task", None)
+    if task is not None:
+        task.cancel()
+        try:
+            await task
+        except (asyncio.CancelledError, Exception):
+            pass
+
+    redis = application.bot_data.pop("redis", None)
+    if redis is not None:
+        await redis.aclose()
+
+    shutdown_tracing()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,169 @@
+"""
+Redis persistence for bot conversation state
+
+Keeps context.user_data (psychology chat mode, reminder being created, ...)
+in Redis so it survives restarts and is shared between bot replicas.
+
+- Each user is stored under its own key as compact JSON with a TTL.
+- Writes are buffered and sent in one pipeline (write-behind): the
+  Application hands over changed user_data every update_interval seconds
+  and all of it goes to Redis in a single round trip.
+- Before every handler, refresh_user_data reloads the user's state from
+  Redis unless this process holds newer, not yet written changes.
+"""
+
+import asyncio
+import json
+import logging
+from typing import Any, Dict, Optional
+
+import redis.asyncio as aioredis
+from telegram.ext import BasePersistence, PersistenceInput
+
+logger = logging.getLogger(__name__)
+
+
+def _dumps(data: Dict[str, Any]) -> str:
+    return json.dumps(data, ensure_ascii=False, separators=(",", ":"), sort_keys=True)
+
+
+class RedisPersistence(BasePersistence):
+    """BasePersistence that stores only user_data, one Redis key per user"""
+
+    def __init__(
+        self,
+        redis: aioredis.Redis,
+        update_interval: float = 1.0,
+        ttl_seconds: int = 30 * 24 * 3600,
+        key_prefix: str = "bot:user_data:",
+    ):
+        super().__init__(
+            store_data=PersistenceInput(
+                bot_data=False, chat_data=False, user_data=True, callback_data=False
+            ),
+            update_interval=update_interval,
+        )
+        self.redis = redis
+        self.ttl_seconds = ttl_seconds
+        self.key_prefix = key_prefix
+        # user_id -> сериализованное состояние, ожидающее записи (None - удалить)
+        self._pending: Dict[int, Optional[str]] = {}
+        # user_id -> последнее состояние, синхронизированное с Redis
+        self._synced: Dict[int, str] = {}
+        self._flush_task: Optional[asyncio.Task] = None
+
+    def _key(self, user_id: int) -> str:
+        return f"{self.key_prefix}{user_id}"
+
+    # ===== user_data =====
+
+    async def get_user_data(self) -> Dict[int, Dict[str, Any]]:
+        # Данные загружаются лениво в refresh_user_data
+        return {}
+
+    async def refresh_user_data(self, user_id: int, user_data: Dict[str, Any]) -> None:
+        if user_id in self._pending:
+            return
+
+        # Локальные изменения, еще не переданные Application в update_user_data
+        current = _dumps(user_data)
+        if current != self._synced.get(user_id, "{}"):
+            return
+
+        try:
+            stored = await self.redis.get(self._key(user_id))
+        except Exception as e:
+            logger.warning(f"Could not load state for user {user_id}: {e}")
+            return
+
+        stored = stored or "{}"
+        if stored != current:
+            user_data.clear()
+            user_data.update(json.loads(stored))
+        self._synced[user_id] = stored
+
+    async def update_user_data(self, user_id: int, data: Dict[str, Any]) -> None:
+        serialized = _dumps(data)
+        if serialized == self._synced.get(user_id, "{}") and user_id not in self._pending:
+            return
+        self._synced[user_id] = serialized
+        self._pending[user_id] = serialized if data else None
+        self._schedule_flush()
+
+    async def drop_user_data(self, user_id: int) -> None:
+        self._synced.pop(user_id, None)
+        self._pending[user_id] = None
+        self._schedule_flush()
+
+    # ===== write-behind =====
+
+    def _schedule_flush(self):
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.create_task(self._flush_soon())
+
+    async def _flush_soon(self):
+        # Application вызывает update_user_data для всех пользователей через
+        # gather - даем остальным вызовам попасть в тот же пакет
+        await asyncio.sleep(0)
+        await self._write_pending()
+
+    async def _write_pending(self):
+        if not self._pending:
+            return
+        batch, self._pending = self._pending, {}
+        try:
+            async with self.redis.pipeline(transaction=False) as pipe:
+                for user_id, serialized in batch.items():
+                    if serialized is None:
+                        pipe.delete(self._key(user_id))
+                    else:
+                        pipe.set(self._key(user_id), serialized, ex=self.ttl_seconds)
+                await pipe.execute()
+        except Exception as e:
+            logger.error(f"Could not write state for {len(batch)} users: {e}")
+            # Вернем в очередь, не затирая более новые изменения
+            for user_id, serialized in batch.items():
+                self._pending.setdefault(user_id, serialized)
+
+    async def flush(self) -> None:
+        if self._flush_task is not None:
+            try:
+                await self._flush_task
+            except Exception:
+                pass
+        await self._write_pending()
+
+    # ===== unused stores =====
+
+    async def get_chat_data(self) -> Dict[int, Dict[str, Any]]:
+        return {}
+
+    async def get_bot_data(self) -> Dict[str, Any]:
+        return {}
+
+    async def get_callback_data(self) -> None:
+        return None
+
+    async def get_conversations(self, name: str) -> Dict:
+        return {}
+
+    async def update_conversation(self, name: str, key, new_state) -> None:
+        pass
+
+    async def update_chat_data(self, chat_id: int, data: Dict[str, Any]) -> None:
+        pass
+
+    async def update_bot_data(self, data: Dict[str, Any]) -> None:
+        pass
+
+    async def update_callback_data(self, data) -> None:
+        pass
+
+    async def drop_chat_data(self, chat_id: int) -> None:
+        pass
+
+    async def refresh_chat_data(self, chat_id: int, chat_data: Dict[str, Any]) -> None:
+        pass
+
+    async def refresh_bot_data(self, bot_data: Dict[str, Any]) -> None:
+        pass
@@ -0,0 +1,38 @@
+"""
+Reminder due checks (no I/O), shared by the scheduler paths
+"""
+
+from datetime import datetime
+from typing import Iterable, List
+
+DATE_FORMAT = "%Y-%m-%d"
+
+
+def is_reminder_due(reminder: dict, current_time: str, today: str) -> bool:
+    """
+    Active reminder scheduled for current_time ("HH:MM") on today
+    ("YYYY-MM-DD"); reminders without a date repeat daily.
+    """
+    if not reminder.get("is_active"):
+        return False
+    if reminder.get("time", "") != current_time:
+        return False
+
+    # Дата задана только у dental_visit
+    reminder_date = reminder.get("date")
+    if not reminder_date or reminder_date == today:
+        return True
+    if len(reminder_date) == len(today):
+        # Другая дата в каноническом виде - без разбора строки
+        return False
+    # Нестандартная запись (например, 2024-3-5)
+    try:
+        return datetime.strptime(reminder_date, DATE_FORMAT).strftime(DATE_FORMAT) == today
+    except ValueError:
+        return False
+
+
+def filter_due_reminders(reminders: Iterable[dict], now: datetime) -> List[dict]:
+    current_time = now.strftime("%H:%M")
+    today = now.strftime(DATE_FORMAT)
+    return [r for r in reminders if is_reminder_due(r, current_time, today)]
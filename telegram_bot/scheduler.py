@@ -5,86 +5,119 @@ Sends reminders to users at scheduled times
 
 import asyncio
 import logging
-from datetime import datetime, time
+from datetime import datetime
+from typing import List
 
+import data_access
 import httpx
 from config import Config
+from reminder_rules import filter_due_reminders
 
 logger = logging.getLogger(__name__)
 
 
-async def reminder_scheduler(bot):
+async def fetch_due_reminders_http(client: httpx.AsyncClient, now: datetime) -> List[dict]:
+    """Collect due reminders through the backend API (one request per user)"""
+    api_endpoints = Config.get_api_endpoints()
+    due = []
+
+    # Get all users with reminders
+    users_response = await client.get(f"{api_endpoints['users']}/all-telegram-users")
+    if users_response.status_code != 200:
+        return due
+
+    for user in users_response.json():
+        user_id = user.get("id")
+        telegram_id = user.get("telegram_id")
+
+        if not telegram_id:
+            continue
+
+        # Get user's reminders
+        reminders_response = await client.get(
+            f"{api_endpoints['reminders']}/user/{user_id}"
+        )
+        if reminders_response.status_code != 200:
+            continue
+
+        for reminder in filter_due_reminders(reminders_response.json(), now):
+            due.append(
+                {
+                    "reminder_id": reminder.get("id"),
+                    "user_id": user_id,
+                    "telegram_id": telegram_id,
+                    "message": reminder.get("message"),
+                }
+            )
+    return due
+
+
+# Ключ отправки живет дольше минуты расписания, но не до следующего дня
+SENT_KEY_TTL = 120
+
+
+async def claim_reminder_send(redis, reminder: dict, now: datetime) -> bool:
+    """
+    Reserve this minute's send of a reminder (SET NX).
+
+    During a leader handover two replicas can process the same minute; only
+    the one that sets the key sends. Without Redis (or on a Redis error) the
+    reminder is sent: a rare duplicate is better than a missed reminder.
+    """
+    reminder_id = reminder.get("reminder_id")
+    if redis is None or reminder_id is None:
+        return True
+    key = f"reminder:sent:{reminder_id}:{now.strftime('%Y%m%d%H%M')}"
+    try:
+        return bool(await redis.set(key, 1, nx=True, ex=SENT_KEY_TTL))
+    except Exception as e:
+        logger.warning(f"Could not reserve reminder {reminder_id} send: {e}")
+        return True
+
+
+async def reminder_scheduler(bot, redis=None):
     """Background task to send reminders to users"""
     logger.info("Reminder scheduler started")
-    
+
     while True:
         try:
-            # Get current time
             now = datetime.now()
-            current_time = now.strftime("%H:%M")
-            
-            # Get all active reminders for current time
+
             async with httpx.AsyncClient() as client:
                 try:
-                    api_endpoints = Config.get_api_endpoints()
-                    # Get all users with reminders
-                    users_response = await client.get(f"{api_endpoints['users']}/all-telegram-users")
-                    
-                    if users_response.status_code == 200:
-                        users = users_response.json()
-                        
-                        for user in users:
-                            user_id = user.get("id")
-                            telegram_id = user.get("telegram_id")
-                            
-                            if not telegram_id:
-                                continue
-                            
-                            # Get user's reminders
-                            reminders_response = await client.get(
-                                f"{api_endpoints['reminders']}/user/{user_id}"
+                    reminders = None
+                    if data_access.use_db(data_access.DUE_REMINDERS):
+                        try:
+                            # Один запрос вместо запроса на каждого пользователя
+                            reminders = await data_access.get_due_reminders(now)
+                        except Exception as e:
+                            logger.warning(
+                                f"Direct reminder query failed, using backend API: {e}"
+                            )
+                    if reminders is None:
+                        reminders = await fetch_due_reminders_http(client, now)
+
+                    for reminder in reminders:
+                        if not await claim_reminder_send(redis, reminder, now):
+                            continue
+                        telegram_id = reminder["telegram_id"]
+                        # Send reminder
+                        message = reminder.get("message") or "Напоминание о гигиене"
+                        try:
+                            await bot.send_message(chat_id=telegram_id, text=message)
+                            logger.info(
+                                f"Sent reminder to user {telegram_id} "
+                                f"(user_id: {reminder['user_id']})"
                             )
-                            
-                            if reminders_response.status_code == 200:
-                                reminders = reminders_response.json()
-                                
-                                for reminder in reminders:
-                                    if not reminder.get("is_active"):
-                                        continue
-                                    
-                                    reminder_time = reminder.get("time", "")
-                                    reminder_date = reminder.get("date")
-                                    
-                                    # Check if time matches
-                                    if reminder_time == current_time:
-                                        # Check date if specified (for dental_visit)
-                                        if reminder_date:
-                                            reminder_date_obj = datetime.strptime(reminder_date, "%Y-%m-%d")
-                                            if reminder_date_obj.date() != now.date():
-                                                continue
-                                        
-                                        # Send reminder
-                                        message = reminder.get("message", "Напоминание о гигиене")
-                                        try:
-                                            await bot.send_message(
-                                                chat_id=telegram_id,
-                                                text=message
-                                            )
-                                            logger.info(
-                                                f"Sent reminder to user {telegram_id} (user_id: {user_id})"
-                                            )
-                                        except Exception as e:
-                                            logger.error(
-                                                f"Error sending reminder to {telegram_id}: {e}"
-                                            )
-                
+                        except Exception as e:
+                            logger.error(f"Error sending reminder to {telegram_id}: {e}")
+
                 except Exception as e:
                     logger.error(f"Error in reminder scheduler: {e}")
-            
+
             # Wait 60 seconds before next check
             await asyncio.sleep(60)
-            
+
         except Exception as e:
             logger.error(f"Error in reminder scheduler loop: {e}")
             await asyncio.sleep(60)
-
@@ -0,0 +1,150 @@
+"""
+Concurrent update processing with per-chat ordering
+
+Updates from different chats are handled in parallel, updates from the same
+chat strictly one after another in arrival order, so a slow AI reply for one
+user does not hold up everybody else, while each user's messages and button
+presses are still processed in the order they were sent.
+"""
+
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Dict, Hashable, Optional
+
+from telegram import Update
+from telegram.ext import BaseUpdateProcessor
+from tracing import span
+
+logger = logging.getLogger(__name__)
+
+
+class _ChatQueue:
+    __slots__ = ("lock", "depth")
+
+    def __init__(self):
+        self.lock = asyncio.Lock()
+        self.depth = 0
+
+
+class PerChatUpdateProcessor(BaseUpdateProcessor):
+    """
+    Update processor with a per-chat sequencer.
+
+    max_in_flight limits how many handlers run at the same time; max_pending
+    limits how many updates may be accepted (running + queued) before the
+    application stops taking new ones. Updates waiting behind an earlier
+    update of the same chat do not occupy an in-flight slot.
+    """
+
+    def __init__(
+        self,
+        max_in_flight: int,
+        max_pending: int,
+        stats_interval: float = 60.0,
+        slow_queue_depth: int = 5,
+    ):
+        super().__init__(max_concurrent_updates=max(max_pending, max_in_flight))
+        self.max_in_flight = max_in_flight
+        self.stats_interval = stats_interval
+        self.slow_queue_depth = slow_queue_depth
+        self._slots = asyncio.Semaphore(max_in_flight)
+        self._chats: Dict[Hashable, _ChatQueue] = {}
+        self._stats_task: Optional[asyncio.Task] = None
+
+        self.pending = 0
+        self.in_flight = 0
+        self.processed = 0
+        self.max_chat_depth = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+
+    @staticmethod
+    def _chat_key(update: object) -> Optional[Hashable]:
+        if isinstance(update, Update):
+            if update.effective_chat:
+                return update.effective_chat.id
+            if update.effective_user:
+                return ("user", update.effective_user.id)
+        return None
+
+    async def do_process_update(self, update: object, coroutine: "Awaitable[Any]") -> None:
+        key = self._chat_key(update)
+        queued_at = time.perf_counter()
+        self.pending += 1
+
+        chat = None
+        if key is not None:
+            chat = self._chats.get(key)
+            if chat is None:
+                chat = self._chats[key] = _ChatQueue()
+            chat.depth += 1
+            if chat.depth > self.max_chat_depth:
+                self.max_chat_depth = chat.depth
+            if chat.depth == self.slow_queue_depth:
+                logger.warning(f"Chat {key} has {chat.depth} updates queued")
+
+        try:
+            if chat is not None:
+                await chat.lock.acquire()
+            try:
+                async with self._slots:
+                    waited = time.perf_counter() - queued_at
+                    self.wait_seconds_total += waited
+                    self.wait_seconds_max = max(self.wait_seconds_max, waited)
+                    self.in_flight += 1
+                    try:
+                        # Корневой спан обновления: ожидание в очереди чата + обработка
+                        with span(
+                            "telegram.update",
+                            {"telegram.chat": str(key), "telegram.queue_wait_ms": waited * 1000},
+                        ):
+                            await coroutine
+                    finally:
+                        self.in_flight -= 1
+                        self.processed += 1
+            finally:
+                if chat is not None:
+                    chat.lock.release()
+        finally:
+            self.pending -= 1
+            if chat is not None:
+                chat.depth -= 1
+                # Очередь чата пуста - удаляем, чтобы словарь не рос бесконечно
+                if chat.depth == 0 and self._chats.get(key) is chat:
+                    del self._chats[key]
+
+    def stats(self) -> Dict[str, Any]:
+        """Queue depth and waiting time counters"""
+        return {
+            "in_flight": self.in_flight,
+            "max_in_flight": self.max_in_flight,
+            "queued": self.pending - self.in_flight,
+            "active_chats": len(self._chats),
+            "max_chat_depth": self.max_chat_depth,
+            "processed": self.processed,
+            "wait_avg_ms": (
+                round(self.wait_seconds_total / self.processed * 1000, 1)
+                if self.processed
+                else 0.0
+            ),
+            "wait_max_ms": round(self.wait_seconds_max * 1000, 1),
+        }
+
+    async def _log_stats(self):
+        last_processed = -1
+        while True:
+            await asyncio.sleep(self.stats_interval)
+            if self.processed != last_processed or self.pending:
+                logger.info(f"Update queue: {self.stats()}")
+                last_processed = self.processed
+
+    async def initialize(self) -> None:
+        if self.stats_interval > 0:
+            self._stats_task = asyncio.create_task(self._log_stats())
+
+    async def shutdown(self) -> None:
+        if self._stats_task is not None:
+            self._stats_task.cancel()
+            self._stats_task = None
+        logger.info(f"Update queue at shutdown: {self.stats()}")
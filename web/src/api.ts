@@ -0,0 +1,75 @@
+// Запросы с access token: при 401 токены обновляются через /auth/refresh
+// (без повторного ввода пароля) и запрос повторяется один раз
+
+export const API_URL = process.env.REACT_APP_API_URL || '/api';
+
+let refreshInFlight: Promise<boolean> | null = null;
+
+export const saveTokens = (data: { access_token: string; refresh_token?: string | null }) => {
+  localStorage.setItem('access_token', data.access_token);
+  if (data.refresh_token) {
+    localStorage.setItem('refresh_token', data.refresh_token);
+  } else {
+    localStorage.removeItem('refresh_token');
+  }
+};
+
+export const clearTokens = () => {
+  localStorage.removeItem('access_token');
+  localStorage.removeItem('refresh_token');
+  localStorage.removeItem('user_id');
+};
+
+const refreshTokens = async (): Promise<boolean> => {
+  const refreshToken = localStorage.getItem('refresh_token');
+  if (!refreshToken) {
+    return false;
+  }
+  try {
+    const response = await fetch(`${API_URL}/auth/refresh`, {
+      method: 'POST',
+      headers: { 'Content-Type': 'application/json' },
+      body: JSON.stringify({ refresh_token: refreshToken }),
+    });
+    if (!response.ok) {
+      // Токен обменян или отозван - нужен повторный вход
+      if (response.status === 401) {
+        clearTokens();
+      }
+      return false;
+    }
+    saveTokens(await response.json());
+    return true;
+  } catch (error) {
+    console.error('Error refreshing token:', error);
+    return false;
+  }
+};
+
+// Refresh token одноразовый: параллельные 401 ждут один общий обмен
+const refreshOnce = (): Promise<boolean> => {
+  if (!refreshInFlight) {
+    refreshInFlight = refreshTokens().then((refreshed) => {
+      refreshInFlight = null;
+      return refreshed;
+    });
+  }
+  return refreshInFlight;
+};
+
+const withToken = (init: RequestInit): RequestInit => {
+  const headers = new Headers(init.headers);
+  const token = localStorage.getItem('access_token');
+  if (token) {
+    headers.set('Authorization', `Bearer ${token}`);
+  }
+  return { ...init, headers };
+};
+
+export const authFetch = async (url: string, init: RequestInit = {}): Promise<Response> => {
+  const response = await fetch(url, withToken(init));
+  if (response.status !== 401 || !(await refreshOnce())) {
+    return response;
+  }
+  return fetch(url, withToken(init));
+};
@@ -1,6 +1,7 @@
 import React, { useState, useEffect } from 'react';
 import { Braces as BracesIcon, Search, HelpCircle, MessageCircle } from 'lucide-react';
 import toast from 'react-hot-toast';
+import { authFetch } from '../api';
 
 const Braces: React.FC = () => {
   const [searchQuery, setSearchQuery] = useState('');
@@ -380,7 +381,7 @@ const Braces: React.FC = () => {
     try {
       // Используем относительный путь для избежания проблем с CORS и протоколами
       const apiUrl = process.env.REACT_APP_API_URL || '/api';
-      const response = await fetch(`${apiUrl}/facts/braces/chat`, {
+      const response = await authFetch(`${apiUrl}/facts/braces/chat`, {
         method: 'POST',
         headers: {
           'Content-Type': 'application/json',
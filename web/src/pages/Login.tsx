@@ -1,6 +1,7 @@
 import React, { useState } from 'react';
 import { useNavigate } from 'react-router-dom';
 import toast from 'react-hot-toast';
+import { saveTokens } from '../api';
 
 const Login: React.FC = () => {
   const [email, setEmail] = useState('');
@@ -30,7 +31,7 @@ const Login: React.FC = () => {
       }
 
       const data = await response.json();
-      localStorage.setItem('access_token', data.access_token);
+      saveTokens(data);
       localStorage.setItem('user_id', email); // Временно, нужно получить из /me
       
       toast.success('Вход выполнен успешно!');
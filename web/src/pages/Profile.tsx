@@ -1,6 +1,7 @@
 import React, { useState, useEffect } from 'react';
 import { useNavigate } from 'react-router-dom';
 import toast from 'react-hot-toast';
+import { API_URL, authFetch, clearTokens } from '../api';
 
 const Profile: React.FC = () => {
   const [user, setUser] = useState<any>(null);
@@ -10,32 +11,22 @@ const Profile: React.FC = () => {
   useEffect(() => {
     const fetchProfile = async () => {
       try {
-        const token = localStorage.getItem('access_token');
-        if (!token) {
+        if (!localStorage.getItem('access_token')) {
           navigate('/login');
           return;
         }
 
-        // Используем относительный путь для избежания проблем с CORS и протоколами
-        const apiUrl = process.env.REACT_APP_API_URL || '/api';
+        const apiUrl = API_URL;
         const userId = localStorage.getItem('user_id');
         
         if (!userId) {
           // Попробуем получить через /me
-          const meResponse = await fetch(`${apiUrl}/auth/me`, {
-            headers: {
-              'Authorization': `Bearer ${token}`,
-            },
-          });
+          const meResponse = await authFetch(`${apiUrl}/auth/me`);
           
           if (meResponse.ok) {
             const meData = await meResponse.json();
             localStorage.setItem('user_id', meData.id.toString());
-            const profileResponse = await fetch(`${apiUrl}/users/profile/${meData.id}`, {
-              headers: {
-                'Authorization': `Bearer ${token}`,
-              },
-            });
+            const profileResponse = await authFetch(`${apiUrl}/users/profile/${meData.id}`);
             if (profileResponse.ok) {
               setUser(await profileResponse.json());
             }
@@ -43,11 +34,7 @@ const Profile: React.FC = () => {
             navigate('/login');
           }
         } else {
-          const response = await fetch(`${apiUrl}/users/profile/${userId}`, {
-            headers: {
-              'Authorization': `Bearer ${token}`,
-            },
-          });
+          const response = await authFetch(`${apiUrl}/users/profile/${userId}`);
           
           if (response.ok) {
             setUser(await response.json());
@@ -67,8 +54,15 @@ const Profile: React.FC = () => {
   }, [navigate]);
 
   const handleLogout = () => {
-    localStorage.removeItem('access_token');
-    localStorage.removeItem('user_id');
+    const refreshToken = localStorage.getItem('refresh_token');
+    if (refreshToken) {
+      fetch(`${API_URL}/auth/logout`, {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify({ refresh_token: refreshToken }),
+      }).catch(() => undefined);
+    }
+    clearTokens();
     toast.success('Выход выполнен');
     navigate('/');
   };
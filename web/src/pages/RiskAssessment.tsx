@@ -1,6 +1,7 @@
 import React, { useState, useEffect } from 'react';
 import { Shield, AlertTriangle, CheckCircle, XCircle, Loader2 } from 'lucide-react';
 import toast from 'react-hot-toast';
+import { authFetch } from '../api';
 
 const RiskAssessment: React.FC = () => {
   const [currentStep, setCurrentStep] = useState(0);
@@ -220,7 +221,7 @@ const RiskAssessment: React.FC = () => {
     try {
       // Используем относительный путь для избежания проблем с CORS и протоколами
       const apiUrl = process.env.REACT_APP_API_URL || '/api';
-      const response = await fetch(`${apiUrl}/risks/assess`, {
+      const response = await authFetch(`${apiUrl}/risks/assess`, {
         method: 'POST',
         headers: {
           'Content-Type': 'application/json',